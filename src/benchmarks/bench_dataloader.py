@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Allow running as `python src/benchmarks/bench_dataloader.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datamodule.recorder_datamodule import RecorderDataModule
+
+
+def measure_throughput(datamodule, num_workers, max_batches=None, warmup_batches=2):
+    """
+    Iterates the training DataLoader and returns clips/s and audio samples/s.
+
+    The first `warmup_batches` batches are excluded so worker start-up does not
+    dominate short runs.
+    """
+    datamodule.loaders_config.train["num_workers"] = num_workers
+    datamodule.loaders_config.train["persistent_workers"] = False
+    loader = datamodule.train_dataloader()
+    clips = 0
+    samples = 0
+    start = None
+    for i, batch in enumerate(loader):
+        if i == warmup_batches:
+            start = time.perf_counter()
+        if start is not None:
+            clips += batch["audio"].shape[0]
+            samples += int(batch["lengths"].sum()) * batch["audio"].shape[1]
+        if max_batches is not None and i + 1 >= max_batches + warmup_batches:
+            break
+    elapsed = time.perf_counter() - start if start is not None else float("nan")
+    return {
+        "num_workers": num_workers,
+        "clips": clips,
+        "seconds": elapsed,
+        "clips_per_s": clips / elapsed if clips else 0.0,
+        "samples_per_s": samples / elapsed if clips else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure RecorderDataModule throughput for several worker counts.")
+    parser.add_argument("root", help="Dataset root written by the recorder")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    datamodule = RecorderDataModule(
+        root=args.root,
+        val_split=0.0,
+        test_split=0.0,
+        loaders_config={"train": {"batch_size": args.batch_size, "shuffle": True}},
+    )
+    datamodule.prepare_data()
+    datamodule.setup()
+    results = [measure_throughput(datamodule, workers, args.max_batches) for workers in args.workers]
+    print(json.dumps(results, indent=2))
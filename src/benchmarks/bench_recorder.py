@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Allow running as `python src/benchmarks/bench_recorder.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recorder.compressed_io import read_audio
+from recorder.label_store import open_label_store
+from recorder.manifest import parse_recording_filename
+from recorder.monitor import Monitor
+from recorder.record_config import HardwareConfig, RecorderConfig
+from recorder.recorder_hardware import RecorderHardware
+from recorder.shards import ShardReader, pack_dataset, recording_key
+from recorder.verify import scan_dataset
+
+LABEL_ENTRY = {
+    "doa": 90,
+    "elevation": 0,
+    "frequency": 1000,
+    "amplitude": 0.5,
+    "category": "tone",
+    "gain": 1.0,
+    "gain_units": "linear",
+    "duration": 1,
+    "clipped_samples": [0, 0, 0, 0],
+}
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=np.float64) * 1000.0
+    if not len(values):
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _directory_bytes(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(folder, name))
+    return total
+
+
+def bench_recording(output_dir, clips=50, duration=1.0, channels=4, sample_rate=16000, streaming=False,
+                    writer_threads=0, output_layout="per_channel", label_format="jsonl", manifest=True, monitor_hz=None,
+                    output_format="wav"):
+    """
+    Records and saves `clips` clips from a synthetic device running unthrottled.
+
+    With `monitor_hz` (streaming only) a `Monitor` reads the stream at that rate
+    while recording; its lines go to stdout as plain text.
+
+    Save latency is reported twice: `save_call` is the time `save()` blocks the
+    recording loop and `write` the time until the clip is on disk (the same
+    unless `writer_threads` hands writes to the background writer).
+
+    Returns:
+        dict: Configuration and measured throughput, latencies and peak RSS.
+    """
+    hardware_config = HardwareConfig({
+        "type": "Synthetic",
+        "backend": "synthetic",
+        "device_id": None,
+        "channels": channels,
+        "gain": 1.0,
+        "sample_rate": sample_rate,
+        "speed": 0,
+    })
+    recorder_config = RecorderConfig(
+        output_dir=output_dir,
+        duration=duration,
+        sample_rate=sample_rate,
+        channels=channels,
+        streaming=streaming,
+        writer_threads=writer_threads,
+        output_layout=output_layout,
+        label_format=label_format,
+        manifest=manifest,
+        output_format=output_format,
+    )
+    metadata = {"doa": 90, "elevation": 0, "category": ["tone"], "frequency": 1000, "amplitude": 0.5}
+    recorder = RecorderHardware(hardware_config, recorder_config, metadata)
+
+    write_times = []
+    write_recording = recorder._write_recording
+
+    def timed_write(*args, **kwargs):
+        start = time.perf_counter()
+        write_recording(*args, **kwargs)
+        write_times.append(time.perf_counter() - start)
+
+    recorder._write_recording = timed_write
+    monitor = Monitor([recorder], refresh_hz=monitor_hz) if monitor_hz else None
+    if monitor is not None:
+        monitor.start(rich=False)
+
+    record_times = []
+    save_times = []
+    start = time.perf_counter()
+    for i in range(clips):
+        t0 = time.perf_counter()
+        recording = recorder.record()
+        t1 = time.perf_counter()
+        recorder.save(recording, f"sample_{i + 1}")
+        record_times.append(t1 - t0)
+        save_times.append(time.perf_counter() - t1)
+    recorder.flush()
+    elapsed = time.perf_counter() - start
+    if monitor is not None:
+        monitor.stop()
+    dropped_frames = recorder.stream.dropped_frames if recorder.stream is not None else 0
+    recorder.close()
+    health = recorder.health.snapshot()
+
+    written = _directory_bytes(output_dir)
+    return {
+        "clips": clips,
+        "duration_s": duration,
+        "channels": channels,
+        "sample_rate": sample_rate,
+        "streaming": streaming,
+        "writer_threads": writer_threads,
+        "output_layout": output_layout,
+        "output_format": recorder.output_format,
+        "label_format": label_format,
+        "manifest": manifest,
+        "monitor_hz": monitor_hz,
+        "monitor_updates": monitor.updates if monitor is not None else 0,
+        "monitor_busy_s": monitor.busy_seconds if monitor is not None else 0.0,
+        "seconds": elapsed,
+        "clips_per_s": clips / elapsed,
+        "bytes_written": written,
+        "bytes_per_s": written / elapsed,
+        "record": _percentiles(record_times),
+        "save_call": _percentiles(save_times),
+        "write": _percentiles(write_times),
+        "dropped_frames": dropped_frames,
+        "flagged_clips": health["flagged_clips"],
+        "callback_seconds_max": health["callback_seconds_max"],
+        "writer_queue_max": health["writer_queue_max"],
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_monitor(output_dir, refresh_hz=(5, 30), repeats=3, **kwargs):
+    """
+    Measures what a live `Monitor` costs streaming throughput.
+
+    Runs `bench_recording` in streaming mode without a monitor and with one at
+    each of `refresh_hz`, alternating `repeats` times, and compares the best
+    clips/s of each.
+
+    Returns:
+        list: One dict per rate with the throughput and its change against no monitor in percent.
+    """
+    rates = [None] + list(refresh_hz)
+    best = dict.fromkeys(rates, 0.0)
+    busy = dict.fromkeys(rates, 0.0)
+    for repeat in range(repeats):
+        for rate in rates:
+            result = bench_recording(os.path.join(output_dir, f"monitor_{rate}_{repeat}"), streaming=True, monitor_hz=rate, **kwargs)
+            if result["clips_per_s"] > best[rate]:
+                best[rate], busy[rate] = result["clips_per_s"], result["monitor_busy_s"] / result["seconds"]
+    return [{
+        "monitor_hz": rate,
+        "clips_per_s": best[rate],
+        "monitor_busy_fraction": busy[rate],
+        "throughput_change_pct": 100.0 * (best[rate] / best[None] - 1.0),
+    } for rate in rates]
+
+
+def check_packing(output_dir, shard_dir):
+    """
+    Packs a recorded dataset into shards and compares every packed channel with its source file.
+
+    Returns:
+        dict: Channels found in the files, channels packed and channels whose samples differ.
+    """
+    packed = pack_dataset(output_dir, shard_dir)
+    reader = ShardReader(shard_dir)
+    paths, _ = scan_dataset(output_dir)
+    channels = mismatched = 0
+    for path in paths:
+        samples = read_audio(path)
+        for column, fields in enumerate(parse_recording_filename(path)):
+            channels += 1
+            if not np.array_equal(reader.get(recording_key(fields), fields["channel"]), samples[:, column]):
+                mismatched += 1
+    return {"channels": channels, "packed_channels": packed, "mismatched_channels": mismatched}
+
+
+def bench_packing(output_dir, output_formats=("wav", "dzip"), layouts=("per_channel", "interleaved"), clips=5, **kwargs):
+    """
+    Records a few clips in every output format and layout and checks that `pack_dataset` packs them losslessly.
+
+    Returns:
+        list: One dict per (format, layout) with the recording results and the `check_packing()` counts.
+
+    Raises:
+        RuntimeError: A dataset was not packed completely or its samples changed.
+    """
+    results = []
+    for output_format in output_formats:
+        for layout in layouts:
+            directory = os.path.join(output_dir, f"pack_{output_format}_{layout}")
+            recording = bench_recording(directory, clips=clips, output_layout=layout, output_format=output_format, **kwargs)
+            start = time.perf_counter()
+            check = check_packing(directory, os.path.join(output_dir, f"shards_{output_format}_{layout}"))
+            check["pack_seconds"] = time.perf_counter() - start
+            if check["mismatched_channels"] or check["packed_channels"] != check["channels"]:
+                raise RuntimeError(f"Packing {output_format} {layout} recordings failed: {check}")
+            results.append({"output_format": recording["output_format"], "output_layout": layout, **check})
+    return results
+
+
+def _prefill_labels(output_dir, label_format, size):
+    if label_format == "jsonl":
+        with open(os.path.join(output_dir, "experiment_labels.jsonl"), "w", encoding="utf-8") as label_file:
+            line = json.dumps(LABEL_ENTRY, separators=(",", ":")) + "\n"
+            label_file.writelines(line for _ in range(size))
+    else:
+        with open(os.path.join(output_dir, "experiment_labels.json"), "w", encoding="utf-8") as label_file:
+            json.dump([LABEL_ENTRY] * size, label_file, indent=4)
+
+
+def bench_labels(output_dir, sizes=(0, 1000, 10000, 100000), appends=100, label_formats=("jsonl", "json")):
+    """
+    Measures the cost of appending labels to stores that already hold `sizes` entries.
+
+    Returns:
+        list: One dict per (format, size) with per-append latencies and the final flush time.
+    """
+    results = []
+    for label_format in label_formats:
+        for size in sizes:
+            directory = os.path.join(output_dir, f"labels_{label_format}_{size}")
+            os.makedirs(directory, exist_ok=True)
+            _prefill_labels(directory, label_format, size)
+            store = open_label_store(directory, label_format)
+            times = []
+            for _ in range(appends):
+                start = time.perf_counter()
+                store.append(LABEL_ENTRY)
+                times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            store.close()
+            results.append({
+                "label_format": label_format,
+                "existing_entries": size,
+                "appends": appends,
+                "append": _percentiles(times),
+                "mean_append_ms": float(np.mean(times) * 1000.0),
+                "close_ms": (time.perf_counter() - start) * 1000.0,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AudioRecorder record/save and the label store against a synthetic device.")
+    parser.add_argument("--clips", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=1.0, help="Clip length in seconds")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--writer-threads", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--layouts", nargs="+", default=["per_channel", "interleaved"])
+    parser.add_argument("--streaming", action="store_true", help="Cut clips from a running stream")
+    parser.add_argument("--no-manifest", action="store_true")
+    parser.add_argument("--pack-check", nargs="*", default=None, choices=["wav", "rf64", "flac", "dzip"],
+                        help="Record in these output formats and check that the shard packer reads them back unchanged (default: wav dzip)")
+    parser.add_argument("--monitor", type=float, nargs="*", default=None,
+                        help="Also measure the streaming throughput cost of a live monitor at these rates in Hz (default: 5 30)")
+    parser.add_argument("--label-sizes", type=int, nargs="+", default=[0, 1000, 10000], help="Existing label entries before timing appends")
+    parser.add_argument("--label-appends", type=int, default=50)
+    parser.add_argument("--label-formats", nargs="+", default=["jsonl", "json"])
+    parser.add_argument("--work-dir", default=None, help="Where recordings are written (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as work_dir:
+        recording_results = []
+        # The recorder prints a line per saved file; keep stdout for the JSON report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for layout in args.layouts:
+                for writer_threads in args.writer_threads:
+                    output_dir = os.path.join(work_dir, f"{layout}_{writer_threads}")
+                    recording_results.append(bench_recording(
+                        output_dir,
+                        clips=args.clips,
+                        duration=args.duration,
+                        channels=args.channels,
+                        sample_rate=args.sample_rate,
+                        streaming=args.streaming,
+                        writer_threads=writer_threads,
+                        output_layout=layout,
+                        manifest=not args.no_manifest,
+                    ))
+            label_results = bench_labels(work_dir, args.label_sizes, args.label_appends, args.label_formats)
+            pack_results = None
+            if args.pack_check is not None:
+                pack_results = bench_packing(
+                    work_dir,
+                    output_formats=args.pack_check or ("wav", "dzip"),
+                    layouts=args.layouts,
+                    duration=args.duration,
+                    channels=args.channels,
+                    sample_rate=args.sample_rate,
+                    manifest=not args.no_manifest,
+                )
+            monitor_results = None
+            if args.monitor is not None:
+                monitor_results = bench_monitor(
+                    work_dir,
+                    refresh_hz=args.monitor or (5, 30),
+                    clips=args.clips,
+                    duration=args.duration,
+                    channels=args.channels,
+                    sample_rate=args.sample_rate,
+                    writer_threads=args.writer_threads[0],
+                    output_layout=args.layouts[0],
+                    manifest=not args.no_manifest,
+                )
+
+    report = {
+        "benchmark": "recorder",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "recording": recording_results,
+        "labels": label_results,
+    }
+    if pack_results is not None:
+        report["packing"] = pack_results
+    if monitor_results is not None:
+        report["monitor"] = monitor_results
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Wrote results to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that belong to training and must never be imported by the recorder
+FORBIDDEN = ("lightning", "lightning_utilities", "torch", "tensorflow", "wandb", "rich", "pyrootutils", "dotenv")
+
+
+def import_profile(module, python=sys.executable):
+    """
+    Imports `module` in a fresh interpreter under `python -X importtime`.
+
+    Returns:
+        dict: `total_ms` (cumulative time of the module import) and `imports`,
+        a list of `(module, self_ms, cumulative_ms)` in import order.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        message = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(f"Importing {module} failed: {message}")
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us) / 1000.0, int(cumulative_us) / 1000.0))
+    total = next((cumulative for name, _, cumulative in imports if name == module), None)
+    return {"total_ms": total, "imports": imports}
+
+
+def check_startup(module, budget_ms, forbidden=FORBIDDEN, repeats=3, top=15):
+    """
+    Profiles `module` `repeats` times and checks the fastest run against `budget_ms`.
+
+    Returns:
+        dict: Timing, the slowest imports, forbidden packages that were imported and `ok`.
+    """
+    runs = [import_profile(module) for _ in range(max(1, repeats))]
+    best = min(runs, key=lambda run: run["total_ms"])
+    names = {name for name, _, _ in best["imports"]}
+    violations = sorted(name for name in names if name.split(".")[0] in forbidden)
+    slowest = sorted(best["imports"], key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": best["total_ms"],
+        "budget_ms": budget_ms,
+        "modules_imported": len(names),
+        "slowest_self_ms": [{"module": name, "self_ms": self_ms, "cumulative_ms": cumulative} for name, self_ms, cumulative in slowest],
+        "forbidden_imports": violations,
+        "ok": best["total_ms"] <= budget_ms and not violations,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time of the recorder entry points against a budget.")
+    parser.add_argument("--modules", nargs="+", default=["recorder.recorder_hardware", "main_record"])
+    parser.add_argument("--budget-ms", type=float, nargs="+", default=[300.0, 1500.0],
+                        help="Budget per module (a single value applies to all)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per module; the fastest counts")
+    parser.add_argument("--output", default=None, help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    budgets = args.budget_ms if len(args.budget_ms) == len(args.modules) else [args.budget_ms[0]] * len(args.modules)
+    results = [check_startup(module, budget, repeats=args.repeats) for module, budget in zip(args.modules, budgets)]
+    report = {"benchmark": "startup", "python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Wrote results to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    for result in results:
+        if not result["ok"]:
+            print(f"{result['module']}: {result['total_ms']:.0f} ms (budget {result['budget_ms']:.0f} ms), "
+                  f"forbidden imports: {result['forbidden_imports'] or 'none'}", file=sys.stderr)
+    sys.exit(0 if all(result["ok"] for result in results) else 1)
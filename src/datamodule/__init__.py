@@ -0,0 +1 @@
+from datamodule.recorder_datamodule import RecorderDataModule, RecordingDataset, collate_recordings
@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from itertools import combinations
+from typing import Optional
+
+import numpy as np
+
+from recorder.compressed_io import audio_info, open_audio
+
+
+@dataclass
+class FeatureConfig:
+    """
+    Parameters of one feature type; part of every cache key.
+
+    Attributes:
+        kind (str): "stft" (magnitude), "logmel" or "gcc_phat".
+        n_fft (int): FFT size in samples.
+        hop_length (int): Hop between frames in samples.
+        n_mels (int): Mel bands for "logmel".
+        max_lag (Optional[int]): Lags kept on each side of zero for "gcc_phat"; all lags if None.
+        sample_rate (Optional[int]): Sampling rate; taken from the audio when None.
+    """
+    kind: str = "logmel"
+    n_fft: int = 1024
+    hop_length: int = 512
+    n_mels: int = 64
+    max_lag: Optional[int] = None
+    sample_rate: Optional[int] = None
+
+
+def frame_signal(audio, n_fft, hop_length):
+    """
+    Returns a strided (…, n_frames, n_fft) view of `audio` shaped (…, samples) without copying.
+    """
+    n_frames = 1 + max(0, audio.shape[-1] - n_fft) // hop_length
+    return np.lib.stride_tricks.sliding_window_view(audio, n_fft, axis=-1)[..., ::hop_length, :][..., :n_frames, :]
+
+
+def stft(audio, n_fft=1024, hop_length=512):
+    """
+    Complex STFT of every channel of every clip at once.
+
+    Args:
+        audio (np.ndarray): Float array shaped (…, samples), e.g. (clips, channels, samples).
+
+    Returns:
+        np.ndarray: complex64 array shaped (…, n_frames, n_fft // 2 + 1).
+    """
+    window = np.hanning(n_fft).astype(np.float32)
+    frames = frame_signal(audio, n_fft, hop_length) * window
+    return np.fft.rfft(frames, axis=-1).astype(np.complex64)
+
+
+def mel_filterbank(sample_rate, n_fft, n_mels):
+    """
+    Triangular HTK-style mel filterbank shaped (n_fft // 2 + 1, n_mels).
+    """
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).T.astype(np.float32)
+
+
+def log_mel(audio, sample_rate, n_fft=1024, hop_length=512, n_mels=64):
+    """
+    Log-mel spectrogram shaped (…, n_frames, n_mels).
+    """
+    power = np.abs(stft(audio, n_fft, hop_length)) ** 2
+    return np.log(power @ mel_filterbank(sample_rate, n_fft, n_mels) + 1e-10).astype(np.float32)
+
+
+def gcc_phat(audio, n_fft=1024, hop_length=512, max_lag=None):
+    """
+    Frame-wise GCC-PHAT for every microphone pair, computed for all pairs in one call.
+
+    Args:
+        audio (np.ndarray): Float array shaped (…, channels, samples).
+        max_lag (int): Lags kept on each side of zero; all `n_fft` lags if None.
+
+    Returns:
+        np.ndarray: float32 array shaped (…, n_pairs, n_frames, 2 * max_lag + 1), pairs in
+        `itertools.combinations(range(channels), 2)` order, lag 0 in the middle. A peak
+        at lag +k means the second channel of the pair is k samples behind the first.
+    """
+    spectrum = stft(audio, n_fft, hop_length)
+    first, second = np.array(list(combinations(range(audio.shape[-2]), 2))).T
+    cross = spectrum[..., second, :, :] * np.conj(spectrum[..., first, :, :])
+    cross /= np.abs(cross) + 1e-10
+    correlation = np.fft.irfft(cross, n=n_fft, axis=-1)
+    max_lag = n_fft // 2 if max_lag is None else min(int(max_lag), n_fft // 2)
+    # Reorder so negative lags come first
+    return np.concatenate([correlation[..., -max_lag:], correlation[..., :max_lag + 1]], axis=-1).astype(np.float32)
+
+
+def compute_features(audio, config, sample_rate):
+    """
+    Computes `config.kind` for a batch shaped (clips, channels, samples).
+    """
+    if config.kind == "stft":
+        return np.abs(stft(audio, config.n_fft, config.hop_length)).astype(np.float32)
+    if config.kind == "logmel":
+        return log_mel(audio, sample_rate, config.n_fft, config.hop_length, config.n_mels)
+    if config.kind == "gcc_phat":
+        return gcc_phat(audio, config.n_fft, config.hop_length, config.max_lag)
+    raise ValueError(f"Unsupported feature kind: {config.kind}")
+
+
+class FeatureCache:
+    """
+    Content-addressed on-disk cache of computed features.
+
+    Keys combine the SHA-1 of the source audio files with the feature
+    parameters, so renamed or copied recordings still hit the cache and any
+    parameter change misses it. File hashes are remembered by path, size and
+    mtime so unchanged files are not re-read every epoch. When the cache grows
+    beyond `max_bytes`, the least recently used entries are deleted.
+
+    Attributes:
+        cache_dir (str): Directory holding `<key>.npy` files.
+        max_bytes (int): Size limit for all cached features.
+    """
+
+    def __init__(self, cache_dir, max_bytes=20 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hash_index_path = os.path.join(cache_dir, "file_hashes.json")
+        if os.path.exists(self._hash_index_path):
+            with open(self._hash_index_path, "r") as index_file:
+                self._file_hashes = json.load(index_file)
+        else:
+            self._file_hashes = {}
+        self._lock = threading.Lock()
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        known = self._file_hashes.get(os.path.abspath(path))
+        if known is not None and known[0] == stamp:
+            return known[1]
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self._file_hashes[os.path.abspath(path)] = [stamp, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def key(self, sources, config):
+        """
+        Cache key for the channels `sources` (list of `(path, column)`) under `config`.
+        """
+        digest = hashlib.sha1(json.dumps(asdict(config), sort_keys=True).encode())
+        for path, column in sources:
+            digest.update(f"{self.file_hash(path)}:{column};".encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path)
+        return np.load(path, mmap_mode="r")
+
+    def put(self, key, features):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, features)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits into `max_bytes`.
+        """
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npy"):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+
+    def save_hashes(self):
+        with self._lock:
+            tmp_path = f"{self._hash_index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as index_file:
+                json.dump(self._file_hashes, index_file)
+            os.replace(tmp_path, self._hash_index_path)
+
+
+class FeaturePipeline:
+    """
+    Computes features for many recordings in vectorized batches through a `FeatureCache`.
+
+    Attributes:
+        config (FeatureConfig): Feature parameters.
+        cache (FeatureCache): Cache consulted before computing anything.
+        batch_size (int): Clips processed per vectorized call.
+    """
+
+    def __init__(self, config, cache, batch_size=32):
+        self.config = config
+        self.cache = cache
+        self.batch_size = max(1, int(batch_size))
+
+    @staticmethod
+    def load(sources):
+        """
+        Loads the channels `sources` as a float32 (channels, samples) array.
+        """
+        channels = [open_audio(path)[:, column] for path, column in sources]
+        frames = min(len(channel) for channel in channels)
+        audio = np.empty((len(channels), frames), dtype=np.float32)
+        for i, channel in enumerate(channels):
+            np.multiply(channel[:frames], 1.0 / 32768.0, out=audio[i], casting="unsafe")
+        return audio
+
+    def __call__(self, sources, audio=None):
+        """
+        Returns the features of one recording, computing and caching them on a miss.
+        """
+        key = self.cache.key(sources, self.config)
+        features = self.cache.get(key)
+        if features is None:
+            if audio is None:
+                audio = self.load(sources)
+            features = compute_features(audio[None], self.config, self._sample_rate(sources))[0]
+            self.cache.put(key, features)
+        return features
+
+    def _sample_rate(self, sources):
+        return self.config.sample_rate or audio_info(sources[0][0])["sample_rate"]
+
+    def precompute(self, items):
+        """
+        Fills the cache for `items` (dicts with `sources`, see `build_items`).
+
+        Missing clips of equal length and sample rate are stacked and computed in
+        one call per `batch_size` clips.
+
+        Returns:
+            int: Number of recordings that had to be computed.
+        """
+        missing = {}
+        for item in items:
+            key = self.cache.key(item["sources"], self.config)
+            if not os.path.exists(self.cache._path(key)):
+                missing[key] = item["sources"]
+        groups = {}
+        for key, sources in missing.items():
+            audio = self.load(sources)
+            group = groups.setdefault((audio.shape, self._sample_rate(sources)), [])
+            group.append((key, audio))
+            if len(group) == self.batch_size:
+                self._compute_batch(group, self._sample_rate(sources))
+                group.clear()
+        for (_, sample_rate), group in groups.items():
+            if group:
+                self._compute_batch(group, sample_rate)
+        self.cache.save_hashes()
+        self.cache.evict()
+        return len(missing)
+
+    def _compute_batch(self, group, sample_rate):
+        features = compute_features(np.stack([audio for _, audio in group]), self.config, sample_rate)
+        for (key, _), clip_features in zip(group, features):
+            self.cache.put(key, clip_features)
+
+
+if __name__ == "__main__":
+    from recorder.manifest import RecordingManifest
+    from datamodule.recorder_datamodule import build_items
+
+    parser = argparse.ArgumentParser(description="Precompute cached features for a recorder dataset.")
+    parser.add_argument("root", help="Dataset root written by the recorder")
+    parser.add_argument("--cache-dir", default=None, help="Feature cache directory (default: <root>/feature_cache)")
+    parser.add_argument("--kind", default="logmel", choices=["stft", "logmel", "gcc_phat"])
+    parser.add_argument("--n-fft", type=int, default=1024)
+    parser.add_argument("--hop-length", type=int, default=512)
+    parser.add_argument("--n-mels", type=int, default=64)
+    parser.add_argument("--max-lag", type=int, default=None)
+    parser.add_argument("--max-gb", type=float, default=20.0, help="Cache size limit in GB")
+    args = parser.parse_args()
+
+    manifest = RecordingManifest(args.root)
+    items = build_items(manifest)
+    manifest.close()
+    config = FeatureConfig(args.kind, args.n_fft, args.hop_length, args.n_mels, args.max_lag)
+    cache = FeatureCache(args.cache_dir or os.path.join(args.root, "feature_cache"), int(args.max_gb * 1024 ** 3))
+    computed = FeaturePipeline(config, cache).precompute(items)
+    print(f"Computed {computed} of {len(items)} recordings; the rest were cached")
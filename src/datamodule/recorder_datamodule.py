@@ -0,0 +1,329 @@
+import os
+from collections import OrderedDict
+
+import lightning as L
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, WeightedRandomSampler
+
+from datamodule.features import FeatureCache, FeatureConfig, FeaturePipeline
+from recorder.manifest import RecordingManifest
+from recorder.compressed_io import open_audio
+from recorder.stats import _key, load_dataset_stats
+
+
+class _LoaderConfig(dict):
+    """
+    Dict that also allows attribute access, e.g. `loaders_config.train.batch_size`.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+
+def _manifest_filter(value):
+    """
+    Converts a filter from the Hydra config into the form `RecordingManifest` expects.
+
+    `{min: .., max: ..}` mappings become range tuples and sequences become lists.
+    """
+    if hasattr(value, "keys"):
+        return (value.get("min"), value.get("max"))
+    if isinstance(value, str) or not hasattr(value, "__iter__"):
+        return value
+    return list(value)
+
+
+class FileHandleCache:
+    """
+    Small LRU cache of opened recording files: memory maps for WAV, decoded
+    samples for compressed (FLAC, `.dzl`) files.
+
+    DataLoader workers are forked from the main process, so the cache tracks the
+    pid it was filled in and starts empty in every worker instead of sharing
+    (and evicting) the parent's maps.
+
+    Attributes:
+        max_open (int): Maximum number of files kept mapped per process.
+    """
+
+    def __init__(self, max_open=64):
+        self.max_open = max(1, int(max_open))
+        self._pid = None
+        self._maps = OrderedDict()
+
+    def get(self, path):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._maps = OrderedDict()
+        samples = self._maps.get(path)
+        if samples is None:
+            samples = open_audio(path)
+            self._maps[path] = samples
+            if len(self._maps) > self.max_open:
+                self._maps.popitem(last=False)
+        else:
+            self._maps.move_to_end(path)
+        return samples
+
+
+def build_items(manifest, channels=None, **filters):
+    """
+    Groups manifest rows into one item per recording (clip on one device).
+
+    Args:
+        manifest (RecordingManifest): Manifest of the dataset.
+        channels (list): 1-based channels to load; all channels of a recording if None.
+        **filters: Manifest filters, see `RecordingManifest.query_rows`.
+
+    Returns:
+        list: Dicts with `sources` (one `(path, column)` per channel), the 1-based `channels`
+        and the recording's labels.
+    """
+    columns = ("path", "date", "time", "hardware", "channel", "doa", "elevation", "category", "sample_rate", "file_channels")
+    if channels is not None:
+        filters["channel"] = list(channels)
+    rows = manifest.query_rows(columns=columns, order_by="date, time, hardware, channel", **filters)
+    items = OrderedDict()
+    for row in rows:
+        key = (row["date"], row["time"], row["hardware"])
+        item = items.setdefault(key, {
+            "recording": "/".join(key),
+            "hardware": row["hardware"],
+            "doa": row["doa"],
+            "elevation": row["elevation"],
+            "category": row["category"],
+            "sample_rate": row["sample_rate"],
+            "sources": [],
+            "channels": [],
+        })
+        # Interleaved files hold every channel; mono files only column 0
+        column = row["channel"] - 1 if (row["file_channels"] or 1) > 1 else 0
+        item["sources"].append((os.path.join(manifest.root, row["path"]), column))
+        item["channels"].append(row["channel"])
+    expected = len(channels) if channels is not None else None
+    return [item for item in items.values() if expected is None or len(item["sources"]) == expected]
+
+
+class RecordingDataset(Dataset):
+    """
+    Multichannel clips written by `AudioRecorder.save()`.
+
+    Samples are decoded lazily from memory-mapped files on first access, so
+    constructing the dataset never touches the audio.
+
+    Attributes:
+        items (list): Recordings as returned by `build_items`.
+        classes (list): Category names; the label is the index into this list.
+        features (FeaturePipeline): Optional cached feature stage; adds a `features` entry to each sample.
+        normalization (dict): Device type -> per-channel `(mean, std)` arrays; audio of those devices
+            is standardized per channel. Features are computed from the audio before normalization.
+    """
+
+    def __init__(self, items, classes, max_open_files=64, features=None, normalization=None):
+        self.items = items
+        self.classes = list(classes)
+        self.features = features
+        self.normalization = normalization or {}
+        self._class_index = {name: i for i, name in enumerate(self.classes)}
+        self._files = FileHandleCache(max_open_files)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        item = self.items[index]
+        channels = [self._files.get(path)[:, column] for path, column in item["sources"]]
+        frames = min(len(channel) for channel in channels)
+        audio = np.empty((len(channels), frames), dtype=np.float32)
+        for i, channel in enumerate(channels):
+            # Reads the mapped pages and converts int16 to [-1, 1) in one pass
+            np.multiply(channel[:frames], 1.0 / 32768.0, out=audio[i], casting="unsafe")
+        # Features are cached per source file and `precompute()` fills the cache from raw audio,
+        # so they are always computed before normalization
+        features = self.features(item["sources"], audio) if self.features is not None else None
+        if item["hardware"] in self.normalization:
+            mean, std = self.normalization[item["hardware"]]
+            index = np.asarray(item["channels"]) - 1
+            audio -= mean[index, None]
+            audio /= std[index, None]
+        sample = {
+            "audio": torch.from_numpy(audio),
+            "label": self._class_index.get(item["category"], -1),
+            "doa": float(item["doa"]) if item["doa"] is not None else float("nan"),
+            "elevation": float(item["elevation"]) if item["elevation"] is not None else float("nan"),
+        }
+        if features is not None:
+            sample["features"] = torch.from_numpy(np.array(features))
+        return sample
+
+
+def collate_recordings(batch):
+    """
+    Stacks clips into a (batch, channels, frames) tensor, zero-padding shorter clips.
+    """
+    frames = max(sample["audio"].shape[-1] for sample in batch)
+    audio = torch.zeros((len(batch), batch[0]["audio"].shape[0], frames), dtype=torch.float32)
+    lengths = torch.empty(len(batch), dtype=torch.long)
+    for i, sample in enumerate(batch):
+        lengths[i] = sample["audio"].shape[-1]
+        audio[i, :, :lengths[i]] = sample["audio"]
+    collated = {
+        "audio": audio,
+        "lengths": lengths,
+        "label": torch.tensor([sample["label"] for sample in batch], dtype=torch.long),
+        "doa": torch.tensor([sample["doa"] for sample in batch], dtype=torch.float32),
+        "elevation": torch.tensor([sample["elevation"] for sample in batch], dtype=torch.float32),
+    }
+    if "features" in batch[0]:
+        # Feature frames follow the clip length, so pad along the frame axis as well
+        shape = [max(sizes) for sizes in zip(*(sample["features"].shape for sample in batch))]
+        features = torch.zeros((len(batch), *shape), dtype=batch[0]["features"].dtype)
+        for i, sample in enumerate(batch):
+            features[(i, *(slice(0, size) for size in sample["features"].shape))] = sample["features"]
+        collated["features"] = features
+    return collated
+
+
+class RecorderDataModule(L.LightningDataModule):
+    """
+    LightningDataModule over a dataset tree written by the recorder.
+
+    Recordings are selected through the SQLite manifest (`recorder.manifest`),
+    which is rebuilt from the filenames if it does not exist yet.
+
+    Attributes:
+        root (str): Dataset root (the recorder's `output_dir`).
+        channels (list): 1-based channels to load, or None for all.
+        classes (list): Category names used as class labels.
+        loaders_config (dict): DataLoader arguments for `train`, `valid` and `test`.
+        features (dict): Optional `FeatureConfig` fields plus `cache_dir` and `cache_max_gb`;
+            features are then computed once and served from the on-disk cache.
+        normalize (bool): Standardize each channel's audio with the mean/std from the dataset statistics files
+            (cached features stay computed from the raw audio).
+        balanced_sampling (bool): Draw training clips with weights inverse to their category's clip count.
+    """
+
+    def __init__(
+        self,
+        root="datasets",
+        channels=None,
+        classes=None,
+        filters=None,
+        val_split=0.1,
+        test_split=0.1,
+        seed=42,
+        max_open_files=64,
+        loaders_config=None,
+        features=None,
+        normalize=False,
+        balanced_sampling=False,
+    ):
+        super().__init__()
+        self.root = root
+        self.channels = list(channels) if channels is not None else None
+        self.classes = list(classes) if classes is not None else None
+        self.filters = {column: _manifest_filter(value) for column, value in dict(filters or {}).items()}
+        self.val_split = val_split
+        self.test_split = test_split
+        self.seed = seed
+        self.max_open_files = max_open_files
+        default_loader = {"batch_size": 16, "num_workers": 0, "shuffle": False, "pin_memory": False}
+        loaders_config = loaders_config or {}
+        self.loaders_config = _LoaderConfig({
+            split: _LoaderConfig({**default_loader, "shuffle": split == "train", **dict(loaders_config.get(split, {}))})
+            for split in ("train", "valid", "test")
+        })
+        self.features = None
+        if features:
+            features = dict(features)
+            cache_dir = features.pop("cache_dir", None) or os.path.join(root, "feature_cache")
+            cache_max_gb = features.pop("cache_max_gb", 20)
+            self.features = FeaturePipeline(FeatureConfig(**features), FeatureCache(cache_dir, int(cache_max_gb * 1024 ** 3)))
+        self.normalize = normalize
+        self.balanced_sampling = balanced_sampling
+        self.train_sampler = None
+        self.train_dataset = None
+        self.val_dataset = None
+        self.test_dataset = None
+
+    def prepare_data(self):
+        manifest = RecordingManifest(self.root)
+        if manifest.count() == 0:
+            manifest.rebuild()
+        manifest.close()
+
+    def _load_items(self):
+        manifest = RecordingManifest(self.root)
+        try:
+            items = build_items(manifest, self.channels, **self.filters)
+        finally:
+            manifest.close()
+        if self.classes is None:
+            self.classes = sorted({item["category"] for item in items if item["category"] is not None})
+        return items
+
+    def setup(self, stage=None):
+        if self.train_dataset is not None:
+            return
+        items = self._load_items()
+        order = np.random.default_rng(self.seed).permutation(len(items))
+        n_test = int(len(items) * self.test_split)
+        n_val = int(len(items) * self.val_split)
+        splits = np.split(order, [n_test, n_test + n_val])
+        test_items, val_items, train_items = ([items[i] for i in split] for split in splits)
+        if self.features is not None:
+            # Fill the cache in vectorized batches up front instead of clip by clip in the workers
+            self.features.precompute(items)
+        # Normalization constants and sampling weights come from the running statistics, not a pass over the audio
+        stats = load_dataset_stats(self.root) if self.normalize or self.balanced_sampling else {}
+        normalization = None
+        if self.normalize:
+            normalization = {
+                hardware: (device_stats.channels.mean.astype(np.float32), np.maximum(device_stats.channels.std, 1e-8).astype(np.float32))
+                for hardware, device_stats in stats.items() if device_stats.channels is not None
+            }
+            missing = {item["hardware"] for item in items} - set(normalization)
+            if missing:
+                print(f"No dataset statistics for {sorted(missing)}; run `python -m recorder.stats {os.path.abspath(self.root)}` from src/ to compute them")
+        if self.balanced_sampling:
+            counts = {}
+            for device_stats in stats.values():
+                for category, count in device_stats.counts["category"].items():
+                    counts[category] = counts.get(category, 0) + count
+            weights = [1.0 / counts.get(_key(item["category"]), 1) for item in train_items]
+            self.train_sampler = WeightedRandomSampler(weights, num_samples=len(train_items), replacement=True)
+        self.train_dataset = RecordingDataset(train_items, self.classes, self.max_open_files, self.features, normalization)
+        self.val_dataset = RecordingDataset(val_items, self.classes, self.max_open_files, self.features, normalization)
+        self.test_dataset = RecordingDataset(test_items, self.classes, self.max_open_files, self.features, normalization)
+
+    @property
+    def num_classes(self):
+        if self.classes is None:
+            self._load_items()
+        return len(self.classes)
+
+    @property
+    def len_trainset(self):
+        self.setup()
+        return len(self.train_dataset)
+
+    def _dataloader(self, dataset, split, sampler=None):
+        config = dict(self.loaders_config[split])
+        config.setdefault("persistent_workers", config.get("num_workers", 0) > 0)
+        if sampler is not None:
+            # The sampler decides the order, so DataLoader must not shuffle as well
+            config.pop("shuffle", None)
+        return DataLoader(dataset, collate_fn=collate_recordings, sampler=sampler, **config)
+
+    def train_dataloader(self):
+        return self._dataloader(self.train_dataset, "train", self.train_sampler)
+
+    def val_dataloader(self):
+        return self._dataloader(self.val_dataset, "valid")
+
+    def test_dataloader(self):
+        return self._dataloader(self.test_dataset, "test")
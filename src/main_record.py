@@ -1,14 +1,17 @@
+# Keep this import list short: everything here runs before the first sample is
+# captured. Training-side utilities (lightning, rich, wandb) must not be reached
+# from here; `python src/benchmarks/bench_startup.py` checks the import budget.
 import hydra
 from omegaconf import DictConfig, OmegaConf
 from recorder.recorder_hardware import RecorderHardware
-from recorder.data_labeler import DataLabeler
+from recorder.monitor import Monitor
+from recorder.multi_device import MultiDeviceRecorder
+from recorder.sweep import SweepCheckpoint, build_plan, run_sweep
+from recorder.trigger import TriggeredRecorder
 from utils.logger import get_logger
-import logging
 import time
 import sys
 import os
-from recorder.record_config import HardwareConfig,RecorderConfig,ExperimentConfig
-import pyrootutils
 from pathlib import Path
 '''
 # Dynamically add the root of the project to the Python path
@@ -22,12 +25,29 @@ sys.path.append(os.path.join(project_root, ".."))
 logging.basicConfig(level=logging.INFO)
 '''
 
-root = pyrootutils.setup_root(
-    search_from=__file__,
-    indicator=[".git"],
-    pythonpath=True,
-    dotenv=True,
-)
+def setup_root(search_from, indicator=".git"):
+    """
+    Finds the project root, adds it to the Python path and loads its `.env` file.
+
+    Same behaviour as `pyrootutils.setup_root(..., pythonpath=True, dotenv=True)`
+    without importing pyrootutils and python-dotenv when there is no `.env` file.
+    """
+    path = Path(search_from).resolve().parent
+    while not (path / indicator).exists():
+        if path.parent == path:
+            raise FileNotFoundError(f"Project root indicator {indicator} not found above {search_from}")
+        path = path.parent
+    os.environ["PROJECT_ROOT"] = str(path)
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+    if (path / ".env").is_file():
+        from dotenv import load_dotenv
+
+        load_dotenv(path / ".env", override=False)
+    return path
+
+
+root = setup_root(__file__)
 
 _HYDRA_PARAMS = {
     "version_base": None,
@@ -49,13 +69,30 @@ def record_audio(cfg: DictConfig):
     logger.info(f"Selected device: {cfg.selected_device}")
     
 
+    # A list of devices records from all of them at once, e.g. selected_device=[hardware1,hardware2]
+    selected_devices = [cfg.selected_device] if isinstance(cfg.selected_device, str) else list(cfg.selected_device)
+
     # Extract the hardware configuration for the selected device
-    hardware_config = cfg.hardware_config.hardware_config[cfg.selected_device]
+    hardware_configs = [cfg.hardware_config.hardware_config[device] for device in selected_devices]
+    hardware_config = hardware_configs[0]
     recorder_config = cfg.recorder_config.recorder
     experiment_config = cfg.experiment_config
-    logger.info(f"Using hardware config: {hardware_config}")
+    logger.info(f"Using hardware config: {hardware_configs}")
     logger.info(f"Using recorder config: {recorder_config}")
     recorder_config.channels= hardware_config.channels
+    sweep_config = experiment_config.get("sweep")
+    sweeping = sweep_config is not None and sweep_config.get("enabled", False)
+    if sweeping and sweep_config.get("streaming", True):
+        # One stream stays open across all sweep points instead of reopening the device per clip
+        recorder_config.streaming = True
+    trigger_mode = recorder_config.get("trigger_mode")
+    if trigger_mode:
+        # Events are cut from the running stream, with its ring buffer as pre-roll
+        recorder_config.streaming = True
+    monitoring = recorder_config.get("monitor", False)
+    if monitoring:
+        # The monitor reads the running stream's ring buffer instead of opening the device again
+        recorder_config.streaming = True
 
     # Generate metadata dictionary
     metadata = {
@@ -65,7 +102,7 @@ def record_audio(cfg: DictConfig):
         "frequency_range": experiment_config.frequency_range,
         "amplitude_range": experiment_config.amplitude_range,
         "experiment_id": experiment_config.experiment_id,
-        "category": experiment_config.selected_categories,
+        "category": list(experiment_config.selected_categories),
         "frequency": experiment_config.frequency,
         "amplitude": experiment_config.amplitude,
 
@@ -74,28 +111,63 @@ def record_audio(cfg: DictConfig):
     }
 
     # Dynamically select the recorder based on the selected device in the config
-    if cfg.selected_device == "hardware1":
-        logger.info("Initializing Recorder for ReSpeaker (Hardware 1)...")
-        recorder = RecorderHardware(hardware_config, recorder_config, metadata)
-    elif cfg.selected_device == "hardware2":
-        logger.info("Initializing Recorder for MiniDSP (Hardware 2)...")
-        recorder = RecorderHardware(hardware_config, recorder_config, metadata)
-    else:
-        raise ValueError(f"Unsupported device: {cfg.selected_device}")
+    recorders = []
+    for device, device_config in zip(selected_devices, hardware_configs):
+        if device == "hardware1":
+            logger.info("Initializing Recorder for ReSpeaker (Hardware 1)...")
+        elif device == "hardware2":
+            logger.info("Initializing Recorder for MiniDSP (Hardware 2)...")
+        elif getattr(device_config, "backend", "sounddevice") != "sounddevice":
+            logger.info(f"Initializing Recorder for {device_config.type} ({device_config.backend} backend)...")
+        else:
+            raise ValueError(f"Unsupported device: {device}")
+        recorders.append(RecorderHardware(device_config, recorder_config, metadata))
+    recorder = recorders[0] if len(recorders) == 1 else MultiDeviceRecorder(recorders)
+    if trigger_mode:
+        if len(recorders) > 1:
+            raise ValueError("Triggered capture supports a single device")
+        recorder = TriggeredRecorder(
+            recorder,
+            mode=trigger_mode,
+            threshold_db=recorder_config.trigger_threshold_db,
+            block_ms=recorder_config.trigger_block_ms,
+            pre_roll_seconds=recorder_config.pre_roll_seconds,
+            hold_seconds=recorder_config.hold_seconds,
+            release_seconds=recorder_config.release_seconds,
+            max_event_seconds=recorder_config.max_event_seconds,
+            timeout=recorder_config.trigger_timeout,
+        )
 
     logger.info(f"Starting experiment: {experiment_config.experiment_id}")
-    
+    monitor = Monitor(recorders, refresh_hz=recorder_config.get("monitor_refresh_hz", 5)) if monitoring else None
+    if monitor is not None:
+        monitor.start()
+
     # Record samples for the given sample count
-    for i in range(experiment_config.sample_count):
-        logger.info(f"Recording sample {i+1}/{experiment_config.sample_count}...")
-        recording = recorder.record()
-        if recording is not None:
-            print("Calling save method ...")
-            recorder.save(recording, f"sample_{i+1}")
-            logger.info(f"Sample {i+1} saved successfully.")
-        else:
-            print("Recording failed; skipping save.")
-        time.sleep(1)
+    try:
+        if sweeping:
+            plan = build_plan(experiment_config)
+            samples_per_point = sweep_config.get("samples_per_point", 1)
+            checkpoint_path = os.path.join(recorder_config.output_dir, sweep_config.get("checkpoint", "sweep_checkpoint.json"))
+            checkpoint = SweepCheckpoint(checkpoint_path, plan, samples_per_point)
+            run_sweep(recorder, metadata, plan, checkpoint, samples_per_point, sweep_config.get("settle_seconds", 0.0), logger)
+            return
+        for i in range(experiment_config.sample_count):
+            logger.info(f"Recording sample {i+1}/{experiment_config.sample_count}...")
+            recording = recorder.record()
+            if recording is not None:
+                print("Calling save method ...")
+                recorder.save(recording, f"sample_{i+1}")
+                logger.info(f"Sample {i+1} saved successfully.")
+            else:
+                print("Recording failed; skipping save.")
+            if not recorder.streaming:
+                # The stream keeps running in streaming mode, so there is nothing to wait for
+                time.sleep(1)
+    finally:
+        if monitor is not None:
+            monitor.stop()
+        recorder.close()
 
 if __name__ == "__main__":
     record_audio()
@@ -0,0 +1,74 @@
+import queue
+import threading
+
+
+class AsyncWriter:
+    """
+    Runs write jobs on background threads fed by a bounded queue.
+
+    `submit()` blocks once `max_pending` jobs are waiting, which throttles the
+    capture loop instead of letting unwritten clips pile up in memory.
+
+    Attributes:
+        num_workers (int): Number of writer threads.
+        max_pending (int): Maximum number of queued jobs before `submit()` blocks.
+        errors (list): Exceptions raised by failed jobs, in completion order.
+    """
+
+    def __init__(self, num_workers=1, max_pending=4):
+        self.num_workers = max(1, int(num_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.errors = []
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._closed = False
+        self._threads = []
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker, name=f"recorder-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                func, args, kwargs = job
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Background write failed: {e}")
+                self.errors.append(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues `func(*args, **kwargs)`; blocks while the queue is full.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncWriter is closed")
+        self._queue.put((func, args, kwargs))
+
+    def pending(self):
+        """
+        Returns the number of jobs waiting in the queue.
+        """
+        return self._queue.qsize()
+
+    def flush(self):
+        """
+        Blocks until every submitted job has finished.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Finishes all pending jobs and stops the writer threads.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,267 @@
+import threading
+import time
+
+import numpy as np
+
+from recorder.wav_io import open_wav_memmap, read_wav_header
+
+
+class CaptureBackend:
+    """
+    Source of multichannel int16 audio for `AudioRecorder`.
+
+    Backends offer the two operations the recorder needs: a blocking one-shot
+    capture (`rec`) and a callback-driven input stream (`open_input_stream`)
+    whose callback has the `sounddevice` signature
+    `callback(indata, frames, time_info, status)`.
+
+    Attributes:
+        name (str): Printable name of the device or source.
+    """
+
+    name = "backend"
+
+    def rec(self, frames, sample_rate, channels, dtype="int16"):
+        raise NotImplementedError
+
+    def open_input_stream(self, sample_rate, channels, dtype, blocksize, callback):
+        raise NotImplementedError
+
+    def validate(self, sample_rate, channels, dtype="int16"):
+        """
+        Checks up front that the source can deliver `channels` channels at `sample_rate`; raises ValueError if not.
+        """
+
+
+class SoundDeviceBackend(CaptureBackend):
+    """
+    Captures from a PortAudio device through `sounddevice`.
+
+    `sounddevice` is imported on first use so simulated backends work on
+    machines without PortAudio. The configured `device_id` may be a PortAudio
+    index, a name pattern or a USB id; it is resolved against the process's
+    cached device table (see `recorder.devices`). If opening the device fails,
+    the table is invalidated and the device resolved and opened once more, which
+    picks up a device that was replugged under a new index.
+
+    Attributes:
+        device (int | str): Configured device spec.
+        device_id (int): Resolved PortAudio index; None until resolved, or for the default input.
+    """
+
+    def __init__(self, device_id):
+        self.device = device_id
+        self.device_id = None
+        self._resolved = False
+        self.name = str(device_id)
+
+    def _resolve(self, sample_rate, channels, dtype):
+        from recorder.devices import resolve_device
+
+        self.device_id = resolve_device(self.device, channels, sample_rate, dtype)
+        self._resolved = True
+
+    def validate(self, sample_rate, channels, dtype="int16"):
+        self._resolve(sample_rate, channels, dtype)
+
+    def _with_device(self, sample_rate, channels, dtype, operation):
+        import sounddevice as sd
+
+        from recorder.devices import invalidate
+
+        if not self._resolved:
+            self._resolve(sample_rate, channels, dtype)
+        try:
+            return operation()
+        except sd.PortAudioError:
+            invalidate()
+            self._resolve(sample_rate, channels, dtype)
+            return operation()
+
+    def rec(self, frames, sample_rate, channels, dtype="int16"):
+        import sounddevice as sd
+
+        def capture():
+            recording = sd.rec(frames, samplerate=sample_rate, channels=channels, dtype=dtype, device=self.device_id)
+            sd.wait()  # Wait for the recording to finish
+            return recording
+
+        return self._with_device(sample_rate, channels, dtype, capture)
+
+    def open_input_stream(self, sample_rate, channels, dtype, blocksize, callback):
+        import sounddevice as sd
+
+        from recorder.devices import register_stream
+
+        return self._with_device(sample_rate, channels, dtype, lambda: register_stream(sd.InputStream(
+            samplerate=sample_rate,
+            channels=channels,
+            dtype=dtype,
+            device=self.device_id,
+            blocksize=blocksize,
+            callback=callback,
+        )))
+
+
+class _TimeInfo:
+    """
+    Stand-in for the PortAudio time info struct passed to stream callbacks.
+    """
+
+    def __init__(self, adc_time):
+        self.inputBufferAdcTime = adc_time
+        self.currentTime = time.monotonic()
+        self.outputBufferDacTime = 0.0
+
+
+class _SimulatedStream:
+    """
+    Thread that pulls blocks from a simulated source and feeds a stream callback.
+
+    With `speed` 1.0 blocks are delivered in real time, larger values deliver
+    them faster and 0 as fast as the consumer keeps up.
+    """
+
+    def __init__(self, source, sample_rate, channels, blocksize, callback, speed):
+        self.source = source
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize or max(1, sample_rate // 100)
+        self.callback = callback
+        self.speed = speed
+        self._running = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        frame = 0
+        start = time.monotonic()
+        while self._running.is_set():
+            block = self.source.read(frame, self.blocksize, self.sample_rate, self.channels)
+            self.callback(block, len(block), _TimeInfo(start + frame / self.sample_rate), None)
+            frame += len(block)
+            if self.speed > 0:
+                delay = start + frame / (self.sample_rate * self.speed) - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="simulated-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+
+class SimulatedBackend(CaptureBackend):
+    """
+    Base for backends that generate audio in Python instead of reading a device.
+
+    Attributes:
+        speed (float): Playback speed relative to real time; 0 means unthrottled.
+    """
+
+    def __init__(self, speed=1.0):
+        self.speed = float(speed)
+
+    def read(self, frame, frames, sample_rate, channels):
+        """
+        Returns `frames` int16 frames starting at absolute frame index `frame`.
+        """
+        raise NotImplementedError
+
+    def rec(self, frames, sample_rate, channels, dtype="int16"):
+        recording = self.read(0, frames, sample_rate, channels)
+        if self.speed > 0:
+            time.sleep(frames / (sample_rate * self.speed))
+        return recording
+
+    def open_input_stream(self, sample_rate, channels, dtype, blocksize, callback):
+        return _SimulatedStream(self, sample_rate, channels, blocksize, callback, self.speed)
+
+
+class FileReplayBackend(SimulatedBackend):
+    """
+    Replays a WAV file in a loop, e.g. `test.wav`.
+
+    Missing channels are filled by repeating the file's channels and surplus
+    channels are dropped. The file is not resampled.
+    """
+
+    def __init__(self, path, speed=1.0):
+        super().__init__(speed)
+        self.path = path
+        self.name = f"replay:{path}"
+        self.samples = open_wav_memmap(path)
+        self.file_sample_rate = read_wav_header(path)["sample_rate"]
+        self._warned = False
+
+    def read(self, frame, frames, sample_rate, channels):
+        if sample_rate != self.file_sample_rate and not self._warned:
+            print(f"Replaying {self.path} recorded at {self.file_sample_rate} Hz as {sample_rate} Hz")
+            self._warned = True
+        rows = np.arange(frame, frame + frames) % len(self.samples)
+        columns = np.arange(channels) % self.samples.shape[1]
+        return np.ascontiguousarray(self.samples[rows][:, columns])
+
+
+class SyntheticBackend(SimulatedBackend):
+    """
+    Generates a sine tone plus white noise on every channel.
+
+    Frequency and amplitude are read from the experiment metadata on every
+    block, so they follow the metadata of the clip being recorded.
+
+    Attributes:
+        metadata (callable): Returns the current metadata dict (`frequency` in Hz, `amplitude` as a fraction of full scale).
+        noise_level (float): Standard deviation of the noise as a fraction of full scale.
+        channel_delay (int): Extra delay in samples per channel index, to mimic an array.
+    """
+
+    def __init__(self, metadata, noise_level=0.01, channel_delay=0, speed=1.0, seed=0):
+        super().__init__(speed)
+        self.name = "synthetic"
+        self.metadata = metadata
+        self.noise_level = float(noise_level)
+        self.channel_delay = int(channel_delay)
+        self._rng = np.random.default_rng(seed)
+
+    def read(self, frame, frames, sample_rate, channels):
+        metadata = self.metadata()
+        frequency = float(metadata.get("frequency") or 0.0)
+        amplitude = float(metadata.get("amplitude") or 0.0)
+        t = (np.arange(frame, frame + frames)[:, None] - self.channel_delay * np.arange(channels)) / sample_rate
+        signal = amplitude * np.sin(2 * np.pi * frequency * t)
+        if self.noise_level > 0:
+            signal += self._rng.normal(0.0, self.noise_level, size=signal.shape)
+        return np.clip(signal * 32767.0, -32768, 32767).astype(np.int16)
+
+
+def make_backend(hardware_config, metadata):
+    """
+    Creates the capture backend selected by `hardware_config.backend`.
+
+    Args:
+        hardware_config: Hardware section of the config (`backend`, `device_id`, `replay_file`, ...).
+        metadata (callable): Returns the recorder's current metadata, for the synthetic backend.
+    """
+    backend = getattr(hardware_config, "backend", "sounddevice")
+    speed = getattr(hardware_config, "speed", 1.0)
+    if backend == "sounddevice":
+        return SoundDeviceBackend(getattr(hardware_config, "device_id", None))
+    if backend == "file":
+        return FileReplayBackend(hardware_config.replay_file, speed=speed)
+    if backend == "synthetic":
+        return SyntheticBackend(
+            metadata,
+            noise_level=getattr(hardware_config, "noise_level", 0.01),
+            channel_delay=getattr(hardware_config, "channel_delay", 0),
+            speed=speed,
+        )
+    raise ValueError(f"Unsupported capture backend: {backend}")
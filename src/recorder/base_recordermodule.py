@@ -1,9 +1,21 @@
-import sounddevice as sd
 import numpy as np
 import os
 import wave
 import datetime
-import json  # To handle appending labels as a list
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from recorder.async_writer import AsyncWriter
+from recorder.backends import make_backend
+from recorder.compressed_io import EXTENSIONS, flac_available, write_audio
+from recorder.doa import make_estimator
+from recorder.gain import GainStage
+from recorder.health import CaptureHealth
+from recorder.label_store import open_label_store
+from recorder.manifest import RecordingManifest
+from recorder.resample import PolyphaseResampler
+from recorder.shm_capture import ProcessCapture
+from recorder.stats import DatasetStats, stats_path
+from recorder.stream_capture import StreamingCapture
 class AudioRecorder:
     """
     Base class for handling audio recording from hardware devices.
@@ -14,11 +26,18 @@ class AudioRecorder:
         channels (int): Number of channels to record.
         device_id (str): Device ID for the hardware.
         gain (float): Gain value for the device.
+        sample_rate (int): Capture rate; the hardware config's `sample_rate`, else the recorder config's.
+        output_sample_rate (int): Rate of the saved files (`target_sample_rate` if set).
+        health (CaptureHealth): Overflow, callback timing and queue depth counters of this device.
+        stats (DatasetStats): Running per-channel/per-category statistics of the saved clips, or None.
+        doa_estimator (DOAEstimator): Checks every saved clip against the configured DOA when `doa_check` is set.
 
     Methods:
         __init__(hardware_config, config, metadata): Initializes the recorder with hardware info, config, and metadata.
         record(): Records multi-channel audio.
         save(): Saves each channel of the recording with metadata.
+        flush(): Waits until all queued recordings are written.
+        close(): Flushes pending writes and stops the capture stream.
     """
 
     def __init__(self, hardware_config, config, metadata):
@@ -36,99 +55,356 @@ class AudioRecorder:
             raise ValueError("the 'type' attribute is mssing in both hardware and config")
         self.channels = getattr(hardware_config, "channels", config.channels)
         self.gain = getattr(hardware_config, "gain", config.gain)
+        self.gain_units = getattr(config, "gain_units", "linear")
+        # Capture at the device's native rate; `target_sample_rate` resamples what is saved
+        self.sample_rate = getattr(hardware_config, "sample_rate", None) or config.sample_rate
+        self.output_sample_rate = getattr(config, "target_sample_rate", None) or self.sample_rate
+        self.resampler = None
+        if self.output_sample_rate != self.sample_rate:
+            self.resampler = PolyphaseResampler(self.sample_rate, self.output_sample_rate, self.channels)
+        # Capture source selected by `hardware_config.backend` (sounddevice, file or synthetic)
+        self.backend = make_backend(hardware_config, lambda: self.metadata)
+        # Resolves name/USB id device specs and fails now, not at the first capture, if the
+        # device is missing or cannot record this many channels at this rate
+        self.backend.validate(self.sample_rate, self.channels)
+        # Plain copy of the hardware fields, from which a capture process rebuilds the backend
+        self.hardware_fields = dict(hardware_config) if hasattr(hardware_config, "keys") else dict(vars(hardware_config))
+        self.streaming = getattr(config, "streaming", False)
+        self.stream = None
+        # Overflow, callback timing and queue depth counters; see `health_format` for session dumps
+        self.health = CaptureHealth(self.type)
+        self.health_format = getattr(config, "health_format", None)
+        if self.health_format not in (None, "json", "prometheus"):
+            raise ValueError(f"Unsupported health format: {self.health_format}")
+        # Optional background writer so disk I/O overlaps with the next capture
+        writer_threads = getattr(config, "writer_threads", 0)
+        self.writer = AsyncWriter(writer_threads, getattr(config, "writer_queue_size", 4)) if writer_threads else None
+        self.label_store = open_label_store(
+            config.output_dir,
+            getattr(config, "label_format", "jsonl"),
+            fsync_every=getattr(config, "label_fsync_every", 16),
+            fsync_interval=getattr(config, "label_fsync_interval", 5.0),
+        )
+        self.manifest = RecordingManifest(config.output_dir) if getattr(config, "manifest", False) else None
+        # Updated in save() and written on flush()/close(); `python -m recorder.stats <root>` (from src/) rebuilds them from the audio
+        self.stats = None
+        if getattr(config, "dataset_stats", False):
+            self.stats = DatasetStats(self.type, stats_path(config.output_dir, self.type))
+        # SRP-PHAT label QA; runs in the writer thread together with the file writes
+        self.doa_estimator = None
+        self.doa_tolerance = getattr(config, "doa_tolerance", 20.0)
+        self.doa_mismatches = 0
+        if getattr(config, "doa_check", False):
+            self.doa_estimator = make_estimator(hardware_config, self.type)
+            if self.doa_estimator is None or len(self.doa_estimator.positions) != self.channels:
+                print(f"No microphone geometry with {self.channels} channels for {self.type}; set mic_positions in its hardware config to check DOAs")
+                self.doa_estimator = None
+        self.output_layout = getattr(config, "output_layout", "per_channel")
+        if self.output_layout not in ("per_channel", "interleaved"):
+            raise ValueError(f"Unsupported output layout: {self.output_layout}")
+        self.output_format = getattr(config, "output_format", "wav")
+        if self.output_format not in EXTENSIONS:
+            raise ValueError(f"Unsupported output format: {self.output_format}")
+        if self.output_format == "flac" and not flac_available():
+            print("soundfile is not installed; writing lossless delta+zlib (.dzl) files instead of FLAC")
+            self.output_format = "dzip"
+        # Compressed files are encoded in worker processes so encoding keeps up across all channels.
+        # Spawned rather than forked, since the capture and writer threads are already running.
+        encoder_processes = getattr(config, "encoder_processes", 0)
+        self.encoder = None
+        if encoder_processes and self.output_format in ("flac", "dzip"):
+            self.encoder = ProcessPoolExecutor(encoder_processes, mp_context=multiprocessing.get_context("spawn"))
+
+    @property
+    def gain_stage(self):
+        """
+        Gain stage for the current `gain`, rebuilt when the gain or channel count changes.
+        """
+        gain = list(self.gain) if hasattr(self.gain, "__len__") else self.gain
+        stage = getattr(self, "_gain_stage", None)
+        if stage is None or stage.configured.tolist() != np.broadcast_to(gain, (self.channels,)).tolist() or stage.units != self.gain_units:
+            stage = self._gain_stage = GainStage(gain, self.channels, units=self.gain_units)
+        return stage
+
+    def start_stream(self):
+        """
+        Opens the long-lived input stream used in streaming mode.
+        """
+        if self.stream is None:
+            buffer_seconds = getattr(self.config, "buffer_seconds", 4 * self.config.duration)
+            blocksize = getattr(self.config, "blocksize", 0)
+            if getattr(self.config, "capture_process", False):
+                # Stream callback in its own process, writing into a shared-memory ring buffer
+                self.stream = ProcessCapture(
+                    self.backend,
+                    self.hardware_fields,
+                    lambda: self.metadata,
+                    self.sample_rate,
+                    self.channels,
+                    buffer_seconds=buffer_seconds,
+                    blocksize=blocksize,
+                    health=self.health,
+                )
+            else:
+                self.stream = StreamingCapture(
+                    self.backend,
+                    self.sample_rate,
+                    self.channels,
+                    buffer_seconds=buffer_seconds,
+                    blocksize=blocksize,
+                    health=self.health,
+                )
+        self.stream.start()
+
+    def discard_buffered(self):
+        """
+        Drops audio captured but not yet read in streaming mode, e.g. after the setup changed.
+        """
+        if self.stream is not None:
+            self.stream.discard_buffered()
+
+    def flush(self):
+        """
+        Blocks until every recording handed to `save()` has been written.
+        """
+        if self.writer is not None:
+            self.writer.flush()
+        self.label_store.flush()
+        if self.stats is not None:
+            self.stats.save()
+
+    @property
+    def health_path(self):
+        """
+        File the capture health counters are dumped to, or None if `health_format` is unset.
+        """
+        if self.health_format is None:
+            return None
+        extension = "prom" if self.health_format == "prometheus" else "json"
+        return os.path.join(self.config.output_dir, f"capture_health_{self.type}.{extension}")
+
+    def dump_health(self):
+        if self.health_path is not None:
+            os.makedirs(self.config.output_dir, exist_ok=True)
+            self.health.dump(self.health_path)
+
+    def close(self):
+        """
+        Writes out pending recordings, syncs the labels and stops the input stream if one is open.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        if self.encoder is not None:
+            self.encoder.shutdown()
+        self.label_store.close()
+        if self.stats is not None:
+            self.stats.save()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.stream is not None:
+            self.stream.stop()
+        self.dump_health()
+        if self.health.flagged_clips:
+            print(f"{self.health.flagged_clips} of {self.health.clips} clips from device {self.device_id} contain overflows or dropped frames")
+        if self.doa_mismatches:
+            print(f"{self.doa_mismatches} clips from device {self.device_id} disagree with their configured DOA (doa_mismatch in the labels)")
 
     def record(self):
         """
         Records multi-channel audio from a specified device.
+
+        In streaming mode the clip is cut from the running stream, so consecutive
+        calls return back-to-back audio without reopening the device.
         """
         print(f"Recording from device {self.device_id} for {self.config.duration} seconds.")
         print(f"using device ID:{self.device_id}")
+        if self.streaming:
+            try:
+                self.start_stream()
+                recording = self.stream.read_clip(int(self.config.duration * self.sample_rate))
+                if recording is None:
+                    print(f"Timed out waiting for audio from device {self.device_id}")
+                return recording
+            except Exception as e:
+                print(f"An error occurred during recording {self.device_id}: {e}")
+                return None
         try:
             # Start recording
-            recording = sd.rec(
-                int(self.config.duration * self.config.sample_rate),
-                samplerate=self.config.sample_rate,
-                channels=self.channels,
+            recording = self.backend.rec(
+                int(self.config.duration * self.sample_rate),
+                self.sample_rate,
+                self.channels,
                 dtype='int16',
-                device=self.device_id
             )
-            sd.wait()  # Wait for the recording to finish
             return recording
         except Exception as e:
             print(f"An error occurred during recording {self.device_id}: {e}")
             return None
 
-    def save(self, recording, filename):
-    
+    def save(self, recording, filename, timestamp=None, extra_labels=None):
+        """
+        Saves a recording with its metadata.
+
+        With `writer_threads` set the recording is handed to the background writer
+        and this returns immediately; it only blocks when the write queue is full.
+        The gain is applied to `recording` in place, so the caller must not reuse it.
+
+        Args:
+            recording (np.ndarray): (frames, channels) int16 samples.
+            filename (str): Name of the sample, for logging.
+            timestamp (datetime.datetime): Time used for folders and filenames; defaults to now.
+            extra_labels (dict): Additional fields stored in the label entry.
+        """
+        # Snapshot time and metadata now so queued clips are labelled as captured
+        timestamp = timestamp or datetime.datetime.now()
+        metadata = dict(self.metadata)
+        if self.stream is not None and self.stream.clip_health is not None:
+            # Mark clips whose samples were hit by an overflow or dropped frames
+            extra_labels = {**self.stream.clip_health, **(extra_labels or {})}
+        if self.writer is not None:
+            self.writer.submit(self._write_recording, recording, metadata, timestamp, extra_labels)
+            self.health.record_writer_queue(self.writer.pending())
+        else:
+            self._write_recording(recording, metadata, timestamp, extra_labels)
+        self.dump_health()
+
+    def _write_recording(self, recording, metadata, timestamp, extra_labels=None):
         # Generate timestamp for the experiment folder (e.g., 2024-11-26_14-30-00)
-        experiment_timestamp = datetime.datetime.now().strftime("%Y-%m-%d")
+        experiment_timestamp = timestamp.strftime("%Y-%m-%d")
         experiment_folder = os.path.join(self.config.output_dir, experiment_timestamp)
 
         # Create the experiment folder if it doesn't exist
         os.makedirs(experiment_folder, exist_ok=True)
 
-        # Apply gain to recording
-        recording = (recording * self.gain).astype(np.int16)
+        # Triggered events vary in length; fixed-length clips keep the configured duration
+        if len(recording) == int(self.config.duration * self.sample_rate):
+            duration = self.config.duration
+        else:
+            duration = round(len(recording) / self.sample_rate, 3)
 
-        # Get the current date and time for unique filenames
-        current_time = datetime.datetime.now().strftime("%H-%M-%S")
+        # Apply gain to recording in place, saturating instead of wrapping around
+        gain_stage = self.gain_stage
+        recording, clipped = gain_stage.apply(recording)
+        if clipped.any():
+            print(f"Clipped samples per channel: {clipped.tolist()}")
+        if self.resampler is not None:
+            # Block-wise polyphase resampling of the clip, off the capture path when a writer thread runs this
+            recording = self.resampler.resample(recording)
+        if gain_stage.per_channel:
+            gain = gain_stage.configured.tolist()
+            # Per-channel gains are joined with '+' in the filename
+            gain_tag = "+".join(f"{g:g}" for g in gain)
+        else:
+            gain = self.gain if not hasattr(self.gain, "__len__") else float(gain_stage.configured[0])
+            gain_tag = gain
+
+        # Get the current date and time for unique filenames; microseconds keep clips and triggered
+        # events that start within the same second apart
+        current_time = timestamp.strftime("%H-%M-%S-%f")
         current_folder = os.path.join(experiment_folder, current_time)
         # create subfolder for the run
         os.makedirs(current_folder, exist_ok=True)
 
-        # Save a file for each channel with metadata in the filename
-        for channel in range(self.channels):
-            # Generate filename using metadata
-            filename = f"{experiment_timestamp}_{self.type}_ch{channel+1}_DOA{self.metadata['doa']}_elev{self.metadata['elevation']}_cat{'category'}_freq{self.metadata['frequency']}_gain{self.gain}_amp{self.metadata['amplitude']}_len{self.config.duration}_{current_time}.wav"
-            
-            # Construct file path in the experiment folder
-            file_path = os.path.join(current_folder, filename)
-
-            channel_data = recording[:, channel]
-            with wave.open(file_path, "w") as wf:
-                wf.setnchannels(1)  # Mono channel
-                wf.setsampwidth(2)  # 16-bit PCM
-                wf.setframerate(self.config.sample_rate)
-                wf.writeframes(channel_data.tobytes())
-            
-            print(f"Saved channel {channel+1} to {file_path}")
-        
         # Ensure `category` is a string
-        category = self.metadata.get("category")
+        category = metadata.get("category")
         if isinstance(category, list):
             category = ", ".join(map(str, category))  # Convert list to comma-separated string
         elif not isinstance(category, (str, type(None))):
             category = str(category)
+        # Underscores separate the filename fields, so join multiple categories with '+'
+        category_tag = (category or "").replace(", ", "+").replace("_", "-")
 
-        # Create a dictionary for this experiment's metadata
-        label_entry = {
-            "doa": self.metadata.get("doa"),
-            "elevation": self.metadata.get("elevation"),
-            "frequency": self.metadata.get("frequency"),
-            "amplitude": self.metadata.get("amplitude"),
-            "category": category,
-            "gain": self.gain,
-            "duration": self.config.duration,
-        }
-
-        # Define the label file path
-        label_file_path = os.path.join(self.config.output_dir, "experiment_labels.json")
+        # Filenames differ only in the channel field
+        def channel_path(channel_tag):
+            filename = f"{experiment_timestamp}_{self.type}_ch{channel_tag}_DOA{metadata['doa']}_elev{metadata['elevation']}_cat{category_tag}_freq{metadata['frequency']}_gain{gain_tag}_amp{metadata['amplitude']}_len{duration}_{current_time}{EXTENSIONS[self.output_format]}"
+            # Construct file path in the experiment folder
+            return os.path.join(current_folder, filename)
 
-        # Load the existing label file or initialize an empty list
-        if os.path.exists(label_file_path):
-            with open(label_file_path, 'r') as label_file:
-                try:
-                    label_data = json.load(label_file)
-                except json.JSONDecodeError:
-                    label_data = []  # If file exists but is empty or corrupted, initialize it
+        file_paths = []
+        if self.output_layout == "interleaved":
+            # One multichannel file written straight from the capture buffer
+            file_path = channel_path(f"1-{self.channels}")
+            write_audio(file_path, recording, self.output_sample_rate, self.output_format, executor=self.encoder)
+            print(f"Saved channels 1-{self.channels} to {file_path}")
+            file_paths = [file_path] * self.channels
+        elif self.output_format in ("flac", "dzip"):
+            # One compressed file per channel, encoded in parallel when a process pool is configured
+            file_paths = [channel_path(channel + 1) for channel in range(self.channels)]
+            channels = [np.ascontiguousarray(recording[:, channel]) for channel in range(self.channels)]
+            if self.encoder is not None:
+                futures = [self.encoder.submit(write_audio, path, data, self.output_sample_rate, self.output_format)
+                           for path, data in zip(file_paths, channels)]
+                for future in futures:
+                    future.result()
+            else:
+                for path, data in zip(file_paths, channels):
+                    write_audio(path, data, self.output_sample_rate, self.output_format)
+            print(f"Saved channels 1-{self.channels} to {os.path.dirname(file_paths[0])}")
         else:
-            label_data = []
+            # Save a file for each channel with metadata in the filename
+            for channel in range(self.channels):
+                file_path = channel_path(channel + 1)
+
+                channel_data = recording[:, channel]
+                with wave.open(file_path, "w") as wf:
+                    wf.setnchannels(1)  # Mono channel
+                    wf.setsampwidth(2)  # 16-bit PCM
+                    wf.setframerate(self.output_sample_rate)
+                    wf.writeframes(channel_data.tobytes())
+
+                print(f"Saved channel {channel+1} to {file_path}")
+                file_paths.append(file_path)
 
-        # Append the new label entry to the list
-        label_data.append(label_entry)
+        manifest_rows = []
+        for channel, file_path in enumerate(file_paths):
+            manifest_rows.append({
+                "path": file_path,
+                "date": experiment_timestamp,
+                "time": current_time,
+                "hardware": self.type,
+                "channel": channel + 1,
+                "doa": metadata.get("doa"),
+                "elevation": metadata.get("elevation"),
+                "category": category,
+                "frequency": metadata.get("frequency"),
+                "gain": gain[channel] if isinstance(gain, list) else gain,
+                "amplitude": metadata.get("amplitude"),
+                "duration": duration,
+                "sample_rate": self.output_sample_rate,
+                "file_channels": self.channels if self.output_layout == "interleaved" else 1,
+            })
 
-        # Save the updated label data to the file
-        with open(label_file_path, 'w') as label_file:
-            json.dump(label_data, label_file, indent=4)
+        if self.manifest is not None:
+            self.manifest.add_recordings(manifest_rows)
+        if self.stats is not None:
+            self.stats.add(recording, category, metadata.get("doa"))
+
+        # Create a dictionary for this experiment's metadata
+        label_entry = {
+            "doa": metadata.get("doa"),
+            "elevation": metadata.get("elevation"),
+            "frequency": metadata.get("frequency"),
+            "amplitude": metadata.get("amplitude"),
+            "category": category,
+            "gain": gain,
+            "gain_units": self.gain_units,
+            "duration": duration,
+            "clipped_samples": clipped.tolist(),
+            "sample_rate": self.output_sample_rate,
+            # Same key as `shards.recording_key`; lets `verify.py` match labels to their files
+            "recording": f"{experiment_timestamp}/{current_time}/{self.type}",
+        }
+        if self.resampler is not None:
+            label_entry["capture_sample_rate"] = self.sample_rate
+        if self.doa_estimator is not None:
+            doa_check = self.doa_estimator.check(recording, self.output_sample_rate, metadata.get("doa"), self.doa_tolerance)
+            label_entry.update(doa_check)
+            if doa_check.get("doa_mismatch"):
+                self.doa_mismatches += 1
+                print(f"DOA check: estimated {doa_check['doa_estimate']:g} deg, configured {metadata.get('doa')} deg "
+                      f"(error {doa_check['doa_error']:.0f} deg)")
+        if extra_labels:
+            label_entry.update(extra_labels)
 
-        print(f"Updated label file at {label_file_path}")
\ No newline at end of file
+        self.label_store.append(label_entry)
+        print(f"Updated label file at {self.label_store.path}")
@@ -0,0 +1,191 @@
+import importlib.util
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from recorder.wav_io import open_wav_memmap, read_wav_header, write_wav
+
+# Delta+zlib container: magic, compressed blocks, JSON index, index length (u64)
+DZL_MAGIC = b"DZL1"
+EXTENSIONS = {"wav": ".wav", "rf64": ".wav", "flac": ".flac", "dzip": ".dzl"}
+
+
+def flac_available():
+    """
+    Returns True if the optional `soundfile` package (libsndfile) can be imported.
+    """
+    return importlib.util.find_spec("soundfile") is not None
+
+
+def encode_block(block, level=3):
+    """
+    Losslessly compresses an int16 (frames, channels) block.
+
+    Each channel is delta encoded (wrapping int16 differences), then the low and
+    high bytes are grouped so zlib sees the mostly-constant high bytes together.
+    """
+    deltas = np.diff(np.ascontiguousarray(block.T, dtype="<i2"), axis=1, prepend=np.int16(0))
+    shuffled = deltas.view(np.uint8).reshape(deltas.shape[0], -1, 2).transpose(2, 0, 1)
+    return zlib.compress(np.ascontiguousarray(shuffled).tobytes(), level)
+
+
+def decode_block(payload, frames, channels):
+    shuffled = np.frombuffer(zlib.decompress(payload), dtype=np.uint8).reshape(2, channels, frames)
+    deltas = np.ascontiguousarray(shuffled.transpose(1, 2, 0)).view("<i2").reshape(channels, frames)
+    return np.cumsum(deltas, axis=1, dtype=np.int16).T
+
+
+def write_dzl(path, recording, sample_rate, block_frames=16384, level=3, executor=None):
+    """
+    Writes a (frames, channels) int16 array as a delta+zlib (`.dzl`) file.
+
+    Blocks of `block_frames` frames are compressed independently and indexed, so
+    readers can decode any range without touching the rest of the file.
+
+    Args:
+        executor (concurrent.futures.Executor): Optional pool that compresses the blocks in parallel.
+    """
+    if recording.ndim == 1:
+        recording = recording[:, None]
+    blocks = [recording[start:start + block_frames] for start in range(0, len(recording), block_frames)]
+    levels = [level] * len(blocks)
+    payloads = executor.map(encode_block, blocks, levels) if executor is not None else map(encode_block, blocks, levels)
+    offsets = [len(DZL_MAGIC)]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(DZL_MAGIC)
+        for payload in payloads:
+            f.write(payload)
+            offsets.append(offsets[-1] + len(payload))
+        index = json.dumps({
+            "sample_rate": int(sample_rate),
+            "channels": recording.shape[1],
+            "frames": len(recording),
+            "block_frames": block_frames,
+            "offsets": offsets,
+        }).encode()
+        f.write(index)
+        f.write(struct.pack("<Q", len(index)))
+    os.replace(tmp_path, path)
+
+
+class DeltaZlibReader:
+    """
+    Random access to `.dzl` files written by `write_dzl`.
+
+    Only the blocks overlapping a requested range are read and decompressed.
+
+    Attributes:
+        sample_rate (int): Sampling rate in Hz.
+        channels (int): Number of channels.
+        frames (int): Frames per channel.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(DZL_MAGIC)) != DZL_MAGIC:
+                raise ValueError(f"{path} is not a delta+zlib audio file")
+            f.seek(-8, os.SEEK_END)
+            (index_size,) = struct.unpack("<Q", f.read(8))
+            f.seek(-8 - index_size, os.SEEK_END)
+            index = json.loads(f.read(index_size))
+        self.sample_rate = index["sample_rate"]
+        self.channels = index["channels"]
+        self.frames = index["frames"]
+        self.block_frames = index["block_frames"]
+        self.offsets = index["offsets"]
+
+    def __len__(self):
+        return self.frames
+
+    def read(self, start=0, frames=None):
+        """
+        Returns `frames` frames from frame `start` as an int16 (frames, channels) array.
+        """
+        start = min(max(0, int(start)), self.frames)
+        stop = self.frames if frames is None else min(self.frames, start + int(frames))
+        out = np.empty((stop - start, self.channels), dtype=np.int16)
+        if stop == start:
+            return out
+        first, last = start // self.block_frames, (stop - 1) // self.block_frames
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[first])
+            data = f.read(self.offsets[last + 1] - self.offsets[first])
+        for block in range(first, last + 1):
+            block_start = block * self.block_frames
+            block_len = min(self.block_frames, self.frames - block_start)
+            payload = data[self.offsets[block] - self.offsets[first]:self.offsets[block + 1] - self.offsets[first]]
+            samples = decode_block(payload, block_len, self.channels)
+            lo, hi = max(start, block_start), min(stop, block_start + block_len)
+            out[lo - start:hi - start] = samples[lo - block_start:hi - block_start]
+        return out
+
+
+def write_flac(path, recording, sample_rate):
+    import soundfile
+
+    soundfile.write(path, recording, int(sample_rate), format="FLAC", subtype="PCM_16")
+
+
+def write_audio(path, recording, sample_rate, output_format="wav", executor=None):
+    """
+    Writes a recording in `output_format` ("wav", "rf64", "flac" or "dzip").
+
+    Module-level so it can run in a process pool.
+    """
+    if output_format in ("wav", "rf64"):
+        write_wav(path, recording, sample_rate, rf64=output_format == "rf64")
+    elif output_format == "flac":
+        write_flac(path, recording, sample_rate)
+    elif output_format == "dzip":
+        write_dzl(path, recording, sample_rate, executor=executor)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+
+def audio_info(path):
+    """
+    Returns `channels`, `sample_rate` and `frames` of a WAV, FLAC or `.dzl` file.
+    """
+    if path.endswith(".dzl"):
+        reader = DeltaZlibReader(path)
+        return {"channels": reader.channels, "sample_rate": reader.sample_rate, "frames": reader.frames}
+    if path.endswith(".flac"):
+        import soundfile
+
+        info = soundfile.info(path)
+        return {"channels": info.channels, "sample_rate": info.samplerate, "frames": info.frames}
+    header = read_wav_header(path)
+    return {"channels": header["channels"], "sample_rate": header["sample_rate"], "frames": header["frames"]}
+
+
+def read_audio(path, start=0, frames=None):
+    """
+    Reads `frames` frames from sample offset `start` of a WAV, FLAC or `.dzl` file.
+
+    Returns:
+        np.ndarray: int16 (frames, channels) array.
+    """
+    if path.endswith(".dzl"):
+        return DeltaZlibReader(path).read(start, frames)
+    if path.endswith(".flac"):
+        import soundfile
+
+        with soundfile.SoundFile(path) as f:
+            f.seek(start)
+            return f.read(-1 if frames is None else frames, dtype="int16", always_2d=True)
+    samples = open_wav_memmap(path)
+    return np.array(samples[start:None if frames is None else start + frames])
+
+
+def open_audio(path):
+    """
+    Returns the (frames, channels) int16 samples of a file: a memory map for WAV, decoded otherwise.
+    """
+    if path.endswith(".wav"):
+        return open_wav_memmap(path)
+    return read_audio(path)
@@ -1,19 +1,162 @@
 import csv
+import glob
+import importlib.util
 import os
 import logging
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single writer only
+    fcntl = None
+
+COLUMNS = ["filename", "hardware", "channel", "DOA", "elevation", "category", "frequency", "gain", "amplitude", "length"]
+
+
+def parquet_available():
+    """
+    Returns True if the optional `pyarrow` package can be imported.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
 
 class DataLabeler:
-    def __init__(self, labels_file):
+    """
+    Long-lived label writer that buffers rows and writes them in batches.
+
+    Rows passed to `add_labels()` are kept in memory and written once
+    `flush_every` rows are buffered or, checked on each call, `flush_interval`
+    seconds have passed since the last write; every write is fsynced.
+
+    The CSV sink keeps its handle open and holds an exclusive `flock` while
+    writing a batch, so several recorder processes can share one file; the
+    header is written under the same lock by whichever process finds the file
+    empty. The Parquet sink writes every batch as a new part file
+    `<labels_file without .csv>/part-<pid>-<n>.parquet`, renamed into place so
+    readers never see a partial file. It needs no locking, and
+    `pyarrow.dataset` reads the directory as one table.
+
+    Attributes:
+        labels_file (str): CSV file, or the base name of the Parquet part directory.
+        sink (str): "csv" or "parquet".
+        flush_every (int): Buffered rows that trigger a write.
+        flush_interval (float): Seconds after which the next `add_labels()` call writes the buffer.
+    """
+
+    def __init__(self, labels_file, sink="csv", flush_every=64, flush_interval=5.0):
         self.labels_file = labels_file
         self.logger = logging.getLogger(__name__)
-        if not os.path.exists(labels_file):
-            with open(labels_file, mode="w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["filename", "hardware", "channel", "DOA", "elevation", "category", "frequency", "gain", "amplitude", "length"])  # Header row
+        if sink not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported label sink: {sink}")
+        if sink == "parquet" and not parquet_available():
+            self.logger.warning("pyarrow is not installed; writing labels as CSV instead of Parquet")
+            sink = "csv"
+        self.sink = sink
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self._parts = 0
+        self._file = None
+        self._lock = threading.Lock()
+        if sink == "parquet":
+            self.part_dir = os.path.splitext(labels_file)[0]
+            os.makedirs(self.part_dir, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(labels_file) or ".", exist_ok=True)
+            self._file = open(labels_file, mode="a", newline="")
+            self._writer = csv.writer(self._file)
 
     def add_labels(self, metadata, data):
-        with open(self.labels_file, mode="a", newline="") as f:
-            writer = csv.writer(f)
+        """
+        Buffers one row per datum; writes the buffer when it is full or old enough.
+        """
+        with self._lock:
             for datum in data:
-                writer.writerow([datum['filename'], datum['hardware'], datum['channel'], datum['DOA'], datum['elevation'], datum['category'], datum['frequency'], datum['gain'], datum['amplitude'], datum['length']])  # Full metadata
-                self.logger.info(f"Labeled data: {datum['filename']}")
+                self._rows.append([datum[column] for column in COLUMNS])
+                self.logger.debug(f"Labeled data: {datum['filename']}")
+            if len(self._rows) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        """
+        Writes and fsyncs all buffered rows.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        if self.sink == "parquet":
+            self._write_parquet(rows)
+        else:
+            self._write_csv(rows)
+        self.logger.info(f"Wrote {len(rows)} labels to {self.labels_file}")
+
+    def _write_csv(self, rows):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            # Another process may have appended since our last write; the end of the file is authoritative
+            self._file.seek(0, os.SEEK_END)
+            if self._file.tell() == 0:
+                self._writer.writerow(COLUMNS)  # Header row
+            self._writer.writerows(rows)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _write_parquet(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Mixed value types (e.g. DOA ints and floats, category lists) are stored as strings
+        table = pa.table({column: [None if row[i] is None else str(row[i]) for row in rows] for i, column in enumerate(COLUMNS)})
+        path = os.path.join(self.part_dir, f"part-{os.getpid()}-{self._parts:06d}.parquet")
+        self._parts += 1
+        pq.write_table(table, f"{path}.tmp")
+        with open(f"{path}.tmp", "rb") as part_file:
+            os.fsync(part_file.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def close(self):
+        """
+        Writes the remaining rows and closes the CSV handle.
+        """
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_labels(labels_file):
+    """
+    Reads the rows written by `DataLabeler` from the CSV file and/or its Parquet part directory.
+
+    Returns:
+        list: One dict per row, keyed by `COLUMNS`.
+    """
+    rows = []
+    if os.path.exists(labels_file):
+        with open(labels_file, newline="") as f:
+            rows.extend(csv.DictReader(f))
+    parts = sorted(glob.glob(os.path.join(os.path.splitext(labels_file)[0], "part-*.parquet")))
+    if parts:
+        import pyarrow.parquet as pq
+
+        for part in parts:
+            rows.extend(pq.read_table(part).to_pylist())
+    return rows
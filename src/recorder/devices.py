@@ -0,0 +1,240 @@
+import argparse
+import glob
+import os
+import re
+import threading
+import weakref
+
+# "VID_2886&PID_0018" (Windows device ids, also inside longer instance paths) or "2886:0018" (lsusb)
+_WINDOWS_USB_ID = re.compile(r"VID_([0-9A-F]{4})&PID_([0-9A-F]{4})", re.IGNORECASE)
+_LSUSB_ID = re.compile(r"([0-9A-F]{4}):([0-9A-F]{4})", re.IGNORECASE)
+# ALSA device names end in "(hw:<card>,<device>)"
+_ALSA_CARD = re.compile(r"\(hw:(\d+),\d+\)")
+ASOUND_DIR = "/proc/asound"
+
+_lock = threading.Lock()
+_table = None
+_stale = False
+# Input streams opened through `SoundDeviceBackend`; PortAudio is only rescanned while all are closed
+_streams = weakref.WeakSet()
+
+
+def parse_usb_id(spec):
+    """
+    Returns the USB id in `spec` as lowercase "vvvv:pppp", or None if `spec` is not a USB id.
+    """
+    if not isinstance(spec, str):
+        return None
+    match = _WINDOWS_USB_ID.search(spec) or _LSUSB_ID.fullmatch(spec.strip())
+    return f"{match.group(1)}:{match.group(2)}".lower() if match else None
+
+
+def _alsa_usb_ids():
+    # /proc/asound/card<N>/usbid holds "vvvv:pppp" for USB audio cards (Linux only)
+    usb_ids = {}
+    for path in glob.glob(os.path.join(ASOUND_DIR, "card*", "usbid")):
+        card = os.path.basename(os.path.dirname(path))[len("card"):]
+        try:
+            with open(path, "r") as usbid_file:
+                usb_ids[int(card)] = usbid_file.read().strip().lower()
+        except (OSError, ValueError):
+            continue
+    return usb_ids
+
+
+def _hotplug_signature():
+    # The ALSA card list changes when a USB device is plugged in or removed; elsewhere hot-plug is
+    # only noticed through failures
+    try:
+        with open(os.path.join(ASOUND_DIR, "cards"), "r") as cards_file:
+            return cards_file.read()
+    except OSError:
+        return None
+
+
+class DeviceTable:
+    """
+    Snapshot of the input devices PortAudio reports, with their USB ids where known.
+
+    Enumerating devices is slow with many ALSA devices, so the recorder keeps
+    one table per process (see `device_table()`) and resolves every device spec
+    against it.
+
+    Attributes:
+        devices (list): One dict per device: `index`, `name`, `hostapi`, `max_input_channels`,
+            `default_samplerate` and `usb_id` ("vvvv:pppp" or None).
+        signature: Hot-plug signature the table was built under.
+    """
+
+    def __init__(self, devices, signature=None):
+        self.devices = list(devices)
+        self.signature = signature
+
+    @classmethod
+    def query(cls, signature=None):
+        """
+        Enumerates the devices through `sounddevice`.
+        """
+        import sounddevice as sd
+
+        hostapis = [hostapi["name"] for hostapi in sd.query_hostapis()]
+        usb_ids = _alsa_usb_ids()
+        devices = []
+        for index, device in enumerate(sd.query_devices()):
+            card = _ALSA_CARD.search(device["name"])
+            devices.append({
+                "index": index,
+                "name": device["name"],
+                "hostapi": hostapis[device["hostapi"]],
+                "max_input_channels": device["max_input_channels"],
+                "default_samplerate": device["default_samplerate"],
+                "usb_id": usb_ids.get(int(card.group(1))) if card else parse_usb_id(device["name"]),
+            })
+        return cls(devices, signature)
+
+    def inputs(self):
+        return [device for device in self.devices if device["max_input_channels"] > 0]
+
+    def resolve(self, spec, channels=None):
+        """
+        Finds the input device for a `device_id` from the hardware config.
+
+        `spec` is a PortAudio index (int or digit string), a USB id ("VID_2886&PID_0018" or
+        "2886:0018") or a name pattern: a case-insensitive substring, else a regular expression.
+        Among several matches the first with at least `channels` inputs wins.
+
+        Returns:
+            dict: The device's entry in `devices`.
+        """
+        if isinstance(spec, int) or (isinstance(spec, str) and spec.strip().isdigit()):
+            index = int(spec)
+            candidates = [device for device in self.inputs() if device["index"] == index]
+            description = f"index {index}"
+        elif parse_usb_id(spec) is not None:
+            usb_id = parse_usb_id(spec)
+            candidates = [device for device in self.inputs() if device["usb_id"] == usb_id]
+            description = f"USB id {usb_id}"
+        else:
+            pattern = str(spec).lower()
+            candidates = [device for device in self.inputs() if pattern in device["name"].lower()]
+            if not candidates:
+                try:
+                    regex = re.compile(str(spec), re.IGNORECASE)
+                    candidates = [device for device in self.inputs() if regex.search(device["name"])]
+                except re.error:
+                    pass
+            description = f"name {spec!r}"
+        if not candidates:
+            available = "; ".join(f"{device['index']}: {device['name']}" for device in self.inputs()) or "none"
+            raise ValueError(f"No input device matches {description} (inputs: {available})")
+        if channels is not None:
+            wide_enough = [device for device in candidates if device["max_input_channels"] >= channels]
+            if not wide_enough:
+                device = candidates[0]
+                raise ValueError(f"Input device {device['index']} ({device['name']}) has {device['max_input_channels']} "
+                                 f"input channels, {channels} requested")
+            candidates = wide_enough
+        return candidates[0]
+
+
+def _reinitialize_portaudio():
+    """
+    Makes PortAudio enumerate the devices again.
+
+    Returns:
+        bool: False if that is not possible now, in which case the cached table stays in use.
+    """
+    import sounddevice as sd
+
+    # PortAudio enumerates devices only when it is initialized, and sounddevice has no public way to
+    # redo that. These private module functions were checked against sounddevice 0.5.1; if a release
+    # drops or renames them, hot-plugged devices need a restart instead.
+    terminate, initialize = getattr(sd, "_terminate", None), getattr(sd, "_initialize", None)
+    if terminate is None or initialize is None:
+        return False
+    # Reinitializing drops every open stream, so only while none of ours is open
+    if not all(stream.closed for stream in _streams):
+        return False
+    terminate()
+    initialize()
+    return True
+
+
+def device_table(refresh=False):
+    """
+    Returns this process's cached `DeviceTable`.
+
+    The table is rebuilt when `refresh` is set, after `invalidate()`, or when the
+    ALSA card list changed (hot-plug), provided PortAudio can be rescanned; see
+    `_reinitialize_portaudio()`. Otherwise the cached table is returned.
+    """
+    global _table, _stale
+    with _lock:
+        if _table is None:
+            _table = DeviceTable.query(_hotplug_signature())
+            return _table
+        signature = _hotplug_signature()
+        if (refresh or _stale or signature != _table.signature) and _reinitialize_portaudio():
+            _table = DeviceTable.query(signature)
+            _stale = False
+        return _table
+
+
+def invalidate():
+    """
+    Marks the cached table out of date, e.g. after opening a device failed.
+    """
+    global _stale
+    _stale = True
+
+
+def register_stream(stream):
+    _streams.add(stream)
+    return stream
+
+
+def resolve_device(spec, channels=None, sample_rate=None, dtype="int16"):
+    """
+    Resolves a `device_id` spec to a PortAudio index and checks the stream settings up front.
+
+    A spec that does not match the cached table is retried once against a fresh
+    enumeration. With `sample_rate`, `sounddevice.check_input_settings` verifies
+    that the device accepts the channels, rate and dtype, which takes
+    milliseconds instead of failing in the first capture.
+
+    Returns:
+        int: PortAudio device index, or None for PortAudio's default input when `spec` is None.
+
+    Raises:
+        ValueError: No matching device, too few channels, or unsupported settings.
+    """
+    index = None
+    if spec is not None:
+        try:
+            device = device_table().resolve(spec, channels)
+        except ValueError:
+            device = device_table(refresh=True).resolve(spec, channels)
+        index = device["index"]
+    if sample_rate is not None:
+        import sounddevice as sd
+
+        try:
+            sd.check_input_settings(device=index, channels=channels, dtype=dtype, samplerate=sample_rate)
+        except sd.PortAudioError as e:
+            raise ValueError(f"Input device {spec} does not support {channels} channels of {dtype} at {sample_rate} Hz: {e}") from e
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List input devices, or resolve a device_id spec as the recorder would.")
+    parser.add_argument("spec", nargs="?", default=None, help="Index, name pattern or USB id (VID_xxxx&PID_xxxx or xxxx:xxxx)")
+    parser.add_argument("--channels", type=int, default=None)
+    parser.add_argument("--sample-rate", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.spec is None:
+        for device in device_table().inputs():
+            print(f"{device['index']:3d}  {device['name']}  [{device['hostapi']}, {device['max_input_channels']} in, "
+                  f"{device['default_samplerate']:.0f} Hz, usb {device['usb_id'] or '-'}]")
+    else:
+        print(resolve_device(args.spec, args.channels, args.sample_rate))
@@ -0,0 +1,191 @@
+import argparse
+import json
+from itertools import combinations
+
+import numpy as np
+
+SPEED_OF_SOUND = 343.0
+
+
+def _circle(radius, angles_deg, z=0.0):
+    angles = np.radians(angles_deg)
+    return [[radius * np.cos(a), radius * np.sin(a), z] for a in angles]
+
+
+# Microphone positions in metres per device type, one row per recorded channel. The x axis points
+# from the array centre to the first circular microphone, so a DOA of 0 degrees faces that mic and
+# angles grow counter-clockwise seen from above. Rows of NaN are channels without a microphone.
+# Hardware configs can override these with `mic_positions`.
+GEOMETRIES = {
+    # ReSpeaker 4-mic array: four mics on a 32 mm radius circle
+    "ReSpeaker": _circle(0.032, [0, 90, 180, 270]),
+    # miniDSP UMA-8: centre mic on channel 1, six mics on a 43 mm radius circle, channel 8 carries no mic
+    "MiniDSP": [[0.0, 0.0, 0.0]] + _circle(0.043, [0, 60, 120, 180, 240, 300]) + [[np.nan] * 3],
+}
+
+
+def angular_error(a, b):
+    """
+    Absolute difference of two azimuths in degrees, wrapped to [0, 180].
+    """
+    return abs((float(a) - float(b) + 180.0) % 360.0 - 180.0)
+
+
+class DOAEstimator:
+    """
+    SRP-PHAT direction-of-arrival estimator for one microphone geometry.
+
+    For every microphone pair the PHAT-weighted cross-spectra of all frames are
+    averaged, limited to the `band` and turned into one GCC-PHAT curve. All pairs
+    go through a single FFT call, and the curve is upsampled by `upsample` for
+    sub-sample lags. The steered response power of a candidate direction is the sum
+    over pairs of the GCC value at that pair's far-field delay. These delays are
+    precomputed per sample rate in a steering table of integer lag indices and
+    linear interpolation weights, so scanning the whole azimuth/elevation grid is
+    one gather and one sum.
+
+    Attributes:
+        positions (np.ndarray): (channels, 3) microphone positions in metres; NaN rows are skipped.
+        azimuths (np.ndarray): Candidate azimuths in degrees.
+        elevations (np.ndarray): Candidate elevations in degrees. Planar arrays cannot tell up from
+            down, so the default grid only covers the upper half.
+        pairs (np.ndarray): (n_pairs, 2) channel indices of the microphone pairs.
+    """
+
+    def __init__(self, positions, azimuth_step=2.0, elevations=(0, 15, 30, 45, 60, 75, 90), n_fft=1024,
+                 upsample=8, band=(200.0, 8000.0), speed_of_sound=SPEED_OF_SOUND):
+        self.positions = np.asarray(positions, dtype=np.float64)
+        microphones = np.flatnonzero(~np.isnan(self.positions).any(axis=1))
+        if len(microphones) < 2:
+            raise ValueError("DOA estimation needs at least two microphone positions")
+        self.pairs = np.array(list(combinations(microphones, 2)))
+        self.azimuths = np.arange(0.0, 360.0, azimuth_step)
+        self.elevations = np.asarray(elevations, dtype=np.float64)
+        self.n_fft = int(n_fft)
+        self.upsample = int(upsample)
+        self.band = band
+        self.speed_of_sound = speed_of_sound
+        az, el = np.meshgrid(np.radians(self.azimuths), np.radians(self.elevations), indexing="ij")
+        self._directions = np.stack([np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)], axis=-1).reshape(-1, 3)
+        # Far-field delay of the second mic of each pair behind the first, in seconds: (pairs, directions)
+        baselines = self.positions[self.pairs[:, 0]] - self.positions[self.pairs[:, 1]]
+        self._delays = baselines @ self._directions.T / speed_of_sound
+        self._tables = {}
+
+    def steering_table(self, sample_rate):
+        """
+        Returns the integer lag index and interpolation weight of every (pair, direction) at `sample_rate`.
+
+        Lags index the upsampled GCC curve returned by `gcc`, whose centre is lag 0.
+        """
+        table = self._tables.get(sample_rate)
+        if table is None:
+            lags = self._delays * sample_rate * self.upsample + self.n_fft * self.upsample // 2
+            index = np.floor(lags).astype(np.intp)
+            table = self._tables[sample_rate] = (index, (lags - index).astype(np.float32))
+        return table
+
+    def gcc(self, recording, sample_rate):
+        """
+        Frame-averaged GCC-PHAT of every pair, upsampled and with lag 0 at the centre.
+
+        Returns:
+            np.ndarray: float32 (n_pairs, n_fft * upsample + 1) curves.
+        """
+        audio = np.asarray(recording, dtype=np.float32).T
+        n_fft = self.n_fft
+        if audio.shape[1] < n_fft:
+            audio = np.pad(audio, ((0, 0), (0, n_fft - audio.shape[1])))
+        frames = np.lib.stride_tricks.sliding_window_view(audio, n_fft, axis=1)[:, ::n_fft // 2]
+        spectrum = np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=-1)
+        freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+        in_band = (freqs >= self.band[0]) & (freqs <= min(self.band[1], sample_rate / 2))
+        spectrum = spectrum[..., in_band]
+        cross = spectrum[self.pairs[:, 1]] * np.conj(spectrum[self.pairs[:, 0]])
+        cross = (cross / (np.abs(cross) + 1e-10)).mean(axis=1)
+        full = np.zeros((len(self.pairs), n_fft // 2 + 1), dtype=np.complex64)
+        full[:, in_band] = cross
+        correlation = np.fft.irfft(full, n=n_fft * self.upsample, axis=-1)
+        half = n_fft * self.upsample // 2
+        # Negative lags first; one extra sample so interpolation at the last lag stays in range
+        return np.concatenate([correlation[:, -half:], correlation[:, :half + 1]], axis=-1).astype(np.float32)
+
+    def srp_map(self, recording, sample_rate):
+        """
+        Steered response power over the grid, shaped (len(azimuths), len(elevations)).
+        """
+        gcc = self.gcc(recording, sample_rate)
+        index, weight = self.steering_table(sample_rate)
+        rows = np.arange(len(self.pairs))[:, None]
+        power = gcc[rows, index] * (1.0 - weight) + gcc[rows, index + 1] * weight
+        return power.sum(axis=0).reshape(len(self.azimuths), len(self.elevations))
+
+    def estimate(self, recording, sample_rate):
+        """
+        Estimates the direction of the dominant source of an int16 or float (frames, channels) clip.
+
+        Returns:
+            dict: `doa_estimate` and `elevation_estimate` in degrees, and `doa_confidence`, the
+            peak of the SRP map over its mean (about 1 for diffuse noise).
+        """
+        srp = self.srp_map(recording, sample_rate)
+        az, el = np.unravel_index(np.argmax(srp), srp.shape)
+        return {
+            "doa_estimate": float(self.azimuths[az]),
+            "elevation_estimate": float(self.elevations[el]),
+            "doa_confidence": float(srp[az, el] / (np.abs(srp).mean() + 1e-12)),
+        }
+
+    def check(self, recording, sample_rate, doa, tolerance=20.0):
+        """
+        Compares the estimate with the configured `doa`.
+
+        Returns:
+            dict: The `estimate()` fields plus `doa_error` (degrees) and `doa_mismatch`.
+        """
+        result = self.estimate(recording, sample_rate)
+        try:
+            error = angular_error(result["doa_estimate"], doa)
+        except (TypeError, ValueError):
+            return result
+        result["doa_error"] = error
+        result["doa_mismatch"] = error > tolerance
+        return result
+
+
+def make_estimator(hardware_config, device_type, **kwargs):
+    """
+    Builds a `DOAEstimator` from `hardware_config.mic_positions` or the built-in geometry of `device_type`.
+
+    Returns:
+        DOAEstimator: None if neither is available.
+    """
+    positions = getattr(hardware_config, "mic_positions", None)
+    if positions is None:
+        positions = GEOMETRIES.get(device_type)
+    if positions is None:
+        return None
+    return DOAEstimator([list(position) for position in positions], **kwargs)
+
+
+if __name__ == "__main__":
+    from recorder.compressed_io import audio_info, read_audio
+
+    parser = argparse.ArgumentParser(
+        description="Estimate the direction of arrival of recorded clips. Run from src/ as `python -m recorder.doa <paths>`."
+    )
+    parser.add_argument("paths", nargs="+", help="Interleaved recordings (one file holding every channel)")
+    parser.add_argument("--hardware", required=True, choices=sorted(GEOMETRIES), help="Array geometry")
+    parser.add_argument("--doa", type=float, default=None, help="Configured DOA to compare against")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="Allowed error in degrees")
+    args = parser.parse_args()
+
+    estimator = DOAEstimator(GEOMETRIES[args.hardware])
+    for path in args.paths:
+        sample_rate = audio_info(path)["sample_rate"]
+        recording = read_audio(path)
+        if args.doa is None:
+            result = estimator.estimate(recording, sample_rate)
+        else:
+            result = estimator.check(recording, sample_rate, args.doa, args.tolerance)
+        print(json.dumps({"path": path, **result}))
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+class GainStage:
+    """
+    Per-channel gain with saturation for int16 (frames, channels) buffers.
+
+    The buffer is processed in blocks of `block_frames` frames through a small
+    float32 scratch array and written back in place, so applying gain needs
+    roughly the memory of the buffer itself instead of a float64 and an int16
+    copy of it. Samples that exceed the int16 range are clipped rather than
+    wrapped around and counted per channel. The same object can process
+    streaming blocks or whole clips.
+
+    Attributes:
+        configured (np.ndarray): Gain per channel in the configured `units`.
+        gains (np.ndarray): Linear float32 gain per channel.
+        clip_counts (np.ndarray): Clipped samples per channel since creation.
+        block_frames (int): Frames processed per block.
+    """
+
+    def __init__(self, gain, channels, units="linear", block_frames=16384):
+        gains = np.broadcast_to(np.asarray(gain, dtype=np.float64), (channels,))
+        self.configured = gains.copy()
+        self.units = units
+        if units == "db":
+            gains = 10.0 ** (gains / 20.0)
+        elif units != "linear":
+            raise ValueError(f"Unsupported gain units: {units}")
+        self.gains = gains.astype(np.float32)
+        self.unity = bool(np.all(self.gains == 1.0))
+        self.block_frames = int(block_frames)
+        self.clip_counts = np.zeros(channels, dtype=np.int64)
+        self._scratch = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def per_channel(self):
+        return bool(np.any(self.configured != self.configured[0]))
+
+    def _scratch_buffer(self, frames, channels):
+        buffer = getattr(self._scratch, "buffer", None)
+        if buffer is None or buffer.shape[1] != channels or buffer.shape[0] < frames:
+            buffer = np.empty((max(frames, 1), channels), dtype=np.float32)
+            self._scratch.buffer = buffer
+        return buffer[:frames]
+
+    def apply(self, recording, out=None):
+        """
+        Applies the gain to an int16 (frames, channels) buffer.
+
+        Args:
+            recording (np.ndarray): Input samples.
+            out (np.ndarray): Destination int16 buffer; defaults to `recording` (in place).
+
+        Returns:
+            tuple: (out, per-channel clip counts for this buffer).
+        """
+        if out is None:
+            out = recording if recording.dtype == np.int16 else np.empty(recording.shape, dtype=np.int16)
+        clipped = np.zeros(len(self.gains), dtype=np.int64)
+        if self.unity:
+            if out is not recording:
+                out[...] = recording
+            return out, clipped
+        for start in range(0, len(recording), self.block_frames):
+            block = recording[start:start + self.block_frames]
+            scratch = self._scratch_buffer(len(block), block.shape[1])
+            np.multiply(block, self.gains, out=scratch)
+            clipped += np.count_nonzero(scratch > INT16_MAX, axis=0)
+            clipped += np.count_nonzero(scratch < INT16_MIN, axis=0)
+            np.clip(scratch, INT16_MIN, INT16_MAX, out=scratch)
+            np.rint(scratch, out=scratch)
+            out[start:start + len(block)] = scratch
+        with self._lock:
+            self.clip_counts += clipped
+        return out, clipped
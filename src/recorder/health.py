@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+from collections import deque
+
+# Upper bounds in seconds of the callback duration histogram buckets
+CALLBACK_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+
+class CaptureHealth:
+    """
+    Counters describing how well one capture stream keeps up.
+
+    The stream callback reports every block through `record_callback()`: its
+    status flags (input overflow/underflow), how long the callback took and how
+    many captured frames were still waiting to be read. Overflow positions are
+    remembered as absolute frame indices, so `clip_report()` can tell which clips
+    contain a discontinuity. The writer queue depth is sampled by the recorder
+    after every `save()`.
+
+    Attributes:
+        device (str): Device name used in reports.
+        callbacks (int): Number of callbacks received.
+        frames (int): Frames delivered by the callbacks.
+        input_overflows (int): Blocks flagged with an input overflow (samples lost before the block).
+        input_underflows (int): Blocks flagged with an input underflow.
+        other_status (int): Blocks with any other non-empty status.
+        callback_seconds_total (float): Total time spent in the callback.
+        callback_seconds_max (float): Longest callback.
+        callback_buckets (list): Cumulative callback duration histogram over `CALLBACK_BUCKETS`.
+        ring_depth (int): Frames waiting to be read after the last callback.
+        ring_depth_max (int): Largest `ring_depth` seen.
+        writer_queue_depth (int): Jobs waiting for the background writer after the last save.
+        writer_queue_max (int): Largest `writer_queue_depth` seen.
+        dropped_frames (int): Frames overwritten before they were read.
+        clips (int): Clips cut from the stream.
+        flagged_clips (int): Clips containing an overflow, underflow or dropped frames.
+    """
+
+    def __init__(self, device, max_events=4096):
+        self.device = str(device)
+        self.callbacks = 0
+        self.frames = 0
+        self.input_overflows = 0
+        self.input_underflows = 0
+        self.other_status = 0
+        self.callback_seconds_total = 0.0
+        self.callback_seconds_max = 0.0
+        self.callback_buckets = [0] * len(CALLBACK_BUCKETS)
+        self.ring_depth = 0
+        self.ring_depth_max = 0
+        self.writer_queue_depth = 0
+        self.writer_queue_max = 0
+        self.dropped_frames = 0
+        self.clips = 0
+        self.flagged_clips = 0
+        # (frame index, "overflow" | "underflow") of recent status events
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    def record_callback(self, frame, frames, status, seconds, ring_depth):
+        """
+        Records one stream callback.
+
+        Args:
+            frame (int): Absolute index of the block's first frame.
+            frames (int): Frames in the block.
+            status: `sounddevice.CallbackFlags` or None.
+            seconds (float): Time spent in the callback.
+            ring_depth (int): Frames waiting to be read after the block was stored.
+        """
+        with self._lock:
+            self.callbacks += 1
+            self.frames += frames
+            if status:
+                overflow = getattr(status, "input_overflow", False)
+                underflow = getattr(status, "input_underflow", False)
+                if overflow:
+                    self.input_overflows += 1
+                    self._events.append((frame, "overflow"))
+                if underflow:
+                    self.input_underflows += 1
+                    self._events.append((frame, "underflow"))
+                if not (overflow or underflow):
+                    self.other_status += 1
+            self.callback_seconds_total += seconds
+            self.callback_seconds_max = max(self.callback_seconds_max, seconds)
+            for i, bound in enumerate(CALLBACK_BUCKETS):
+                if seconds <= bound:
+                    self.callback_buckets[i] += 1
+            self.ring_depth = ring_depth
+            self.ring_depth_max = max(self.ring_depth_max, ring_depth)
+
+    def record_writer_queue(self, depth):
+        with self._lock:
+            self.writer_queue_depth = depth
+            self.writer_queue_max = max(self.writer_queue_max, depth)
+
+    def record_dropped(self, frames):
+        with self._lock:
+            self.dropped_frames += frames
+
+    def clip_report(self, start_frame, frames, dropped_frames=0):
+        """
+        Counts the status events inside the clip `[start_frame, start_frame + frames)`.
+
+        Returns:
+            dict: `input_overflows`, `input_underflows`, `dropped_frames` and `xrun`
+            (True if any of them is non-zero), ready to be stored with the clip's labels.
+        """
+        end_frame = start_frame + frames
+        with self._lock:
+            overflows = sum(1 for frame, kind in self._events if kind == "overflow" and start_frame <= frame < end_frame)
+            underflows = sum(1 for frame, kind in self._events if kind == "underflow" and start_frame <= frame < end_frame)
+            xrun = bool(overflows or underflows or dropped_frames)
+            self.clips += 1
+            self.flagged_clips += xrun
+        return {
+            "input_overflows": overflows,
+            "input_underflows": underflows,
+            "dropped_frames": dropped_frames,
+            "xrun": xrun,
+        }
+
+    def snapshot(self):
+        """
+        Returns all counters as a JSON-serializable dict.
+        """
+        with self._lock:
+            return {
+                "device": self.device,
+                "callbacks": self.callbacks,
+                "frames": self.frames,
+                "input_overflows": self.input_overflows,
+                "input_underflows": self.input_underflows,
+                "other_status": self.other_status,
+                "callback_seconds_total": self.callback_seconds_total,
+                "callback_seconds_mean": self.callback_seconds_total / self.callbacks if self.callbacks else 0.0,
+                "callback_seconds_max": self.callback_seconds_max,
+                "callback_buckets": dict(zip(map(str, CALLBACK_BUCKETS), self.callback_buckets)),
+                "ring_depth": self.ring_depth,
+                "ring_depth_max": self.ring_depth_max,
+                "writer_queue_depth": self.writer_queue_depth,
+                "writer_queue_max": self.writer_queue_max,
+                "dropped_frames": self.dropped_frames,
+                "clips": self.clips,
+                "flagged_clips": self.flagged_clips,
+            }
+
+    def to_prometheus(self):
+        """
+        Formats the counters in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        device = snapshot["device"].replace("\\", "\\\\").replace('"', '\\"')
+        labels = f'device="{device}"'
+        lines = []
+
+        def metric(name, kind, value, help_text):
+            lines.append(f"# HELP recorder_{name} {help_text}")
+            lines.append(f"# TYPE recorder_{name} {kind}")
+            lines.append(f"recorder_{name}{{{labels}}} {value}")
+
+        metric("callbacks_total", "counter", snapshot["callbacks"], "Stream callbacks received.")
+        metric("frames_total", "counter", snapshot["frames"], "Frames delivered by the stream.")
+        metric("input_overflows_total", "counter", snapshot["input_overflows"], "Blocks flagged with an input overflow.")
+        metric("input_underflows_total", "counter", snapshot["input_underflows"], "Blocks flagged with an input underflow.")
+        metric("dropped_frames_total", "counter", snapshot["dropped_frames"], "Frames overwritten before they were read.")
+        metric("clips_total", "counter", snapshot["clips"], "Clips cut from the stream.")
+        metric("flagged_clips_total", "counter", snapshot["flagged_clips"], "Clips containing an xrun or dropped frames.")
+        metric("ring_depth_frames", "gauge", snapshot["ring_depth"], "Captured frames waiting to be read.")
+        metric("ring_depth_max_frames", "gauge", snapshot["ring_depth_max"], "Largest backlog of captured frames.")
+        metric("writer_queue_depth", "gauge", snapshot["writer_queue_depth"], "Recordings waiting for the background writer.")
+        metric("writer_queue_max", "gauge", snapshot["writer_queue_max"], "Largest writer backlog.")
+        lines.append("# HELP recorder_callback_seconds Time spent in the stream callback.")
+        lines.append("# TYPE recorder_callback_seconds histogram")
+        for bound, count in zip(CALLBACK_BUCKETS, snapshot["callback_buckets"].values()):
+            lines.append(f'recorder_callback_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'recorder_callback_seconds_bucket{{{labels},le="+Inf"}} {snapshot["callbacks"]}')
+        lines.append(f"recorder_callback_seconds_sum{{{labels}}} {snapshot['callback_seconds_total']}")
+        lines.append(f"recorder_callback_seconds_count{{{labels}}} {snapshot['callbacks']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Writes the counters to `path` atomically; `.prom` files use the Prometheus text format, anything else JSON.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as health_file:
+            if path.endswith(".prom"):
+                health_file.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), health_file, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+
+class JsonlLabelStore:
+    """
+    Append-only label store with one JSON object per line.
+
+    Each `append()` writes a single line, so the cost of saving a label does not
+    depend on how many labels already exist. Lines are flushed to the OS on every
+    append and fsynced in batches (every `fsync_every` entries or `fsync_interval`
+    seconds, whichever comes first). A crash can at most truncate the last line,
+    which `read()` skips instead of discarding the whole file.
+
+    Attributes:
+        path (str): Path of the `.jsonl` file.
+        fsync_every (int): Number of appends between fsyncs.
+        fsync_interval (float): Maximum seconds between fsyncs.
+    """
+
+    def __init__(self, path, fsync_every=16, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            # Terminate a line left truncated by a crash so it does not swallow the next entry
+            if self._file.tell() > 0:
+                with open(self.path, "rb") as label_file:
+                    label_file.seek(-1, os.SEEK_END)
+                    if label_file.read(1) != b"\n":
+                        self._file.write("\n")
+        return self._file
+
+    def append(self, entry):
+        """
+        Appends one label entry.
+        """
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            label_file = self._open()
+            label_file.write(line)
+            label_file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """
+        Forces all appended entries to disk.
+        """
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._sync()
+
+    def close(self):
+        """
+        Syncs and closes the underlying file.
+        """
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def read(self):
+        """
+        Yields all stored entries, skipping a truncated or corrupted line.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as label_file:
+            for line_number, line in enumerate(label_file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable label at {self.path}:{line_number}")
+
+
+class JsonListLabelStore:
+    """
+    Legacy label store that keeps all entries in a single JSON list.
+
+    Every append rewrites the whole file, so prefer `JsonlLabelStore` for new
+    datasets. Kept so existing sessions can continue writing the old format.
+
+    Attributes:
+        path (str): Path of the `.json` file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        """
+        Appends one label entry by rewriting the whole list.
+        """
+        with self._lock:
+            label_data = list(self.read())
+            label_data.append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a half-written list
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as label_file:
+                json.dump(label_data, label_file, indent=4)
+            os.replace(tmp_path, self.path)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self):
+        """
+        Returns all stored entries.
+
+        A corrupted file is moved aside to `<path>.corrupt` instead of being overwritten.
+        """
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as label_file:
+            try:
+                return json.load(label_file)
+            except json.JSONDecodeError:
+                pass
+        backup_path = self.path + ".corrupt"
+        os.replace(self.path, backup_path)
+        print(f"Label file {self.path} could not be parsed; moved it to {backup_path}")
+        return []
+
+
+def open_label_store(output_dir, label_format="jsonl", fsync_every=16, fsync_interval=5.0):
+    """
+    Creates the label store for a dataset directory.
+
+    Args:
+        output_dir (str): Dataset root (the recorder's `output_dir`).
+        label_format (str): "jsonl" for the append-only store or "json" for the legacy list.
+        fsync_every (int): Appends between fsyncs for the JSON Lines store.
+        fsync_interval (float): Maximum seconds between fsyncs for the JSON Lines store.
+    """
+    if label_format == "jsonl":
+        jsonl_path = os.path.join(output_dir, "experiment_labels.jsonl")
+        legacy_path = os.path.join(output_dir, "experiment_labels.json")
+        if os.path.exists(legacy_path) and not os.path.exists(jsonl_path):
+            print(f"Found legacy labels at {legacy_path}; run `python src/recorder/label_store.py {legacy_path}` to convert them")
+        return JsonlLabelStore(jsonl_path, fsync_every, fsync_interval)
+    if label_format == "json":
+        return JsonListLabelStore(os.path.join(output_dir, "experiment_labels.json"))
+    raise ValueError(f"Unsupported label format: {label_format}")
+
+
+def convert_json_labels(json_path, jsonl_path=None):
+    """
+    Converts a legacy `experiment_labels.json` list into JSON Lines.
+
+    Entries are appended, so converting into an existing `.jsonl` file keeps the
+    labels recorded there.
+
+    Returns:
+        int: Number of converted entries.
+    """
+    if jsonl_path is None:
+        jsonl_path = os.path.splitext(json_path)[0] + ".jsonl"
+    with open(json_path, "r") as label_file:
+        label_data = json.load(label_file)
+    if not isinstance(label_data, list):
+        raise ValueError(f"Expected a list of labels in {json_path}")
+    store = JsonlLabelStore(jsonl_path, fsync_every=len(label_data) or 1)
+    for entry in label_data:
+        store.append(entry)
+    store.close()
+    return len(label_data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a legacy experiment_labels.json list to JSON Lines.")
+    parser.add_argument("json_path", help="Path of the legacy experiment_labels.json")
+    parser.add_argument("--output", default=None, help="Target .jsonl path (default: next to the input)")
+    args = parser.parse_args()
+    count = convert_json_labels(args.json_path, args.output)
+    print(f"Converted {count} labels from {args.json_path}")
@@ -0,0 +1,273 @@
+import argparse
+import os
+import re
+import sqlite3
+import threading
+
+# Matches the filenames written by AudioRecorder.save(); interleaved files carry a channel range (ch1-8).
+# Times are HH-MM-SS-ffffff; recordings from before microseconds were added end in HH-MM-SS.
+FILENAME_PATTERN = re.compile(
+    r"^(?P<date>\d{4}-\d{2}-\d{2})_(?P<hardware>.+?)_ch(?P<channel>\d+)(?:-(?P<last_channel>\d+))?"
+    r"_DOA(?P<doa>[^_]+)_elev(?P<elevation>[^_]+)_cat(?P<category>.*?)"
+    r"_freq(?P<frequency>[^_]+)_gain(?P<gain>[^_]+)_amp(?P<amplitude>[^_]+)"
+    r"_len(?P<duration>[^_]+)_(?P<time>\d{2}-\d{2}-\d{2}(?:-\d{6})?)\.(?:wav|flac|dzl)$"
+)
+
+# Folder below the dataset root that `python -m recorder.verify --quarantine` moves unusable files into
+QUARANTINE_DIR = "quarantine"
+
+COLUMNS = (
+    "path", "date", "time", "hardware", "channel", "doa", "elevation",
+    "category", "frequency", "gain", "amplitude", "duration", "sample_rate",
+    "file_channels",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    date TEXT,
+    time TEXT,
+    hardware TEXT,
+    channel INTEGER,
+    doa REAL,
+    elevation REAL,
+    category TEXT,
+    frequency REAL,
+    gain REAL,
+    amplitude REAL,
+    duration REAL,
+    sample_rate INTEGER,
+    file_channels INTEGER DEFAULT 1,
+    UNIQUE (path, channel)
+);
+CREATE INDEX IF NOT EXISTS idx_recordings_doa ON recordings (doa);
+CREATE INDEX IF NOT EXISTS idx_recordings_elevation ON recordings (elevation);
+CREATE INDEX IF NOT EXISTS idx_recordings_frequency ON recordings (frequency);
+CREATE INDEX IF NOT EXISTS idx_recordings_channel ON recordings (channel);
+CREATE INDEX IF NOT EXISTS idx_recordings_category_elev_doa ON recordings (category, elevation, doa);
+"""
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def parse_recording_filename(filename):
+    """
+    Extracts the metadata encoded in a recording filename.
+
+    Returns:
+        list: One dict of manifest columns (without `path` and `sample_rate`) per
+        channel stored in the file, or None if the name does not match.
+    """
+    match = FILENAME_PATTERN.match(os.path.basename(filename))
+    if match is None:
+        return None
+    fields = match.groupdict()
+    first_channel = int(fields["channel"])
+    last_channel = int(fields["last_channel"] or first_channel)
+    file_channels = last_channel - first_channel + 1
+    return [
+        dict(_parse_fields(fields), channel=channel, file_channels=file_channels)
+        for channel in range(first_channel, last_channel + 1)
+    ]
+
+
+def _parse_fields(fields):
+    category = fields["category"].replace("+", ", ")
+    return {
+        "date": fields["date"],
+        "time": fields["time"],
+        "hardware": fields["hardware"],
+        "doa": _number(fields["doa"]),
+        "elevation": _number(fields["elevation"]),
+        # Older recordings wrote the literal placeholder "category" instead of the value
+        "category": None if category in ("", "category") else category,
+        "frequency": _number(fields["frequency"]),
+        "gain": _number(fields["gain"]),
+        "amplitude": _number(fields["amplitude"]),
+        "duration": _number(fields["duration"]),
+    }
+
+
+class RecordingManifest:
+    """
+    Indexed SQLite catalogue of the per-channel recordings in a dataset tree.
+
+    There is one row per channel; channels of an interleaved file share its path
+    and have `file_channels` set to the number of channels in that file.
+
+    Paths are stored relative to `root` so the dataset can be moved; `query()`
+    joins them back onto `root` without touching the files themselves.
+
+    Attributes:
+        root (str): Dataset root directory (the recorder's `output_dir`).
+        db_path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, root, db_path=None):
+        self.root = root
+        self.db_path = db_path or os.path.join(root, "manifest.sqlite")
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        # Rows are added from the recorder's writer threads
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_recordings(self, rows):
+        """
+        Inserts or replaces rows; each row is a dict keyed by `COLUMNS`.
+
+        `path` is a regular filesystem path; it is stored relative to `root`.
+        """
+        root = os.path.abspath(self.root)
+        values = []
+        for row in rows:
+            row = dict(row)
+            row["path"] = os.path.relpath(os.path.abspath(row["path"]), root)
+            values.append(tuple(row.get(column) for column in COLUMNS))
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO recordings ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                values,
+            )
+
+    def remove(self, paths):
+        """
+        Deletes the rows of the given files, e.g. after they were quarantined.
+
+        Returns:
+            int: Number of deleted channel rows.
+        """
+        root = os.path.abspath(self.root)
+        values = [(os.path.relpath(os.path.abspath(path), root),) for path in paths]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("DELETE FROM recordings WHERE path = ?", values)
+            return self._conn.total_changes - before
+
+    def _where(self, filters):
+        clauses = []
+        params = []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if column not in COLUMNS:
+                raise ValueError(f"Unknown manifest column: {column}")
+            if isinstance(value, tuple):
+                # (low, high) inclusive range; either bound may be None
+                low, high = value
+                if low is not None:
+                    clauses.append(f"{column} >= ?")
+                    params.append(low)
+                if high is not None:
+                    clauses.append(f"{column} <= ?")
+                    params.append(high)
+            elif isinstance(value, (list, set, frozenset, range)):
+                value = list(value)
+                clauses.append(f"{column} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query_rows(self, columns=("id", "path"), order_by="id", **filters):
+        """
+        Returns matching rows as dicts.
+
+        Filters are keyword arguments named after manifest columns. A scalar matches
+        exactly, a `(low, high)` tuple is an inclusive range and a list/range matches
+        any of its values, e.g. `query_rows(channel=range(1, 5), doa=(30, 90), elevation=0, category="horn")`.
+        """
+        where, params = self._where(filters)
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {', '.join(columns)} FROM recordings{where} ORDER BY {order_by}", params)
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def query(self, **filters):
+        """
+        Returns the distinct paths (joined onto `root`) of all recordings matching `filters` (see `query_rows`).
+        """
+        rows = self.query_rows(columns=("path",), **filters)
+        return [os.path.join(self.root, path) for path in dict.fromkeys(row["path"] for row in rows)]
+
+    def query_ids(self, **filters):
+        """
+        Returns the row ids of all recordings matching `filters` (see `query_rows`).
+        """
+        return [row["id"] for row in self.query_rows(columns=("id",), **filters)]
+
+    def count(self, **filters):
+        where, params = self._where(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM recordings{where}", params).fetchone()[0]
+
+    def rebuild(self, sample_rate=None):
+        """
+        Recreates the manifest by scanning every recording filename below `root`.
+
+        Returns:
+            int: Number of indexed channel rows.
+        """
+        rows = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root and QUARANTINE_DIR in dirnames:
+                dirnames.remove(QUARANTINE_DIR)
+            for filename in filenames:
+                parsed = parse_recording_filename(filename)
+                if parsed is None:
+                    continue
+                for fields in parsed:
+                    fields["path"] = os.path.join(dirpath, filename)
+                    fields["sample_rate"] = sample_rate
+                    rows.append(fields)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM recordings")
+        self.add_recordings(rows)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or query the recording manifest of a dataset tree.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Re-index all recordings below the dataset root")
+    rebuild_parser.add_argument("root", help="Dataset root, e.g. datasets")
+    rebuild_parser.add_argument("--sample-rate", type=int, default=None, help="Sample rate to record for every file")
+    query_parser = subparsers.add_parser("query", help="Print paths of matching recordings")
+    query_parser.add_argument("root", help="Dataset root, e.g. datasets")
+    query_parser.add_argument("--channel", type=int, nargs="+", default=None)
+    query_parser.add_argument("--doa", type=float, nargs=2, default=None, metavar=("MIN", "MAX"))
+    query_parser.add_argument("--elevation", type=float, nargs=2, default=None, metavar=("MIN", "MAX"))
+    query_parser.add_argument("--frequency", type=float, nargs=2, default=None, metavar=("MIN", "MAX"))
+    query_parser.add_argument("--category", default=None)
+    query_parser.add_argument("--hardware", default=None)
+    args = parser.parse_args()
+
+    manifest = RecordingManifest(args.root)
+    if args.command == "rebuild":
+        count = manifest.rebuild(sample_rate=args.sample_rate)
+        print(f"Indexed {count} recordings into {manifest.db_path}")
+    else:
+        for path in manifest.query(
+            channel=args.channel,
+            doa=tuple(args.doa) if args.doa else None,
+            elevation=tuple(args.elevation) if args.elevation else None,
+            frequency=tuple(args.frequency) if args.frequency else None,
+            category=args.category,
+            hardware=args.hardware,
+        ):
+            print(path)
+    manifest.close()
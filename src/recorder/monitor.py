@@ -0,0 +1,205 @@
+import threading
+import time
+
+import numpy as np
+
+SPARK = " ▁▂▃▄▅▆▇█"
+
+
+class LevelMeter:
+    """
+    Per-channel RMS, peak and a coarse spectrum of the newest block of a stream.
+
+    All channels are measured in one vectorized pass. The spectrum of the last
+    `n_fft` frames is reduced to `bands` log-spaced bands (maximum power per band),
+    which is all a terminal can show anyway.
+
+    Attributes:
+        band_edges (np.ndarray): Band edges in Hz, `bands + 1` values.
+    """
+
+    def __init__(self, sample_rate, n_fft=1024, bands=24, min_frequency=50.0):
+        self.n_fft = int(n_fft)
+        self.window = np.hanning(self.n_fft).astype(np.float32)
+        self.band_edges = np.geomspace(min_frequency, sample_rate / 2, bands + 1)
+        bins = np.fft.rfftfreq(self.n_fft, 1.0 / sample_rate)
+        self._band_starts = np.minimum(np.searchsorted(bins, self.band_edges[:-1]), len(bins) - 1)
+        # Scales a full-scale sine to 0 dB
+        self._spectrum_scale = 4.0 / np.square(self.window.sum())
+
+    def measure(self, block):
+        """
+        Measures an int16 (frames, channels) block.
+
+        Returns:
+            dict: `rms_dbfs`, `peak_dbfs` and `clipping` per channel, and `spectrum_db` shaped (channels, bands).
+        """
+        audio = block.astype(np.float32) * (1.0 / 32768.0)
+        rms = np.sqrt(np.einsum("fc,fc->c", audio, audio) / max(1, len(audio)))
+        peak = np.abs(audio).max(axis=0) if len(audio) else np.zeros(audio.shape[1], dtype=np.float32)
+        tail = audio[-self.n_fft:]
+        if len(tail) < self.n_fft:
+            tail = np.pad(tail, ((self.n_fft - len(tail), 0), (0, 0)))
+        power = np.square(np.abs(np.fft.rfft(tail * self.window[:, None], axis=0))) * self._spectrum_scale
+        bands = np.maximum.reduceat(power, self._band_starts, axis=0)
+        return {
+            "rms_dbfs": 20.0 * np.log10(rms + 1e-9),
+            "peak_dbfs": 20.0 * np.log10(peak + 1e-9),
+            "clipping": peak >= 32767.0 / 32768.0,
+            "spectrum_db": 10.0 * np.log10(bands.T + 1e-12),
+        }
+
+
+def sparkline(values_db, floor_db=-100.0):
+    """
+    Renders dB values as a row of block characters, from `floor_db` (blank) to 0 dB (full).
+    """
+    levels = np.clip((np.asarray(values_db) - floor_db) / -floor_db, 0.0, 1.0)
+    return "".join(SPARK[int(round(level * (len(SPARK) - 1)))] for level in levels)
+
+
+class Monitor:
+    """
+    Live level and spectrum display attached to running recorders.
+
+    A background thread takes the newest `window_seconds` of every recorder's
+    streaming ring buffer at most `refresh_hz` times a second, as a zero-copy
+    view wherever the window does not wrap around. The device is never opened a
+    second time and the capture callback does no extra work. The thread measures
+    the window with `LevelMeter`. The result is drawn with `rich` when it is
+    installed and printed as one line per device otherwise.
+
+    Attributes:
+        recorders (list): `AudioRecorder`s in streaming mode; recorders whose stream is not open yet are skipped.
+        refresh_hz (float): Maximum display updates per second.
+        updates (int): Display updates so far.
+        busy_seconds (float): Time the monitor thread spent measuring and rendering.
+    """
+
+    def __init__(self, recorders, refresh_hz=5.0, window_seconds=0.1, n_fft=1024, bands=24, console=None):
+        self.recorders = list(recorders)
+        self.refresh_hz = float(refresh_hz)
+        self.window_seconds = window_seconds
+        self.n_fft = n_fft
+        self.bands = bands
+        self.console = console
+        self.updates = 0
+        self.busy_seconds = 0.0
+        self._meters = {}
+        self._stopping = threading.Event()
+        self._thread = None
+        self._live = None
+
+    def measure(self, recorder):
+        """
+        Measures the newest window of one recorder's stream.
+
+        Returns:
+            dict: `LevelMeter.measure()` output, or None if the stream has no audio yet.
+        """
+        stream = recorder.stream
+        if stream is None or stream.ring.written == 0:
+            return None
+        meter = self._meters.get(id(recorder))
+        if meter is None:
+            meter = self._meters[id(recorder)] = LevelMeter(stream.sample_rate, self.n_fft, self.bands)
+        ring = stream.ring
+        written = ring.written
+        frames = min(written, ring.capacity, max(self.n_fft, int(self.window_seconds * stream.sample_rate)))
+        start = written - frames
+        block = ring.view(start, frames)
+        if block is None:
+            # The window wraps around the end of the buffer; a copy of a few kilobytes
+            block = ring.read(start, frames)
+        levels = meter.measure(block)
+        # The writer lapped the window while it was measured; skip this update
+        return None if ring.overwritten(start) else levels
+
+    def _rows(self):
+        for recorder in self.recorders:
+            yield recorder, self.measure(recorder), recorder.health.snapshot()
+
+    def _render_rich(self):
+        from rich.table import Table
+
+        table = Table(title="Input levels", expand=False)
+        for column in ("Device", "Ch", "RMS", "RMS dBFS", "Peak dBFS", "Spectrum"):
+            table.add_column(column)
+        captions = []
+        for recorder, levels, health in self._rows():
+            captions.append(f"{recorder.type}: {health['input_overflows']} overflows, {health['dropped_frames']} dropped, "
+                            f"ring {health['ring_depth']} frames")
+            if levels is None:
+                table.add_row(recorder.type, "-", "waiting for stream", "", "", "")
+                continue
+            for channel in range(len(levels["rms_dbfs"])):
+                rms, peak = levels["rms_dbfs"][channel], levels["peak_dbfs"][channel]
+                bar = "█" * int(np.clip((rms + 60.0) / 60.0, 0.0, 1.0) * 20)
+                style = "red" if levels["clipping"][channel] else ("dim" if rms < -60.0 else "green")
+                table.add_row(recorder.type if channel == 0 else "", str(channel + 1), f"[{style}]{bar:<20}[/]",
+                              f"{rms:6.1f}", f"{peak:6.1f}", sparkline(levels["spectrum_db"][channel]))
+        table.caption = "\n".join(captions)
+        return table
+
+    def _render_text(self):
+        lines = []
+        for recorder, levels, health in self._rows():
+            if levels is None:
+                lines.append(f"{recorder.type}: waiting for stream")
+                continue
+            channels = " ".join(f"{rms:5.1f}{'!' if clipping else ''}" for rms, clipping in zip(levels["rms_dbfs"], levels["clipping"]))
+            lines.append(f"{recorder.type}: RMS dBFS {channels} | overflows {health['input_overflows']} dropped {health['dropped_frames']}")
+        return "\n".join(lines)
+
+    def update(self):
+        """
+        Measures every recorder once and redraws the display.
+        """
+        start = time.perf_counter()
+        if self._live is not None:
+            self._live.update(self._render_rich(), refresh=True)
+        else:
+            print(self._render_text())
+        self.updates += 1
+        self.busy_seconds += time.perf_counter() - start
+
+    def _run(self):
+        interval = 1.0 / self.refresh_hz
+        next_update = time.monotonic()
+        while not self._stopping.is_set():
+            self.update()
+            # Never catch up on missed updates; the cap matters more than the count
+            next_update = max(next_update + interval, time.monotonic())
+            self._stopping.wait(next_update - time.monotonic())
+
+    def start(self, rich=True):
+        """
+        Starts the display thread; falls back to plain lines if `rich` is not installed or not wanted.
+        """
+        if self._thread is not None:
+            return
+        if rich:
+            try:
+                from rich.live import Live
+
+                # Prints from the recorder scroll above the live table instead of tearing it
+                self._live = Live(console=self.console, auto_refresh=False, redirect_stdout=True, redirect_stderr=True)
+                self._live.start()
+            except ImportError:
+                print("rich is not installed; printing monitor lines instead")
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the display thread and restores the terminal.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
@@ -0,0 +1,106 @@
+import datetime
+import uuid
+
+
+class MultiDeviceRecorder:
+    """
+    Records from several arrays at once with clips aligned on a shared clock.
+
+    Every recorder keeps its own PortAudio stream (and callback thread). Before
+    each clip the read cursors are moved to a common start time derived from
+    the callbacks' `inputBufferAdcTime`; host-clock timestamps are used instead
+    when a host API reports no ADC time. The residual start offset of every
+    device relative to the first one is measured and stored with its labels.
+
+    Attributes:
+        recorders (list): `AudioRecorder` instances, one per device; the first is the reference.
+        clock (str): "adc" or "host", picked once all streams are running.
+        last_offsets (list): Measured start offset in seconds of each device for the last clip.
+    """
+
+    def __init__(self, recorders):
+        if len(recorders) < 2:
+            raise ValueError("MultiDeviceRecorder needs at least two recorders")
+        self.recorders = list(recorders)
+        self.clock = None
+        self.last_offsets = None
+        # Paired clips share one label file and manifest
+        reference = self.recorders[0]
+        for recorder in self.recorders[1:]:
+            recorder.label_store.close()
+            recorder.label_store = reference.label_store
+            if recorder.manifest is not None and reference.manifest is not None:
+                recorder.manifest.close()
+                recorder.manifest = reference.manifest
+
+    @property
+    def streaming(self):
+        return True
+
+    def start(self):
+        """
+        Starts every stream and waits until all of them deliver timestamps.
+        """
+        for recorder in self.recorders:
+            recorder.start_stream()
+        for recorder in self.recorders:
+            if not recorder.stream.wait_for_data():
+                raise RuntimeError(f"No audio from device {recorder.device_id}")
+        self.clock = "adc" if all(recorder.stream.has_adc_time() for recorder in self.recorders) else "host"
+        print(f"Aligning {len(self.recorders)} devices on the {self.clock} clock")
+
+    def record(self):
+        """
+        Captures one aligned clip from every device.
+
+        Returns:
+            list: One (frames, channels) array per recorder, or None if any device failed.
+        """
+        if self.clock is None:
+            self.start()
+        streams = [recorder.stream for recorder in self.recorders]
+        # The latest next-frame time across devices is the earliest start all of them can honour
+        start_time = max(stream.frame_time(stream.read_cursor, self.clock) for stream in streams)
+        for stream in streams:
+            stream.seek_time(start_time, self.clock)
+        recordings = []
+        for recorder in self.recorders:
+            frames = int(recorder.config.duration * recorder.stream.sample_rate)
+            recording = recorder.stream.read_clip(frames)
+            if recording is None:
+                print(f"Timed out waiting for audio from device {recorder.device_id}")
+                return None
+            recordings.append(recording)
+        reference_time = streams[0].clip_start_time[self.clock]
+        self.last_offsets = [stream.clip_start_time[self.clock] - reference_time for stream in streams]
+        return recordings
+
+    def save(self, recordings, filename):
+        """
+        Saves a paired set of clips under one timestamp with the measured offsets.
+        """
+        timestamp = datetime.datetime.now()
+        pair_id = uuid.uuid4().hex
+        reference_type = self.recorders[0].type
+        for recorder, recording, offset in zip(self.recorders, recordings, self.last_offsets):
+            recorder.save(recording, filename, timestamp=timestamp, extra_labels={
+                "hardware": recorder.type,
+                "pair_id": pair_id,
+                "reference_device": reference_type,
+                "device_offset_s": offset,
+                "clock": self.clock,
+            })
+
+    def discard_buffered(self):
+        for recorder in self.recorders:
+            recorder.discard_buffered()
+
+    def flush(self):
+        for recorder in self.recorders:
+            recorder.flush()
+
+    def close(self):
+        # Drain every writer first; the shared label store and manifest must outlive all of them
+        self.flush()
+        for recorder in self.recorders:
+            recorder.close()
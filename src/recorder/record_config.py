@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 
@@ -10,17 +10,80 @@ class RecorderConfig:
     Attributes:
         output_dir (str): Directory to save the recorded files.
         duration (int): Duration of the recording in seconds.
-        sample_rate (int): Sampling rate in Hz.
+        sample_rate (int): Sampling rate in Hz, used when the hardware config declares none.
+        target_sample_rate (Optional[int]): Rate of the saved files; clips captured at the hardware rate are
+            resampled with a streaming polyphase filter. None saves at the capture rate.
         channels (int): Number of audio input channels.
         device (Optional[int]): Device ID or name. Defaults to None for the default device.
-        gain (float): Gain factor to apply to each channel.
+        gain (float): Gain factor to apply to each channel; hardware configs may give one value per channel.
+        gain_units (str): "linear" factor or "db".
+        streaming (bool): Keep one input stream open and cut clips from it instead of a one-shot capture per clip.
+        buffer_seconds (float): Size of the streaming ring buffer in seconds.
+        blocksize (int): Frames per callback block in streaming mode; 0 lets PortAudio choose.
+        capture_process (bool): Run the streaming input in a separate process that writes into a
+            shared-memory ring buffer, isolating the callback from the recorder's GIL.
+        writer_threads (int): Background threads writing recordings; 0 writes synchronously in `save()`.
+        writer_queue_size (int): Recordings that may wait for a writer before `save()` blocks.
+        label_format (str): "jsonl" for the append-only label store, "json" for the legacy list file.
+        label_fsync_every (int): Label appends between fsyncs.
+        label_fsync_interval (float): Maximum seconds between label fsyncs.
+        manifest (bool): Index every saved file in `<output_dir>/manifest.sqlite`.
+        dataset_stats (bool): Keep running per-channel mean/variance and per-category/DOA counts in
+            `<output_dir>/dataset_stats_<type>.json`.
+        output_layout (str): "per_channel" writes one mono WAV per channel, "interleaved" one multichannel file.
+        output_format (str): "wav", "rf64" (for interleaved takes larger than 4 GB; chosen automatically when needed),
+            "flac" (needs soundfile, falls back to "dzip") or "dzip" (lossless delta+zlib `.dzl` files with random access).
+        encoder_processes (int): Worker processes encoding compressed formats; 0 encodes in the writer thread.
+        trigger_mode (Optional[str]): "energy" or "flux" to save only detected events instead of fixed clips; None disables.
+        trigger_threshold_db (float): Margin above the adaptive noise floor that opens an event.
+        trigger_block_ms (float): Length of the blocks scored by the detector.
+        pre_roll_seconds (float): Audio kept from before the trigger.
+        hold_seconds (float): Minimum event length after the trigger.
+        release_seconds (float): Time below the threshold that closes an event.
+        max_event_seconds (float): Events longer than this are split.
+        trigger_timeout (Optional[float]): Seconds `record()` waits for an event before returning None; None waits forever.
+        doa_check (bool): Estimate the DOA of every saved clip (SRP-PHAT) and flag labels it disagrees with.
+        doa_tolerance (float): Azimuth error in degrees above which a clip is flagged `doa_mismatch`.
+        monitor (bool): Show live per-channel levels and spectra of the running stream in the terminal (forces streaming).
+        monitor_refresh_hz (float): Maximum monitor updates per second.
+        health_format (Optional[str]): "json" or "prometheus" to dump capture health counters to
+            `<output_dir>/capture_health_<type>.{json,prom}` after every clip; None disables the dump.
     """
     output_dir: str = "datasets"
     duration: int = 5
     sample_rate: int = 48000
+    target_sample_rate: Optional[int] = None
     channels: int = 8
     device: Optional[int] = None
     gain: float = 1.0
+    gain_units: str = "linear"
+    streaming: bool = False
+    buffer_seconds: float = 30.0
+    blocksize: int = 0
+    capture_process: bool = False
+    writer_threads: int = 0
+    writer_queue_size: int = 4
+    label_format: str = "jsonl"
+    label_fsync_every: int = 16
+    label_fsync_interval: float = 5.0
+    manifest: bool = True
+    dataset_stats: bool = True
+    output_layout: str = "per_channel"
+    output_format: str = "wav"
+    encoder_processes: int = 0
+    health_format: Optional[str] = None
+    trigger_mode: Optional[str] = None
+    trigger_threshold_db: float = 12.0
+    trigger_block_ms: float = 20.0
+    pre_roll_seconds: float = 0.5
+    hold_seconds: float = 0.5
+    release_seconds: float = 0.3
+    max_event_seconds: float = 10.0
+    trigger_timeout: Optional[float] = None
+    doa_check: bool = False
+    doa_tolerance: float = 20.0
+    monitor: bool = False
+    monitor_refresh_hz: float = 5.0
 
 @dataclass
 class ExperimentConfig:
@@ -31,7 +94,7 @@ class ExperimentConfig:
         recorder (RecorderConfig): Configuration for the audio recorder.
         dataset_dir (Optional[str]): Directory for storing or loading datasets.
     """
-    recorder: RecorderConfig = RecorderConfig()
+    recorder: RecorderConfig = field(default_factory=RecorderConfig)
     dataset_dir: Optional[str] = None
 
 
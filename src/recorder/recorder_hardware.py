@@ -3,8 +3,8 @@ import numpy as np
 import wave
 import logging
 from recorder.base_recordermodule import AudioRecorder
+from recorder.devices import parse_usb_id
 from recorder.record_config import RecorderConfig
-import re
 
 
 
@@ -19,7 +19,8 @@ class RecorderHardware(AudioRecorder):
         self.config=recorder_config
 
     def extract_device_id(self, full_device_id):
-        match = re.search(r"VID_([A-F0-9]+)&PID_([A-F0-9]+)", full_device_id)
-        if match:
-            return f"VID_{match.group(1)}&PID_{match.group(2)}"
+        usb_id = parse_usb_id(full_device_id)
+        if usb_id:
+            vendor, product = usb_id.upper().split(":")
+            return f"VID_{vendor}&PID_{product}"
         return full_device_id
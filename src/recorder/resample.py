@@ -0,0 +1,144 @@
+from math import gcd
+
+import numpy as np
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+def design_lowpass(up, down, half_width=16, beta=8.0):
+    """
+    Kaiser-windowed sinc anti-aliasing filter for resampling by `up / down`.
+
+    The cutoff sits at the lower of the two Nyquist frequencies, and the filter
+    spans `half_width` zero crossings on each side of its centre. It is scaled by
+    `up` to make up for the zeros inserted when upsampling.
+
+    Returns:
+        np.ndarray: float64 taps at the upsampled rate, odd length.
+    """
+    factor = max(up, down)
+    length = 2 * half_width * factor + 1
+    n = np.arange(length) - (length - 1) / 2
+    return up / factor * np.sinc(n / factor) * np.kaiser(length, beta)
+
+
+class PolyphaseResampler:
+    """
+    Streaming polyphase resampler for int16 (frames, channels) blocks.
+
+    Blocks of any size can be fed through `process()`, and the output continues
+    seamlessly across them. Only the `taps - 1` most recent input frames are kept
+    between calls. Each output sample needs one dot product of `taps` input frames
+    with the filter phase it falls on, so the zero-stuffed upsampled signal is never
+    built. The filter delay is compensated, so output frame `m` lines up with input
+    time `m * input_rate / output_rate`.
+
+    Attributes:
+        input_rate (int): Sampling rate of the blocks passed in.
+        output_rate (int): Sampling rate of the blocks returned.
+        channels (int): Number of channels.
+        up (int): Interpolation factor.
+        down (int): Decimation factor.
+        taps (int): Filter taps per phase.
+    """
+
+    def __init__(self, input_rate, output_rate, channels, half_width=16):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+        self.channels = int(channels)
+        divisor = gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // divisor
+        self.down = self.input_rate // divisor
+        self.half_width = half_width
+        h = design_lowpass(self.up, self.down, half_width)
+        length = len(h)
+        self.taps = -(-length // self.up)
+        h = np.concatenate([h, np.zeros(self.taps * self.up - length)])
+        # Row p holds the taps for phase p, reversed so they line up with input windows in time order
+        self.phases = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        # Reading each output from the filter centre compensates its group delay exactly
+        self.center = (length - 1) // 2
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the stream state, e.g. after a gap in the input.
+        """
+        self._history = np.zeros((self.taps - 1, self.channels), dtype=np.float32)
+        self._consumed = 0
+        self._next_output = 0
+
+    def clone(self):
+        """
+        Returns a resampler with the same filter and a fresh stream state.
+        """
+        clone = object.__new__(PolyphaseResampler)
+        clone.__dict__.update(self.__dict__)
+        clone.reset()
+        return clone
+
+    def output_frames(self, input_frames):
+        """
+        Number of output frames corresponding to `input_frames` input frames.
+        """
+        return -(-input_frames * self.up // self.down)
+
+    def process(self, block):
+        """
+        Resamples the next block of the stream.
+
+        Args:
+            block (np.ndarray): (frames, channels) int16 or float samples.
+
+        Returns:
+            np.ndarray: (frames, channels) float32 samples at `output_rate`, in the input's scale.
+        """
+        if self.up == self.down:
+            return np.asarray(block, dtype=np.float32)
+        buffer = np.concatenate([self._history, np.asarray(block, dtype=np.float32)])
+        last = self._consumed + len(block) - 1
+        stop = ((last + 1) * self.up - 1 - self.center) // self.down + 1
+        outputs = np.arange(self._next_output, max(stop, self._next_output))
+        # Position of each output on the upsampled time axis, shifted to the filter centre
+        positions = outputs * self.down + self.center
+        # Window w of the buffer ends at input frame `consumed + w`
+        starts = positions // self.up - self._consumed
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps, axis=0)
+        out = np.einsum("mct,mt->mc", windows[starts], self.phases[positions % self.up], optimize=True)
+        self._history = buffer[len(buffer) - (self.taps - 1):]
+        self._consumed += len(block)
+        self._next_output += len(outputs)
+        return out.astype(np.float32, copy=False)
+
+    def flush(self):
+        """
+        Returns the output still held back by the filter delay at the end of the stream.
+        """
+        pad = -(-self.center // self.up) + 1
+        return self.process(np.zeros((pad, self.channels), dtype=np.float32))
+
+    def resample(self, recording, block_frames=16384, out=None):
+        """
+        Resamples a whole int16 clip block by block with a fresh stream state.
+
+        Returns:
+            np.ndarray: int16 (frames, channels) clip of `output_frames(len(recording))` frames,
+            rounded and saturated like `GainStage`.
+        """
+        stream = self.clone()
+        frames = self.output_frames(len(recording))
+        if out is None:
+            out = np.empty((frames, self.channels), dtype=np.int16)
+        written = 0
+        blocks = (recording[start:start + block_frames] for start in range(0, len(recording), block_frames))
+        for chunk in map(stream.process, blocks):
+            chunk = chunk[:frames - written]
+            np.clip(np.rint(chunk, out=chunk), INT16_MIN, INT16_MAX, out=chunk)
+            out[written:written + len(chunk)] = chunk
+            written += len(chunk)
+        tail = stream.flush()[:frames - written]
+        np.clip(np.rint(tail, out=tail), INT16_MIN, INT16_MAX, out=tail)
+        out[written:written + len(tail)] = tail
+        written += len(tail)
+        return out[:written]
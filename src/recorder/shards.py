@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from recorder.manifest import QUARANTINE_DIR, parse_recording_filename
+from recorder.compressed_io import audio_info, open_audio
+
+INDEX_FILENAME = "index.json"
+SHARD_DTYPE = "<i2"
+
+
+def recording_key(fields):
+    """
+    Identifies one recording (all channels of one clip on one device).
+    """
+    return f"{fields['date']}/{fields['time']}/{fields['hardware']}"
+
+
+class ShardWriter:
+    """
+    Packs recordings into large raw int16 shard files with an offset index.
+
+    Every channel is stored as one contiguous run of samples, so a reader can
+    map it directly. New channels are appended to the last shard until it
+    reaches `shard_bytes`; channels already present in the index are skipped,
+    which makes repeated packing of a growing dataset incremental.
+
+    Attributes:
+        shard_dir (str): Directory holding the shards and `index.json`.
+        shard_bytes (int): Target size of one shard.
+        index (dict): Shard list and one entry per (recording, channel).
+        packed (set): (recording, channel) pairs already in the index.
+    """
+
+    def __init__(self, shard_dir, shard_bytes=512 * 1024 * 1024):
+        self.shard_dir = shard_dir
+        self.shard_bytes = int(shard_bytes)
+        os.makedirs(shard_dir, exist_ok=True)
+        index_path = os.path.join(shard_dir, INDEX_FILENAME)
+        if os.path.exists(index_path):
+            with open(index_path, "r") as index_file:
+                self.index = json.load(index_file)
+        else:
+            self.index = {"dtype": SHARD_DTYPE, "shards": [], "entries": []}
+        self.packed = {(entry["recording"], entry["channel"]) for entry in self.index["entries"]}
+        self._file = None
+
+    def _shard_for(self, nbytes):
+        shards = self.index["shards"]
+        if not shards or (shards[-1]["bytes"] > 0 and shards[-1]["bytes"] + nbytes > self.shard_bytes):
+            shards.append({"file": f"shard_{len(shards):05d}.bin", "bytes": 0})
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._file is None:
+            self._file = open(os.path.join(self.shard_dir, shards[-1]["file"]), "ab")
+            # Drop bytes an interrupted run wrote past the last indexed entry
+            self._file.truncate(shards[-1]["bytes"])
+        return len(shards) - 1
+
+    def add(self, key, channel, samples, sample_rate, metadata=None):
+        """
+        Appends one channel of one recording; returns False if it is already packed.
+        """
+        if (key, channel) in self.packed:
+            return False
+        samples = np.ascontiguousarray(samples, dtype=SHARD_DTYPE)
+        shard = self._shard_for(samples.nbytes)
+        offset = self.index["shards"][shard]["bytes"]
+        self._file.write(memoryview(samples).cast("B"))
+        self.index["shards"][shard]["bytes"] += samples.nbytes
+        self.index["entries"].append({
+            "recording": key,
+            "channel": channel,
+            "shard": shard,
+            "offset": offset,
+            "frames": len(samples),
+            "sample_rate": sample_rate,
+            "metadata": metadata or {},
+        })
+        self.packed.add((key, channel))
+        return True
+
+    def close(self):
+        """
+        Closes the current shard and writes the index atomically.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        index_path = os.path.join(self.shard_dir, INDEX_FILENAME)
+        with open(index_path + ".tmp", "w") as index_file:
+            json.dump(self.index, index_file)
+        os.replace(index_path + ".tmp", index_path)
+
+
+def pack_dataset(root, shard_dir, shard_bytes=512 * 1024 * 1024):
+    """
+    Packs every recording found below `root` into shards in `shard_dir`.
+
+    Handles both per-channel and interleaved files, in every `output_format`;
+    WAV files are memory-mapped, FLAC and `.dzl` files decoded.
+
+    Returns:
+        int: Number of newly packed channels.
+    """
+    writer = ShardWriter(shard_dir, shard_bytes)
+    added = 0
+    try:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Pruned and sorted in place so os.walk skips quarantined files and visits folders in order
+            if dirpath == root and QUARANTINE_DIR in dirnames:
+                dirnames.remove(QUARANTINE_DIR)
+            dirnames.sort()
+            for filename in sorted(filenames):
+                parsed = parse_recording_filename(filename)
+                if parsed is None:
+                    continue
+                if all((recording_key(fields), fields["channel"]) in writer.packed for fields in parsed):
+                    continue
+                path = os.path.join(dirpath, filename)
+                sample_rate = audio_info(path)["sample_rate"]
+                samples = open_audio(path)
+                for column, fields in enumerate(parsed):
+                    added += writer.add(recording_key(fields), fields["channel"], samples[:, column], sample_rate, fields)
+                del samples
+    finally:
+        writer.close()
+    return added
+
+
+class ShardReader:
+    """
+    Zero-copy access to packed recordings.
+
+    `get()` returns a slice of a read-only `np.memmap` over the shard, so no
+    decoding or copying happens until the samples are actually used.
+
+    Attributes:
+        shard_dir (str): Directory holding the shards and `index.json`.
+        entries (list): Index entries, one per (recording, channel).
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_FILENAME), "r") as index_file:
+            index = json.load(index_file)
+        self.dtype = np.dtype(index["dtype"])
+        self.shards = index["shards"]
+        self.entries = index["entries"]
+        self._lookup = {(entry["recording"], entry["channel"]): i for i, entry in enumerate(self.entries)}
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def recordings(self):
+        """
+        Returns the distinct recording keys in index order.
+        """
+        return list(dict.fromkeys(entry["recording"] for entry in self.entries))
+
+    def _map(self, shard):
+        if shard not in self._maps:
+            path = os.path.join(self.shard_dir, self.shards[shard]["file"])
+            self._maps[shard] = np.memmap(path, dtype=self.dtype, mode="r")
+        return self._maps[shard]
+
+    def get_entry(self, i):
+        """
+        Returns the samples of index entry `i` as a memmap slice.
+        """
+        entry = self.entries[i]
+        start = entry["offset"] // self.dtype.itemsize
+        return self._map(entry["shard"])[start:start + entry["frames"]]
+
+    def get(self, recording, channel):
+        """
+        Returns the samples of one channel (1-based, as in the filenames) of a recording.
+        """
+        return self.get_entry(self._lookup[(recording, channel)])
+
+    def get_recording(self, recording, channels):
+        """
+        Returns the given channels of a recording stacked as (frames, channels).
+
+        Unlike `get()` this has to copy, since channels live in separate runs.
+        """
+        return np.stack([self.get(recording, channel) for channel in channels], axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack recorder output into memory-mappable int16 shards.")
+    parser.add_argument("root", help="Dataset root written by the recorder, e.g. datasets")
+    parser.add_argument("shard_dir", help="Directory for the shards and index.json")
+    parser.add_argument("--shard-mb", type=int, default=512, help="Target shard size in MB")
+    args = parser.parse_args()
+    count = pack_dataset(args.root, args.shard_dir, args.shard_mb * 1024 * 1024)
+    print(f"Packed {count} channels into {args.shard_dir}")
@@ -0,0 +1,243 @@
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+
+from recorder.stream_capture import RingBuffer, StreamingCapture
+
+# Header slots (int64): frames written, blocks logged, anchor sequence and anchor frame
+WRITTEN, LOG_COUNT, ANCHOR_SEQ, ANCHOR_FRAME = range(4)
+HEADER_SLOTS = 8
+# Per-block log entries: first frame, frames, status bits, callback duration in ns
+LOG_SLOTS = 4096
+STATUS_OVERFLOW, STATUS_UNDERFLOW, STATUS_OTHER = 1, 2, 4
+# Header, anchor times (ADC, host) and block log, rounded up to keep the samples 64-byte aligned
+DATA_OFFSET = -(-(HEADER_SLOTS * 8 + 2 * 8 + LOG_SLOTS * 4 * 8) // 64) * 64
+
+
+class SharedRingBuffer(RingBuffer):
+    """
+    `RingBuffer` in a `multiprocessing.shared_memory` block, written by a capture process.
+
+    Besides the samples the block holds the `written` counter, the timing
+    anchor of the newest block and a log of the last `LOG_SLOTS` callbacks
+    (status and duration), so the reading process can keep `CaptureHealth`
+    up to date. The writer stores the samples before it advances `written`,
+    so readers never need a lock: frames below `written` are complete, and
+    `overwritten()` tells whether a range was replaced while it was being read.
+
+    Attributes:
+        name (str): Name of the shared memory block, for attaching from another process.
+    """
+
+    def __init__(self, capacity, channels, dtype="int16", name=None):
+        self.capacity = int(capacity)
+        self.channels = int(channels)
+        dtype = np.dtype(dtype)
+        self._owner = name is None
+        size = DATA_OFFSET + self.capacity * self.channels * dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size if self._owner else 0)
+        self.name = self.shm.name
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=buf)
+        self.times = np.ndarray((2,), dtype=np.float64, buffer=buf, offset=HEADER_SLOTS * 8)
+        self.log = np.ndarray((LOG_SLOTS, 4), dtype=np.int64, buffer=buf, offset=HEADER_SLOTS * 8 + 2 * 8)
+        self.buffer = np.ndarray((self.capacity, self.channels), dtype=dtype, buffer=buf, offset=DATA_OFFSET)
+        if self._owner:
+            self.header[:] = 0
+
+    @property
+    def written(self):
+        return int(self.header[WRITTEN])
+
+    @written.setter
+    def written(self, value):
+        self.header[WRITTEN] = value
+
+    def set_anchor(self, frame, adc_time, host_time):
+        # Odd sequence numbers mark an update in progress (seqlock)
+        self.header[ANCHOR_SEQ] += 1
+        self.header[ANCHOR_FRAME] = frame
+        self.times[:] = (adc_time, host_time)
+        self.header[ANCHOR_SEQ] += 1
+
+    def anchor(self):
+        """
+        Returns the (frame, ADC time, host time) anchor of the newest block, or None before the first block.
+        """
+        while True:
+            seq = int(self.header[ANCHOR_SEQ])
+            frame, adc_time, host_time = int(self.header[ANCHOR_FRAME]), float(self.times[0]), float(self.times[1])
+            if seq % 2 == 0 and seq == int(self.header[ANCHOR_SEQ]):
+                return (frame, adc_time, host_time) if seq else None
+
+    def log_block(self, frame, frames, status, seconds):
+        bits = 0
+        if status:
+            overflow = getattr(status, "input_overflow", False)
+            underflow = getattr(status, "input_underflow", False)
+            bits = STATUS_OVERFLOW * bool(overflow) | STATUS_UNDERFLOW * bool(underflow)
+            bits |= STATUS_OTHER * (not bits)
+        count = int(self.header[LOG_COUNT])
+        self.log[count % LOG_SLOTS] = (frame, frames, bits, int(seconds * 1e9))
+        self.header[LOG_COUNT] = count + 1
+
+    def close(self):
+        """
+        Detaches from the shared memory; the creating process also frees it.
+        """
+        # Views into the block must be gone before it can be closed
+        self.header = self.times = self.log = self.buffer = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def run_capture_process(hardware, metadata, ring_name, capacity, channels, dtype, sample_rate, blocksize, ready, stop):
+    """
+    Entry point of the capture process: runs the backend's input stream into the shared ring until `stop` is set.
+
+    Args:
+        hardware (dict): Hardware config fields, passed to `make_backend`.
+        metadata (dict): Metadata snapshot for the synthetic backend.
+    """
+    from recorder.backends import make_backend
+
+    try:
+        # Ask for a higher scheduling priority; ignored where that needs privileges
+        os.nice(-10)
+    except (AttributeError, OSError):
+        pass
+    backend = make_backend(SimpleNamespace(**hardware), lambda: metadata)
+    ring = SharedRingBuffer(capacity, channels, dtype, name=ring_name)
+
+    def callback(indata, frames, time_info, status):
+        start = time.perf_counter()
+        host_time = time.monotonic() - frames / sample_rate
+        frame = ring.written
+        ring.write(indata)
+        ring.set_anchor(frame, time_info.inputBufferAdcTime, host_time)
+        ring.log_block(frame, frames, status, time.perf_counter() - start)
+
+    stream = backend.open_input_stream(sample_rate, channels, dtype, blocksize, callback)
+    stream.start()
+    ready.set()
+    try:
+        stop.wait()
+    finally:
+        stream.stop()
+        stream.close()
+        ring.close()
+
+
+class ProcessCapture(StreamingCapture):
+    """
+    `StreamingCapture` whose input stream runs in a separate capture process.
+
+    The process opens the backend stream and writes every block into a
+    `SharedRingBuffer`, so the real-time callback no longer shares a GIL with
+    gain math, file writes, logging and printing in the recorder process. In the
+    recorder process a light thread polls the shared counters every
+    `poll_interval` seconds: it wakes up clip readers, mirrors the timing anchor
+    and replays the callback log into `health`. Everything else (`read_clip`,
+    `read_frames`, pre-roll for triggers) works as with an in-process stream.
+    Zero-copy access is available through `ring.view()`.
+
+    The process is started with the "spawn" method and rebuilds the backend
+    from the hardware config fields. The synthetic backend there sees a
+    snapshot of the metadata taken when the stream starts.
+
+    Attributes:
+        hardware (dict): Hardware config fields the capture process builds its backend from.
+        metadata (callable): Returns the recorder's current metadata.
+        poll_interval (float): Seconds between polls of the shared counters.
+    """
+
+    def __init__(self, backend, hardware, metadata, sample_rate, channels, buffer_seconds=30, blocksize=0,
+                 dtype="int16", health=None, poll_interval=0.005):
+        super().__init__(backend, sample_rate, channels, buffer_seconds, blocksize, dtype, health)
+        self.hardware = dict(hardware)
+        self.metadata = metadata
+        self.poll_interval = poll_interval
+        self._process = None
+        self._stop = None
+        self._poller = None
+        self._polling = threading.Event()
+        self._log_seen = 0
+
+    def _make_ring(self, capacity, channels, dtype):
+        return SharedRingBuffer(capacity, channels, dtype)
+
+    def start(self, timeout=30.0):
+        """
+        Starts the capture process and waits until its stream is running.
+        """
+        if self._process is not None:
+            return
+        if self.ring.buffer is None:
+            # Restarted after stop(), which freed the shared memory
+            self.ring = self._make_ring(self.ring.capacity, self.channels, self.dtype)
+        self._log_seen = 0
+        context = multiprocessing.get_context("spawn")
+        ready, self._stop = context.Event(), context.Event()
+        self._process = context.Process(
+            target=run_capture_process,
+            args=(self.hardware, dict(self.metadata()), self.ring.name, self.ring.capacity, self.channels,
+                  self.dtype, self.sample_rate, self.blocksize, ready, self._stop),
+            name=f"capture-{self.device_id}",
+            daemon=True,
+        )
+        self._process.start()
+        deadline = time.monotonic() + timeout
+        while not ready.wait(0.1):
+            if not self._process.is_alive() or time.monotonic() > deadline:
+                self._process.terminate()
+                exitcode, self._process = self._process.exitcode, None
+                raise RuntimeError(f"Capture process for device {self.device_id} did not start (exit code {exitcode})")
+        self._polling.set()
+        self._poller = threading.Thread(target=self._poll, name=f"capture-poll-{self.device_id}", daemon=True)
+        self._poller.start()
+        self.read_cursor = self.ring.written
+
+    def _poll(self):
+        status = SimpleNamespace()
+        last_written = -1
+        while self._polling.is_set():
+            anchor = self.ring.anchor()
+            count = int(self.ring.header[LOG_COUNT])
+            with self._cond:
+                if anchor is not None:
+                    self.anchor = anchor
+                written = self.ring.written
+                depth = written - self.read_cursor
+                if written != last_written:
+                    last_written = written
+                    self._cond.notify_all()
+            # Entries older than LOG_SLOTS blocks were overwritten before this poll and are skipped
+            for index in range(max(self._log_seen, count - LOG_SLOTS), count):
+                frame, frames, bits, nanoseconds = (int(value) for value in self.ring.log[index % LOG_SLOTS])
+                status.input_overflow = bool(bits & STATUS_OVERFLOW)
+                status.input_underflow = bool(bits & STATUS_UNDERFLOW)
+                self.health.record_callback(frame, frames, status if bits else None, nanoseconds / 1e9, depth)
+            self._log_seen = count
+            time.sleep(self.poll_interval)
+
+    def stop(self):
+        """
+        Stops the capture process and frees the shared ring buffer.
+        """
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+        self._polling.clear()
+        self._poller.join()
+        self._poller = None
+        self.ring.close()
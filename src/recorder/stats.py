@@ -0,0 +1,294 @@
+import argparse
+import glob
+import json
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from recorder.compressed_io import read_audio
+from recorder.manifest import _number, parse_recording_filename
+from recorder.shards import recording_key
+from recorder.verify import scan_dataset
+
+STATS_PREFIX = "dataset_stats_"
+
+
+class RunningStats:
+    """
+    Per-channel count, mean and variance, updated one clip at a time.
+
+    Each clip's mean and sum of squared deviations are computed vectorized and
+    then merged into the running totals with Chan's parallel form of Welford's
+    algorithm. Partial results from separate processes combine with `merge()`
+    to the same values a single pass would give. Samples are in the [-1, 1)
+    scale the datamodule feeds to models (int16 / 32768).
+
+    Attributes:
+        count (int): Samples per channel seen so far.
+        mean (np.ndarray): Per-channel mean.
+        m2 (np.ndarray): Per-channel sum of squared deviations from the mean.
+    """
+
+    def __init__(self, channels):
+        self.count = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+
+    def update(self, samples, block_frames=16384):
+        """
+        Adds an int16 (frames, channels) clip.
+
+        The clip is read in blocks of `block_frames` frames, so the temporaries stay
+        a fixed size however long the clip is. Integer clips are summed exactly
+        (int64 sum and sum of squares) and their mean and M2 derived from those
+        sums; float clips are merged block by block.
+        """
+        if len(samples) == 0:
+            return
+        samples = np.asarray(samples).reshape(len(samples), -1)
+        frames = len(samples)
+        if np.issubdtype(samples.dtype, np.integer):
+            total = np.zeros(samples.shape[1], dtype=np.int64)
+            squares = np.zeros(samples.shape[1], dtype=np.int64)
+            for start in range(0, frames, block_frames):
+                block = samples[start:start + block_frames].astype(np.int64)
+                total += block.sum(axis=0)
+                squares += np.einsum("fc,fc->c", block, block)
+            # n * M2 = n * sum(x^2) - sum(x)^2 is exact in Python integers, so there is no cancellation
+            m2 = np.array([(int(sq) * frames - int(t) * int(t)) / frames for t, sq in zip(total, squares)])
+            self._combine(frames, total / frames * (1.0 / 32768.0), m2 * (1.0 / 32768.0 ** 2))
+            return
+        for start in range(0, frames, block_frames):
+            block = samples[start:start + block_frames].astype(np.float64) * (1.0 / 32768.0)
+            mean = block.mean(axis=0)
+            self._combine(len(block), mean, np.square(block - mean).sum(axis=0))
+
+    def merge(self, other):
+        """
+        Adds the samples summarized by another `RunningStats` over the same channels.
+        """
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + np.square(delta) * (self.count * count / total)
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else np.zeros_like(self.m2)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def rms(self):
+        return np.sqrt(self.variance + np.square(self.mean))
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "std": self.std.tolist(),
+            "rms_dbfs": (20.0 * np.log10(self.rms + 1e-12)).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        stats = cls(len(values["mean"]))
+        stats.count = int(values["count"])
+        stats.mean = np.asarray(values["mean"], dtype=np.float64)
+        stats.m2 = np.asarray(values["m2"], dtype=np.float64)
+        return stats
+
+
+def _key(value):
+    # JSON object keys are strings; clips without a category or DOA count under "".
+    # Numbers are normalized so a DOA of 30.0 from the metadata and 30 from a filename match.
+    if value is None:
+        return ""
+    number = _number(value)
+    return str(value if number is None else number)
+
+
+class DatasetStats:
+    """
+    Running statistics of the clips saved by one device.
+
+    Keeps per-channel `RunningStats` of all clips, pooled `RunningStats` per
+    category, and clip counts per category, per DOA and per (category, DOA).
+    The recorder updates them in `save()` and writes them to
+    `<output_dir>/dataset_stats_<type>.json`. An existing file is loaded first,
+    so the statistics grow across sessions. With these files, normalization
+    constants and class-balanced sampling weights need no pass over the audio.
+
+    Attributes:
+        hardware (str): Device type the statistics belong to.
+        path (str): JSON file the statistics are persisted to.
+        channels (RunningStats): Per-channel statistics over all clips.
+        categories (dict): Category -> `RunningStats` over the samples of all channels.
+        counts (dict): `category`, `doa` and `category_doa` clip counts.
+    """
+
+    def __init__(self, hardware, path=None):
+        self.hardware = hardware
+        self.path = path
+        self.channels = None
+        self.categories = {}
+        self.counts = {"category": defaultdict(int), "doa": defaultdict(int), "category_doa": defaultdict(int)}
+        self.clips = 0
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as stats_file:
+                self._load(json.load(stats_file))
+
+    def _load(self, values):
+        self.hardware = self.hardware or values["hardware"]
+        self.clips = values["clips"]
+        self.channels = RunningStats.from_dict(values["channels"]) if values.get("channels") else None
+        self.categories = {name: RunningStats.from_dict(stats) for name, stats in values["categories"].items()}
+        for kind, counts in values["counts"].items():
+            self.counts[kind].update(counts)
+
+    @classmethod
+    def from_dict(cls, values, path=None):
+        stats = cls(None, path)
+        stats._load(values)
+        return stats
+
+    def add(self, recording, category=None, doa=None):
+        """
+        Adds one saved clip (int16, (frames, channels)).
+        """
+        category, doa = _key(category), _key(doa)
+        clip = RunningStats(recording.shape[1] if recording.ndim > 1 else 1)
+        clip.update(recording)
+        with self._lock:
+            self._add(clip, category, doa)
+
+    def _add(self, clip, category, doa):
+        if self.channels is None:
+            self.channels = RunningStats(len(clip.mean))
+        if len(clip.mean) != len(self.channels.mean):
+            raise ValueError(f"{self.hardware} clip has {len(clip.mean)} channels, statistics have {len(self.channels.mean)}")
+        self.channels.merge(clip)
+        pooled = self.categories.setdefault(category, RunningStats(1))
+        pooled.merge(_pool_channels(clip))
+        self.counts["category"][category] += 1
+        self.counts["doa"][doa] += 1
+        self.counts["category_doa"][f"{category}|{doa}"] += 1
+        self.clips += 1
+
+    def merge(self, other):
+        with self._lock:
+            if other.channels is not None:
+                if self.channels is None:
+                    self.channels = RunningStats(len(other.channels.mean))
+                self.channels.merge(other.channels)
+            for name, stats in other.categories.items():
+                self.categories.setdefault(name, RunningStats(1)).merge(stats)
+            for kind, counts in other.counts.items():
+                for key, count in counts.items():
+                    self.counts[kind][key] += count
+            self.clips += other.clips
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "hardware": self.hardware,
+                "clips": self.clips,
+                "channels": self.channels.to_dict() if self.channels is not None else None,
+                "categories": {name: stats.to_dict() for name, stats in sorted(self.categories.items())},
+                "counts": {kind: dict(sorted(counts.items())) for kind, counts in self.counts.items()},
+            }
+
+    def save(self, path=None):
+        """
+        Writes the statistics atomically to `path` (default: the file they were loaded from).
+        """
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "w") as stats_file:
+            json.dump(self.to_dict(), stats_file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+
+def _pool_channels(stats):
+    # Treats all channels as one: merges the per-channel moments into a single channel
+    pooled = RunningStats(1)
+    for channel in range(len(stats.mean)):
+        part = RunningStats(1)
+        part.count, part.mean, part.m2 = stats.count, stats.mean[channel:channel + 1], stats.m2[channel:channel + 1]
+        pooled.merge(part)
+    return pooled
+
+
+def stats_path(root, hardware):
+    return os.path.join(root, f"{STATS_PREFIX}{hardware}.json")
+
+
+def load_dataset_stats(root):
+    """
+    Loads the statistics files of every device below `root`.
+
+    Returns:
+        dict: Device type -> `DatasetStats`.
+    """
+    stats = [DatasetStats(None, path) for path in sorted(glob.glob(os.path.join(root, f"{STATS_PREFIX}*.json")))]
+    return {device_stats.hardware: device_stats for device_stats in stats}
+
+
+def _recording_stats(sources):
+    """
+    Statistics of one recording from its `(path, column, ...)` sources; runs in a worker process.
+
+    Returns the `to_dict()` form, which pickles without the lock.
+    """
+    hardware, category, doa = sources[0][2], sources[0][3], sources[0][4]
+    columns = [read_audio(path)[:, column] for path, column, *_ in sources]
+    frames = min(len(column) for column in columns)
+    clip = DatasetStats(hardware)
+    clip.add(np.stack([column[:frames] for column in columns], axis=1), category, doa)
+    return clip.to_dict()
+
+
+def rebuild_stats(root, workers=None):
+    """
+    Recomputes the statistics files of every device from the audio below `root` in a process pool.
+
+    Returns:
+        dict: Device type -> `DatasetStats`, already written to `root`.
+    """
+    paths, _ = scan_dataset(root)
+    recordings = defaultdict(list)
+    for path in paths:
+        for column, fields in enumerate(parse_recording_filename(path)):
+            recordings[recording_key(fields)].append(
+                (fields["channel"], path, column, fields["hardware"], fields["category"], fields["doa"])
+            )
+    tasks = [[source[1:] for source in sorted(sources)] for sources in recordings.values()]
+    stats = {}
+    with ProcessPoolExecutor(workers) as executor:
+        for values in executor.map(_recording_stats, tasks, chunksize=32):
+            clip = DatasetStats.from_dict(values)
+            stats.setdefault(clip.hardware, DatasetStats(clip.hardware)).merge(clip)
+    for hardware, device_stats in stats.items():
+        device_stats.save(stats_path(root, hardware))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the per-device dataset statistics from the saved audio. Run from src/ as `python -m recorder.stats <root>`.")
+    parser.add_argument("root", help="Dataset root written by the recorder, e.g. datasets")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    args = parser.parse_args()
+    for hardware, device_stats in rebuild_stats(args.root, args.workers).items():
+        print(f"{hardware}: {device_stats.clips} clips -> {stats_path(args.root, hardware)}")
@@ -0,0 +1,274 @@
+import threading
+import time
+
+import numpy as np
+
+from recorder.health import CaptureHealth
+
+
+class RingBuffer:
+    """
+    Preallocated multi-channel ring buffer filled by the capture callback.
+
+    Frames are addressed by an absolute, ever-increasing frame index so the
+    reader can tell exactly which part of the stream a clip was cut from and
+    whether the writer has lapped it.
+
+    Attributes:
+        capacity (int): Number of frames the buffer can hold.
+        channels (int): Number of interleaved channels per frame.
+        written (int): Absolute index of the next frame to be written.
+    """
+
+    def __init__(self, capacity, channels, dtype="int16"):
+        self.capacity = int(capacity)
+        self.channels = int(channels)
+        self.buffer = np.zeros((self.capacity, self.channels), dtype=dtype)
+        self.written = 0
+
+    def write(self, block):
+        """
+        Copies a (frames, channels) block into the buffer, wrapping around at the end.
+        """
+        frames = len(block)
+        if frames > self.capacity:
+            # Only the newest `capacity` frames can survive anyway
+            block = block[-self.capacity:]
+            self.written += frames - self.capacity
+            frames = self.capacity
+        start = self.written % self.capacity
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        if first < frames:
+            self.buffer[:frames - first] = block[first:]
+        self.written += frames
+
+    def read(self, start_frame, frames, out=None):
+        """
+        Copies `frames` frames starting at absolute index `start_frame` into `out`.
+
+        The result is always a C-contiguous (frames, channels) array, so it can be
+        handed to the writers without another copy.
+        """
+        if out is None:
+            out = np.empty((frames, self.channels), dtype=self.buffer.dtype)
+        start = start_frame % self.capacity
+        first = min(frames, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < frames:
+            out[first:] = self.buffer[:frames - first]
+        return out
+
+    def view(self, start_frame, frames):
+        """
+        Returns a zero-copy view of `frames` frames from absolute index `start_frame`.
+
+        Returns None if the range wraps around the end of the buffer or is no
+        longer (or not yet) in it. The writer may overwrite the view's memory;
+        check `overwritten(start_frame)` after using it.
+        """
+        written = self.written
+        if start_frame < written - self.capacity or start_frame + frames > written:
+            return None
+        start = start_frame % self.capacity
+        if start + frames > self.capacity:
+            return None
+        return self.buffer[start:start + frames]
+
+    def overwritten(self, start_frame):
+        """
+        Number of frames from `start_frame` on that the writer has already replaced.
+        """
+        return max(0, self.written - self.capacity - start_frame)
+
+
+class StreamingCapture:
+    """
+    Keeps one input stream open and cuts its output into fixed-length clips.
+
+    The PortAudio callback only copies each block into a preallocated `RingBuffer`;
+    `read_clip()` waits until enough frames are available after the read cursor and
+    returns them. Consecutive clips are therefore gapless and the device is never
+    stopped between them.
+
+    Attributes:
+        backend (CaptureBackend): Source of the input stream.
+        device_id (str): Name of the backend's device, for messages.
+        sample_rate (int): Sampling rate in Hz.
+        channels (int): Number of channels to capture.
+        ring (RingBuffer): Buffer shared between the callback and the reader.
+        read_cursor (int): Absolute frame index of the next clip.
+        dropped_frames (int): Frames overwritten before they could be read.
+        anchor (tuple): (frame index, ADC time, host time) of the newest block, used to map frames to time.
+        clip_start_time (dict): ADC and host time of the first frame of the last clip.
+        health (CaptureHealth): Callback status, timing and backlog counters.
+        clip_health (dict): `CaptureHealth.clip_report()` of the last clip.
+    """
+
+    def __init__(self, backend, sample_rate, channels, buffer_seconds=30, blocksize=0, dtype="int16", health=None):
+        self.backend = backend
+        self.device_id = backend.name
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.blocksize = int(blocksize)
+        self.dtype = dtype
+        self.ring = self._make_ring(int(buffer_seconds * self.sample_rate), self.channels, dtype)
+        self.read_cursor = 0
+        self.dropped_frames = 0
+        self.anchor = None
+        self.clip_start_time = None
+        self.health = health if health is not None else CaptureHealth(self.device_id)
+        self.clip_health = None
+        self._cond = threading.Condition()
+        self._stream = None
+
+    def _make_ring(self, capacity, channels, dtype):
+        return RingBuffer(capacity, channels, dtype=dtype)
+
+    def _callback(self, indata, frames, time_info, status):
+        # Status flags are counted rather than printed; printing here can itself cause overflows
+        start = time.perf_counter()
+        # Host time of the first frame, for host APIs that report no ADC time
+        host_time = time.monotonic() - frames / self.sample_rate
+        with self._cond:
+            frame = self.ring.written
+            self.anchor = (frame, time_info.inputBufferAdcTime, host_time)
+            self.ring.write(indata)
+            depth = self.ring.written - self.read_cursor
+            self._cond.notify_all()
+        self.health.record_callback(frame, frames, status, time.perf_counter() - start, depth)
+
+    def frame_time(self, frame, clock="adc"):
+        """
+        Estimates the capture time of absolute frame index `frame`.
+
+        Args:
+            clock (str): "adc" for PortAudio's `inputBufferAdcTime` base, "host" for `time.monotonic()`.
+        """
+        anchor_frame, adc_time, host_time = self.anchor
+        base = adc_time if clock == "adc" else host_time
+        return base + (frame - anchor_frame) / self.sample_rate
+
+    def has_adc_time(self):
+        """
+        Returns True if the host API reports ADC timestamps (some ALSA setups report 0).
+        """
+        return self.anchor is not None and self.anchor[1] > 0
+
+    def wait_for_data(self, timeout=2.0):
+        """
+        Blocks until the first block has arrived, so timestamps are available.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.anchor is not None, timeout=timeout)
+
+    def seek_time(self, start_time, clock="adc"):
+        """
+        Moves the read cursor forward to the frame captured at `start_time`.
+
+        Returns:
+            int: Number of frames skipped.
+        """
+        with self._cond:
+            anchor_frame, adc_time, host_time = self.anchor
+            base = adc_time if clock == "adc" else host_time
+            target = anchor_frame + int(round((start_time - base) * self.sample_rate))
+            skipped = max(0, target - self.read_cursor)
+            self.read_cursor += skipped
+            return skipped
+
+    def start(self):
+        """
+        Opens and starts the input stream if it is not running yet.
+        """
+        if self._stream is not None:
+            return
+        self._stream = self.backend.open_input_stream(
+            self.sample_rate, self.channels, self.dtype, self.blocksize, self._callback
+        )
+        self._stream.start()
+        # Start cutting clips from the first frame delivered after the stream opened
+        self.read_cursor = self.ring.written
+
+    def discard_buffered(self):
+        """
+        Moves the read cursor to the newest frame, so the next clip starts with fresh audio.
+
+        Returns:
+            int: Number of frames skipped.
+        """
+        with self._cond:
+            skipped = self.ring.written - self.read_cursor
+            self.read_cursor = self.ring.written
+            return skipped
+
+    def read_clip(self, frames, timeout=None, report=True):
+        """
+        Blocks until `frames` new frames are available and returns them as one clip.
+
+        Args:
+            frames (int): Clip length in frames.
+            timeout (float): Seconds to wait before giving up; defaults to twice the clip length.
+            report (bool): Set `clip_health` for the clip; off for reads that are not saved as clips.
+
+        Returns:
+            np.ndarray: C-contiguous (frames, channels) array, or None on timeout.
+        """
+        if frames > self.ring.capacity:
+            raise ValueError(f"Clip of {frames} frames does not fit into a ring buffer of {self.ring.capacity} frames")
+        if timeout is None:
+            timeout = 2 * frames / self.sample_rate + 1
+        with self._cond:
+            ready = self._cond.wait_for(lambda: self.ring.written - self.read_cursor >= frames, timeout=timeout)
+            if not ready:
+                return None
+            oldest = self.ring.written - self.ring.capacity
+            dropped = 0
+            if self.read_cursor < oldest:
+                # The callback lapped us; skip ahead to the oldest frame still in the buffer
+                dropped = oldest - self.read_cursor
+                self.dropped_frames += dropped
+                self.health.record_dropped(dropped)
+                print(f"Capture on device {self.device_id} fell behind, dropped {dropped} frames")
+                self.read_cursor = oldest
+            clip = self.ring.read(self.read_cursor, frames)
+            # A capture process writes without taking `_cond`; frames it replaced during the copy are lost
+            torn = self.ring.overwritten(self.read_cursor)
+            if torn:
+                dropped += torn
+                self.dropped_frames += torn
+                self.health.record_dropped(torn)
+            if report:
+                self.clip_health = self.health.clip_report(self.read_cursor, frames, dropped)
+            self.clip_start_time = {
+                "adc": self.frame_time(self.read_cursor, "adc"),
+                "host": self.frame_time(self.read_cursor, "host"),
+            }
+            self.read_cursor += frames
+        return clip
+
+    def read_frames(self, start_frame, frames):
+        """
+        Copies frames that were already read, e.g. pre-roll before a trigger, and sets `clip_health` for them.
+
+        Returns:
+            np.ndarray: C-contiguous (frames, channels) array, or None if part of the range was overwritten.
+        """
+        with self._cond:
+            if start_frame < self.ring.written - self.ring.capacity or start_frame + frames > self.ring.written:
+                return None
+            clip = self.ring.read(start_frame, frames)
+            if self.ring.overwritten(start_frame):
+                return None
+            self.clip_health = self.health.clip_report(start_frame, frames)
+        return clip
+
+    def stop(self):
+        """
+        Stops and closes the input stream.
+        """
+        if self._stream is None:
+            return
+        self._stream.stop()
+        self._stream.close()
+        self._stream = None
@@ -0,0 +1,145 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+# Sweepable metadata fields and the experiment config range each one is drawn from
+SWEEP_RANGES = {
+    "doa": "doa_range",
+    "elevation": "elevation_range",
+    "frequency": "frequency_range",
+    "amplitude": "amplitude_range",
+}
+
+
+def _as_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 6)
+
+
+def expand_range(parameter, value_range, step):
+    """
+    Returns the grid values of `parameter` from `value_range.min` to `value_range.max` (inclusive).
+
+    A full circle of DOA stops before `min + 360`, which is the same direction as `min`.
+    """
+    low, high = float(value_range["min"]), float(value_range["max"])
+    values = np.arange(low, high + step / 2, step)
+    if parameter == "doa":
+        values = values[values - low < 360]
+    return [_as_number(value) for value in values]
+
+
+def build_plan(experiment_config):
+    """
+    Expands the `sweep` section of the experiment config into a list of points.
+
+    Parameters listed in `sweep.steps` are varied over their `<parameter>_range`;
+    all others keep the experiment's scalar value. In "grid" mode every
+    combination is visited in order; in "random" mode `sweep.points` points are
+    drawn uniformly from the ranges with `sweep.seed`.
+
+    Returns:
+        list: One dict of metadata values (`doa`, `elevation`, `frequency`, `amplitude`) per point.
+    """
+    sweep = experiment_config.sweep
+    steps = dict(getattr(sweep, "steps", None) or {})
+    unknown = set(steps) - set(SWEEP_RANGES)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)}; supported parameters are {sorted(SWEEP_RANGES)}")
+    fixed = {parameter: experiment_config[parameter] for parameter in SWEEP_RANGES if parameter not in steps}
+    mode = getattr(sweep, "mode", "grid")
+    if mode == "grid":
+        axes = {parameter: expand_range(parameter, experiment_config[SWEEP_RANGES[parameter]], float(step))
+                for parameter, step in steps.items()}
+        return [{**fixed, **dict(zip(axes, values))} for values in itertools.product(*axes.values())]
+    if mode == "random":
+        rng = np.random.default_rng(getattr(sweep, "seed", 0))
+        plan = []
+        for _ in range(int(sweep.points)):
+            point = dict(fixed)
+            for parameter in steps:
+                value_range = experiment_config[SWEEP_RANGES[parameter]]
+                point[parameter] = _as_number(rng.uniform(float(value_range["min"]), float(value_range["max"])))
+            plan.append(point)
+        return plan
+    raise ValueError(f"Unsupported sweep mode: {mode}")
+
+
+class SweepCheckpoint:
+    """
+    Progress of a sweep, stored next to the recordings so an interrupted sweep can resume.
+
+    The checkpoint is tied to a hash of the plan; a changed plan starts from the
+    first point again instead of skipping points that were never recorded.
+
+    Attributes:
+        path (str): JSON file holding the plan hash and the number of completed points.
+        completed (int): Points fully recorded and flushed.
+    """
+
+    def __init__(self, path, plan, samples_per_point):
+        self.path = path
+        self.plan_hash = hashlib.sha1(json.dumps([plan, samples_per_point], sort_keys=True).encode()).hexdigest()
+        self.total = len(plan)
+        self.completed = 0
+        if os.path.exists(path):
+            with open(path, "r") as checkpoint_file:
+                state = json.load(checkpoint_file)
+            if state.get("plan_hash") == self.plan_hash:
+                self.completed = int(state["completed"])
+            else:
+                print(f"Sweep plan changed since {path} was written; starting from the first point")
+
+    def advance(self):
+        """
+        Marks the next point as completed and writes the checkpoint atomically.
+        """
+        self.completed += 1
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump({"plan_hash": self.plan_hash, "completed": self.completed, "total": self.total}, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def run_sweep(recorder, metadata, plan, checkpoint, samples_per_point=1, settle_seconds=0.0, logger=None):
+    """
+    Records `samples_per_point` clips at every remaining point of `plan` with one recorder.
+
+    The metadata dict shared with the recorder is updated in place for each
+    point, so the input stream stays open for the whole sweep. Audio buffered
+    while switching points is discarded. After each point the recorder is
+    flushed (writing its labels in one batch) before the checkpoint advances.
+
+    Args:
+        recorder: `RecorderHardware` or `MultiDeviceRecorder`.
+        metadata (dict): Metadata dict the recorder was created with.
+        plan (list): Points from `build_plan`.
+        checkpoint (SweepCheckpoint): Progress of this sweep.
+        settle_seconds (float): Pause after switching to a new point, e.g. to move a source.
+    """
+    log = logger.info if logger is not None else print
+    if checkpoint.completed:
+        log(f"Resuming sweep at point {checkpoint.completed + 1}/{len(plan)}")
+    for index in range(checkpoint.completed, len(plan)):
+        point = plan[index]
+        metadata.update(point)
+        log(f"Sweep point {index + 1}/{len(plan)}: {point}")
+        if settle_seconds:
+            time.sleep(settle_seconds)
+        if recorder.streaming:
+            recorder.discard_buffered()
+        for sample in range(samples_per_point):
+            recording = recorder.record()
+            if recording is None:
+                raise RuntimeError(f"Recording failed at sweep point {index + 1}; rerun to resume from this point")
+            recorder.save(recording, f"point_{index + 1}_sample_{sample + 1}")
+        recorder.flush()
+        checkpoint.advance()
+    log(f"Sweep finished: {len(plan)} points")
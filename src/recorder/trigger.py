@@ -0,0 +1,187 @@
+import datetime
+import time
+
+import numpy as np
+
+
+class BlockDetector:
+    """
+    Scores fixed-size blocks of multichannel audio for event activity.
+
+    "energy" scores a block by its mean power on the loudest channel. "flux"
+    scores it by the spectral flux (summed positive magnitude change against the
+    previous block), averaged over channels, which also catches onsets that do not
+    raise the overall level much. All blocks of a chunk and all channels are
+    scored in one vectorized call. Scores are in dB so the same threshold
+    logic applies to both.
+
+    Attributes:
+        mode (str): "energy" or "flux".
+        block_frames (int): Frames per scored block.
+    """
+
+    def __init__(self, mode="energy", block_frames=320):
+        if mode not in ("energy", "flux"):
+            raise ValueError(f"Unsupported trigger mode: {mode}")
+        self.mode = mode
+        self.block_frames = int(block_frames)
+        self._window = np.hanning(self.block_frames).astype(np.float32)
+        self._previous = None
+
+    def scores(self, chunk):
+        """
+        Returns one dB score per whole block of an int16 (frames, channels) chunk.
+        """
+        blocks = len(chunk) // self.block_frames
+        audio = chunk[:blocks * self.block_frames].reshape(blocks, self.block_frames, -1)
+        audio = audio.astype(np.float32) * (1.0 / 32768.0)
+        if self.mode == "energy":
+            power = np.einsum("bfc,bfc->bc", audio, audio) / self.block_frames
+            return 10.0 * np.log10(power.max(axis=1) + 1e-12)
+        magnitude = np.abs(np.fft.rfft(audio * self._window[:, None], axis=1))
+        previous = self._previous if self._previous is not None else np.full_like(magnitude[:1], np.nan)
+        stacked = np.concatenate([previous, magnitude])
+        flux = np.maximum(stacked[1:] - stacked[:-1], 0.0).sum(axis=1) / magnitude.shape[1]
+        self._previous = magnitude[-1:]
+        # The very first block has no predecessor and scores NaN
+        return 20.0 * np.log10(flux.mean(axis=1) + 1e-12)
+
+
+class TriggeredRecorder:
+    """
+    Records only the parts of a running stream that contain events.
+
+    Wraps a streaming `AudioRecorder` and offers the same `record()`/`save()`
+    interface, but `record()` returns one event per call instead of a fixed-length
+    clip. Blocks are scored by a `BlockDetector` against an adaptive noise floor
+    (an exponential average of the scores of inactive blocks). An event opens
+    when a block exceeds the floor by `threshold_db` and closes once the score has
+    stayed below it for `release_seconds`, but not before `hold_seconds` have
+    passed, and at the latest after `max_event_seconds`. The stream's ring buffer
+    doubles as the pre-roll buffer: the event is copied out starting
+    `pre_roll_seconds` before the trigger.
+
+    Attributes:
+        recorder (AudioRecorder): Recorder whose stream is monitored and which saves the events.
+        detector (BlockDetector): Block scorer.
+        threshold_db (float): Margin above the noise floor that triggers an event.
+        noise_floor_db (float): Current noise floor estimate.
+        last_event (dict): Labels of the event returned by the last `record()`.
+    """
+
+    def __init__(self, recorder, mode="energy", threshold_db=12.0, block_ms=20.0, pre_roll_seconds=0.5,
+                 hold_seconds=0.5, release_seconds=0.3, max_event_seconds=10.0, timeout=None, floor_alpha=0.05,
+                 calibration_seconds=0.5):
+        self.recorder = recorder
+        self.sample_rate = recorder.sample_rate
+        self.detector = BlockDetector(mode, max(1, int(self.sample_rate * block_ms / 1000.0)))
+        self.threshold_db = float(threshold_db)
+        self.pre_roll = int(pre_roll_seconds * self.sample_rate)
+        self.hold = int(hold_seconds * self.sample_rate)
+        self.release = int(release_seconds * self.sample_rate)
+        self.max_event = int(max_event_seconds * self.sample_rate)
+        self.timeout = timeout
+        self.floor_alpha = float(floor_alpha)
+        self.noise_floor_db = None
+        # Scores collected before the first floor estimate; nothing triggers until it exists
+        self._calibration = []
+        self._calibration_blocks = max(1, int(calibration_seconds * 1000.0 / block_ms))
+        self.last_event = None
+        # Blocks scored but not yet evaluated when the previous event closed
+        self._pending_frames = np.empty(0, dtype=np.int64)
+        self._pending_scores = np.empty(0)
+
+    @property
+    def streaming(self):
+        return True
+
+    def _next_scores(self, stream):
+        if len(self._pending_frames):
+            frames, scores = self._pending_frames, self._pending_scores
+            self._pending_frames, self._pending_scores = frames[:0], scores[:0]
+            return frames, scores
+        block = self.detector.block_frames
+        # Score everything that has arrived in one vectorized call, at least one block
+        available = (stream.ring.written - stream.read_cursor) // block
+        chunk = stream.read_clip(max(1, min(available, 64)) * block, report=False)
+        if chunk is None:
+            return None, None
+        start = stream.read_cursor - len(chunk)
+        scores = self.detector.scores(chunk)
+        return start + block * np.arange(len(scores)), scores
+
+    def record(self):
+        """
+        Blocks until the next event has ended and returns it including the pre-roll.
+
+        Returns:
+            np.ndarray: (frames, channels) int16 event, or None if `timeout` passed without an event.
+        """
+        recorder = self.recorder
+        recorder.start_stream()
+        stream = recorder.stream
+        if self.pre_roll + self.max_event + 64 * self.detector.block_frames > stream.ring.capacity:
+            raise ValueError("buffer_seconds must cover pre_roll_seconds + max_event_seconds plus one analysis chunk")
+        block = self.detector.block_frames
+        started = time.monotonic()
+        event_start = None
+        while True:
+            frames, scores = self._next_scores(stream)
+            if frames is None:
+                print(f"Timed out waiting for audio from device {recorder.device_id}")
+                return None
+            for i, (frame, score) in enumerate(zip(frames, scores)):
+                if np.isnan(score):
+                    continue
+                if self.noise_floor_db is None:
+                    self._calibration.append(score)
+                    if len(self._calibration) >= self._calibration_blocks:
+                        self.noise_floor_db = float(np.median(self._calibration))
+                    continue
+                active = score > self.noise_floor_db + self.threshold_db
+                if event_start is None:
+                    if active:
+                        event_start = last_active = frame
+                        peak = score
+                        floor = self.noise_floor_db
+                    else:
+                        self.noise_floor_db += self.floor_alpha * (score - self.noise_floor_db)
+                    continue
+                end = frame + block
+                if active:
+                    last_active = end
+                    peak = max(peak, score)
+                quiet = end - last_active >= self.release and end - event_start >= self.hold
+                if quiet or end - event_start >= self.max_event:
+                    self._pending_frames, self._pending_scores = frames[i + 1:], scores[i + 1:]
+                    return self._cut(stream, event_start, end, peak, floor)
+            if event_start is None and self.timeout is not None and time.monotonic() - started > self.timeout:
+                return None
+
+    def _cut(self, stream, event_start, end, peak, floor):
+        start = max(event_start - self.pre_roll, stream.ring.written - stream.ring.capacity, 0)
+        recording = stream.read_frames(start, end - start)
+        self.last_event = {
+            "trigger_mode": self.detector.mode,
+            "event_pre_roll_s": float(event_start - start) / self.sample_rate,
+            "event_duration_s": float(end - event_start) / self.sample_rate,
+            "event_peak_db": float(peak),
+            "noise_floor_db": float(floor),
+            "event_start_time": float(stream.frame_time(event_start, "host")),
+        }
+        return recording
+
+    def save(self, recording, filename):
+        # Name the files after the event's start so events ending in the same second stay apart
+        started = datetime.datetime.now() - datetime.timedelta(seconds=time.monotonic() - self.last_event["event_start_time"])
+        self.recorder.save(recording, filename, timestamp=started, extra_labels=self.last_event)
+
+    def discard_buffered(self):
+        self._pending_frames, self._pending_scores = self._pending_frames[:0], self._pending_scores[:0]
+        self.recorder.discard_buffered()
+
+    def flush(self):
+        self.recorder.flush()
+
+    def close(self):
+        self.recorder.close()
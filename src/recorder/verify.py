@@ -0,0 +1,399 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from recorder.compressed_io import DZL_MAGIC, DeltaZlibReader, audio_info
+from recorder.label_store import JsonlLabelStore
+from recorder.manifest import QUARANTINE_DIR, RecordingManifest, _number, parse_recording_filename
+from recorder.shards import recording_key
+from recorder.wav_io import read_wav_header
+
+DATE_FOLDER = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIME_FOLDER = re.compile(r"^\d{2}-\d{2}-\d{2}(?:-\d{6})?$")
+# Problems that make a file unusable; `--quarantine` moves such files out of the dataset
+QUARANTINE_PROBLEMS = ("unreadable", "truncated", "channel_count_mismatch", "stray_file")
+# Label fields that identify a clip when the label predates the `recording` key
+FINGERPRINT_FIELDS = ("doa", "elevation", "frequency", "amplitude", "duration")
+
+
+def scan_dataset(root):
+    """
+    Lists the files in the `<date>/<time>` folders that `AudioRecorder.save()` creates.
+
+    `os.scandir` is used instead of `os.walk` so no file is stat-ed twice.
+
+    Returns:
+        tuple: Recording file paths and stray paths (names `save()` never writes, e.g. `.tmp` leftovers).
+    """
+    recordings, strays = [], []
+    for date_entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if not date_entry.is_dir() or not DATE_FOLDER.match(date_entry.name):
+            continue
+        for time_entry in sorted(os.scandir(date_entry.path), key=lambda entry: entry.name):
+            if not time_entry.is_dir() or not TIME_FOLDER.match(time_entry.name):
+                continue
+            for entry in os.scandir(time_entry.path):
+                if not entry.is_file():
+                    continue
+                target = recordings if parse_recording_filename(entry.name) is not None else strays
+                target.append(entry.path)
+    return recordings, strays
+
+
+def file_checksum(path, chunk_bytes=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_file(path, checksum=True):
+    """
+    Validates the header of one recording file and optionally checksums it.
+
+    Module-level so it can run in a process pool.
+
+    Returns:
+        dict: `path`, `size`, `channels`, `sample_rate`, `frames`, `sha256` and `problems`,
+        a list of `(problem, detail)` pairs.
+    """
+    result = {"path": path, "size": os.path.getsize(path), "channels": None, "sample_rate": None,
+              "frames": None, "sha256": None, "problems": []}
+    try:
+        if path.endswith(".dzl"):
+            reader = DeltaZlibReader(path)
+            index_size = result["size"] - 8 - reader.offsets[-1]
+            if index_size <= 0 or reader.offsets[0] != len(DZL_MAGIC):
+                raise ValueError("block index does not match the file size")
+            result.update(channels=reader.channels, sample_rate=reader.sample_rate, frames=reader.frames)
+        elif path.endswith(".flac"):
+            result.update(audio_info(path))
+        else:
+            header = read_wav_header(path)
+            result.update(channels=header["channels"], sample_rate=header["sample_rate"], frames=header["frames"])
+            if header["sampwidth"] != 2:
+                result["problems"].append(("unreadable", f"{header['sampwidth'] * 8}-bit samples, expected 16-bit"))
+            if header["declared_frames"] > header["frames"]:
+                result["problems"].append(("truncated", f"header declares {header['declared_frames']} frames, "
+                                                        f"file holds {header['frames']}"))
+    except (OSError, ValueError, KeyError, struct.error, RuntimeError) as exc:
+        result["problems"].append(("unreadable", str(exc)))
+    if checksum:
+        result["sha256"] = file_checksum(path)
+    return result
+
+
+def repair_wav_header(path):
+    """
+    Rewrites the size fields of a truncated WAV/RF64 file to match the samples it actually holds.
+
+    A trailing partial frame is cut off. Returns the number of frames kept.
+    """
+    header = read_wav_header(path)
+    frame_size = header["channels"] * header["sampwidth"]
+    data_size = header["frames"] * frame_size
+    with open(path, "r+b") as f:
+        f.truncate(header["data_offset"] + data_size)
+        riff_id = f.read(4)
+        if riff_id == b"RF64":
+            # ds64 chunk directly after the RIFF header: riff size, data size, sample count
+            f.seek(20)
+            f.write(struct.pack("<QQQ", header["data_offset"] - 8 + data_size, data_size, header["frames"]))
+        else:
+            f.write(struct.pack("<I", header["data_offset"] - 8 + data_size))
+            f.seek(header["data_offset"] - 4)
+            f.write(struct.pack("<I", data_size))
+    return header["frames"]
+
+
+def load_hardware_channels(paths):
+    """
+    Reads `type -> (channels, sample_rate)` from hardware config yaml files or directories of them.
+    """
+    import yaml
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".yaml"))
+        else:
+            files.append(path)
+    hardware = {}
+    for path in files:
+        with open(path, "r") as config_file:
+            config = yaml.safe_load(config_file) or {}
+        for device in (config.get("hardware_config") or {}).values():
+            if isinstance(device, dict) and "type" in device and "channels" in device:
+                hardware[device["type"]] = (int(device["channels"]), device.get("sample_rate"))
+    return hardware
+
+
+def _fingerprint(values):
+    return tuple(_number(values.get(field)) for field in FINGERPRINT_FIELDS)
+
+
+def read_labels(root):
+    """
+    Reads the label entries of a dataset without modifying the label files.
+
+    Returns:
+        tuple: Entries and a list of `(problem, detail)` pairs for unreadable label files.
+    """
+    entries, problems = [], []
+    jsonl_path = os.path.join(root, "experiment_labels.jsonl")
+    if os.path.exists(jsonl_path):
+        entries.extend(JsonlLabelStore(jsonl_path).read())
+    json_path = os.path.join(root, "experiment_labels.json")
+    if os.path.exists(json_path):
+        try:
+            with open(json_path, "r") as label_file:
+                entries.extend(json.load(label_file))
+        except (json.JSONDecodeError, TypeError) as exc:
+            problems.append(("label_file_unreadable", f"{json_path}: {exc}"))
+    return entries, problems
+
+
+class DatasetVerifier:
+    """
+    Cross-checks the audio files, hardware configs and labels of a dataset tree.
+
+    Files are checked in a process pool (header, length and SHA-256), then
+    grouped into recordings (one clip of one device, see `shards.recording_key`)
+    in the parent process. There the verifier looks for channels that are
+    missing, duplicated or have the wrong count, compares clip lengths with
+    `duration * sample_rate`, and matches labels to recordings. A label
+    carrying a `recording` key is matched exactly. Older labels are matched by
+    their doa/elevation/frequency/amplitude/duration fingerprint.
+
+    Attributes:
+        root (str): Dataset root (the recorder's `output_dir`).
+        hardware (dict): `type -> (channels, sample_rate)` from the hardware configs.
+        sample_rate (int): Expected rate of every file, overriding the hardware configs (e.g. with `target_sample_rate`).
+        problems (list): Dicts with `path` or `recording`, `problem` and `detail`.
+        files (dict): Per-file results of `check_file`, keyed by path relative to `root`.
+    """
+
+    def __init__(self, root, hardware=None, sample_rate=None, workers=None, checksum=True):
+        self.root = root
+        self.hardware = hardware or {}
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.checksum = checksum
+        self.problems = []
+        self.files = {}
+        self.recordings = {}
+        self.unlabeled = []
+        self.label_count = 0
+        self.actions = []
+
+    def _problem(self, problem, detail, path=None, recording=None):
+        entry = {"problem": problem, "detail": detail}
+        if path is not None:
+            entry["path"] = os.path.relpath(path, self.root)
+        if recording is not None:
+            entry["recording"] = recording
+        self.problems.append(entry)
+
+    def run(self, baseline=None):
+        """
+        Verifies the whole tree.
+
+        Args:
+            baseline (dict): An earlier `report()`; files whose checksum changed since then are reported.
+        """
+        paths, strays = scan_dataset(self.root)
+        for path in strays:
+            self._problem("stray_file", "name does not match the recorder's filename pattern", path=path)
+        with ProcessPoolExecutor(self.workers) as executor:
+            results = executor.map(check_file, paths, repeat(self.checksum), chunksize=64)
+            for result in results:
+                self.files[os.path.relpath(result["path"], self.root)] = result
+                for problem, detail in result["problems"]:
+                    self._problem(problem, detail, path=result["path"])
+        self._check_recordings()
+        self._check_labels()
+        if baseline is not None:
+            for path, previous in baseline.get("files_detail", {}).items():
+                current = self.files.get(path)
+                if current is None:
+                    self._problem("missing_file", "listed in the baseline report", path=os.path.join(self.root, path))
+                elif previous.get("sha256") and current["sha256"] and previous["sha256"] != current["sha256"]:
+                    self._problem("checksum_changed", f"was {previous['sha256']}", path=current["path"])
+
+    def _check_recordings(self):
+        for result in self.files.values():
+            path = result["path"]
+            parsed = parse_recording_filename(path)
+            key = recording_key(parsed[0])
+            recording = self.recordings.setdefault(key, {"fields": parsed[0], "channels": Counter(), "paths": []})
+            recording["channels"].update(fields["channel"] for fields in parsed)
+            recording["paths"].append(path)
+            if result["frames"] is None:
+                continue
+            if result["channels"] != len(parsed):
+                self._problem("channel_count_mismatch",
+                              f"file has {result['channels']} channels, name implies {len(parsed)}", path=path)
+            expected_rate = self.sample_rate or self.hardware.get(parsed[0]["hardware"], (None, None))[1]
+            if expected_rate and result["sample_rate"] != int(expected_rate):
+                self._problem("sample_rate_mismatch", f"{result['sample_rate']} Hz, expected {expected_rate} Hz", path=path)
+            duration = parsed[0]["duration"]
+            if duration is not None and result["sample_rate"]:
+                expected = int(round(duration * result["sample_rate"]))
+                # Triggered events store their duration rounded to milliseconds
+                tolerance = max(1, result["sample_rate"] // 1000)
+                if abs(result["frames"] - expected) > tolerance:
+                    self._problem("length_mismatch", f"{result['frames']} frames, expected {expected}", path=path)
+        for key, recording in self.recordings.items():
+            channels = recording["channels"]
+            duplicates = sorted(channel for channel, count in channels.items() if count > 1)
+            if duplicates:
+                self._problem("duplicate_channels", f"channels {duplicates} stored more than once", recording=key)
+            expected_channels = self.hardware.get(recording["fields"]["hardware"], (None, None))[0]
+            expected = range(1, (expected_channels or max(channels)) + 1)
+            missing = [channel for channel in expected if channel not in channels]
+            if missing:
+                self._problem("missing_channels", f"channels {missing} not found", recording=key)
+            extra = sorted(channel for channel in channels if channel not in expected)
+            if extra:
+                self._problem("unexpected_channels", f"channels {extra} beyond the {expected_channels} configured", recording=key)
+
+    def _check_labels(self):
+        entries, problems = read_labels(self.root)
+        self.label_count = len(entries)
+        for problem, detail in problems:
+            self._problem(problem, detail)
+        keyed = Counter(entry["recording"] for entry in entries if entry.get("recording"))
+        legacy = Counter(_fingerprint(entry) for entry in entries if not entry.get("recording"))
+        for key, recording in self.recordings.items():
+            if keyed[key]:
+                keyed[key] -= 1
+                continue
+            fingerprint = _fingerprint(recording["fields"])
+            if legacy[fingerprint]:
+                legacy[fingerprint] -= 1
+                continue
+            self.unlabeled.append(key)
+            self._problem("unlabeled", "no label entry for this recording", recording=key)
+        for key, count in keyed.items():
+            if count > 0:
+                self._problem("label_without_audio", f"{count} label(s) without files", recording=key)
+        leftover = sum(count for count in legacy.values() if count > 0)
+        if leftover:
+            self._problem("label_without_audio", f"{leftover} label(s) from before the `recording` key match no files")
+
+    def repair(self):
+        """
+        Fixes what can be fixed without guessing audio.
+
+        Truncated WAV headers are rewritten to the samples actually present, and
+        a label reconstructed from the filename is appended for each unlabeled
+        recording (marked `"reconstructed": true`).
+        """
+        truncated = {entry["path"] for entry in self.problems if entry["problem"] == "truncated"}
+        for path in sorted(truncated):
+            frames = repair_wav_header(os.path.join(self.root, path))
+            self.actions.append({"action": "repaired_header", "path": path, "frames": frames})
+        self.problems = [entry for entry in self.problems if entry["problem"] != "truncated"]
+        if self.unlabeled:
+            store = JsonlLabelStore(os.path.join(self.root, "experiment_labels.jsonl"), fsync_every=len(self.unlabeled))
+            for key in self.unlabeled:
+                fields = self.recordings[key]["fields"]
+                entry = {field: fields[field] for field in FINGERPRINT_FIELDS}
+                entry.update(category=fields["category"], gain=fields["gain"], recording=key, reconstructed=True)
+                store.append(entry)
+                self.actions.append({"action": "reconstructed_label", "recording": key})
+            store.close()
+            self.problems = [entry for entry in self.problems if entry["problem"] != "unlabeled"]
+
+    def quarantine(self):
+        """
+        Moves files with problems in `QUARANTINE_PROBLEMS` to `<root>/quarantine`, keeping their relative paths.
+        """
+        paths = sorted({entry["path"] for entry in self.problems
+                        if entry["problem"] in QUARANTINE_PROBLEMS and "path" in entry})
+        for path in paths:
+            target = os.path.join(self.root, QUARANTINE_DIR, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(os.path.join(self.root, path), target)
+            self.actions.append({"action": "quarantined", "path": path})
+
+    def report(self, elapsed=None):
+        """
+        Returns the machine-readable verification report.
+        """
+        return {
+            "root": self.root,
+            "elapsed_s": elapsed,
+            "files": len(self.files),
+            "recordings": len(self.recordings),
+            "labels": self.label_count,
+            "ok": not self.problems,
+            "summary": dict(Counter(entry["problem"] for entry in self.problems)),
+            "problems": self.problems,
+            "actions": self.actions,
+            "checksums": self.checksum,
+            "files_detail": {
+                path: {field: result[field] for field in ("size", "channels", "sample_rate", "frames", "sha256")}
+                for path, result in self.files.items()
+            },
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Verify (and optionally repair) a recorder dataset tree. Run from src/ as `python -m recorder.verify <root>`."
+    )
+    parser.add_argument("root", help="Dataset root written by the recorder, e.g. datasets")
+    # Anchored to the project so the default works from src/ as well as from the project root
+    default_hardware = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "configs", "hardware_config")
+    parser.add_argument("--hardware-config", nargs="+", default=[os.path.normpath(default_hardware)],
+                        help="Hardware config yaml files or directories with the expected channel counts")
+    parser.add_argument("--sample-rate", type=int, default=None, help="Expected rate of every file (default: per hardware config)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for the file checks (default: all CPUs)")
+    parser.add_argument("--no-checksum", action="store_true", help="Skip SHA-256 checksums")
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare checksums against")
+    parser.add_argument("--repair", action="store_true", help="Fix truncated WAV headers and reconstruct missing labels")
+    parser.add_argument("--quarantine", action="store_true", help="Move unusable files to <root>/quarantine")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    hardware_paths = [path for path in args.hardware_config if os.path.exists(path)]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+    start = time.perf_counter()
+    verifier = DatasetVerifier(args.root, load_hardware_channels(hardware_paths) if hardware_paths else None,
+                               args.sample_rate, args.workers, checksum=not args.no_checksum)
+    verifier.run(baseline)
+    if args.repair:
+        verifier.repair()
+    if args.quarantine:
+        verifier.quarantine()
+    # Repairs keep every manifest column; only quarantined files leave the index. Updating just their
+    # rows keeps the sample rates the recorder stored, which a rebuild from the filenames would lose.
+    quarantined = [os.path.join(args.root, action["path"]) for action in verifier.actions if action["action"] == "quarantined"]
+    if quarantined and os.path.exists(os.path.join(args.root, "manifest.sqlite")):
+        manifest = RecordingManifest(args.root)
+        removed = manifest.remove(quarantined)
+        manifest.close()
+        verifier.actions.append({"action": "updated_manifest", "removed_rows": removed})
+    report = verifier.report(time.perf_counter() - start)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Verified {report['files']} files ({report['recordings']} recordings) in {report['elapsed_s']:.1f} s: "
+              f"{report['summary'] or 'no problems'}; report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(0 if report["ok"] else 1)
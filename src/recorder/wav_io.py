@@ -0,0 +1,129 @@
+import os
+import struct
+
+import numpy as np
+
+# Classic RIFF sizes are 32 bit; larger data chunks need the RF64 layout (EBU Tech 3306)
+RIFF_LIMIT = 0xFFFFFFFF
+WAVE_FORMAT_PCM = 1
+
+
+def write_wav(path, recording, sample_rate, rf64=False):
+    """
+    Writes a (frames, channels) int16 array as one interleaved PCM WAV file.
+
+    The sample data is written straight from the array's buffer, so a
+    C-contiguous recording is never copied. Files whose data chunk would not
+    fit into 32 bits are written as RF64 even when `rf64` is False.
+
+    Args:
+        path (str): Output file path.
+        recording (np.ndarray): Samples shaped (frames,) or (frames, channels).
+        sample_rate (int): Sampling rate in Hz.
+        rf64 (bool): Always use the RF64 header layout.
+    """
+    if recording.ndim == 1:
+        recording = recording[:, None]
+    # No-op for buffers coming from the capture path, which are already C-contiguous
+    recording = np.ascontiguousarray(recording)
+    frames, channels = recording.shape
+    sampwidth = recording.dtype.itemsize
+    data_size = recording.nbytes
+    fmt_chunk = struct.pack(
+        "<4sIHHIIHH",
+        b"fmt ",
+        16,
+        WAVE_FORMAT_PCM,
+        channels,
+        int(sample_rate),
+        int(sample_rate) * channels * sampwidth,
+        channels * sampwidth,
+        sampwidth * 8,
+    )
+    use_rf64 = rf64 or data_size + 36 > RIFF_LIMIT
+    with open(path, "wb") as f:
+        if use_rf64:
+            riff_size = 4 + (8 + 28) + len(fmt_chunk) + 8 + data_size
+            f.write(struct.pack("<4sI4s", b"RF64", RIFF_LIMIT, b"WAVE"))
+            f.write(struct.pack("<4sIQQQI", b"ds64", 28, riff_size, data_size, frames, 0))
+            f.write(fmt_chunk)
+            f.write(struct.pack("<4sI", b"data", RIFF_LIMIT))
+        else:
+            f.write(struct.pack("<4sI4s", b"RIFF", 4 + len(fmt_chunk) + 8 + data_size, b"WAVE"))
+            f.write(fmt_chunk)
+            f.write(struct.pack("<4sI", b"data", data_size))
+        f.write(memoryview(recording).cast("B"))
+
+
+def read_wav_header(path):
+    """
+    Parses the header of a PCM WAV or RF64 file.
+
+    Returns:
+        dict: `channels`, `sample_rate`, `sampwidth`, `frames`, `data_offset` (byte offset of the
+        samples) and `declared_frames` (frames the header claims, more than `frames` if truncated).
+    """
+    with open(path, "rb") as f:
+        riff_id, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff_id not in (b"RIFF", b"RF64") or wave_id != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+        header = {}
+        data_size64 = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"ds64":
+                _, data_size64, _ = struct.unpack("<QQQ", f.read(24))
+                f.seek(chunk_size - 24, os.SEEK_CUR)
+            elif chunk_id == b"fmt ":
+                fmt = f.read(chunk_size + (chunk_size & 1))
+                _, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+                header.update(channels=channels, sample_rate=sample_rate, sampwidth=bits // 8)
+            elif chunk_id == b"data":
+                if "channels" not in header:
+                    raise ValueError(f"{path} has a data chunk before its fmt chunk")
+                data_offset = f.tell()
+                if chunk_size == RIFF_LIMIT and data_size64 is not None:
+                    chunk_size = data_size64
+                frame_size = header["channels"] * header["sampwidth"]
+                header["declared_frames"] = chunk_size // frame_size
+                # A truncated file holds fewer samples than its header claims
+                chunk_size = min(chunk_size, os.fstat(f.fileno()).st_size - data_offset)
+                header["data_offset"] = data_offset
+                header["frames"] = chunk_size // frame_size
+                return header
+            else:
+                # Chunks are word aligned
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def open_wav_memmap(path):
+    """
+    Maps the samples of a 16-bit WAV/RF64 file without reading them.
+
+    Returns:
+        np.memmap: Read-only (frames, channels) int16 array.
+    """
+    header = read_wav_header(path)
+    if header["sampwidth"] != 2:
+        raise ValueError(f"{path} is not 16-bit PCM")
+    return np.memmap(
+        path,
+        dtype="<i2",
+        mode="r",
+        offset=header["data_offset"],
+        shape=(header["frames"], header["channels"]),
+    )
+
+
+def channel_view(path, channel):
+    """
+    Returns a lazy view of one channel (0-based) of an interleaved file.
+
+    The view is a strided slice of a memory map, so only the pages that are
+    actually accessed are read; call `.copy()` on it to get a
+    contiguous mono array for tools that expect one.
+    """
+    return open_wav_memmap(path)[:, channel]
@@ -1,5 +1,27 @@
-from utils.instantiators import instantiate_callbacks, instantiate_loggers
-from utils.logging_utils import log_hyperparameters
-from utils.pylogger import RankedLogger
-from utils.rich_utils import enforce_tags, print_config_tree
-from utils.utils import extras, get_metric_value, task_wrapper
+import importlib
+
+# Training utilities pull in lightning, hydra and rich, so they are only imported
+# on first attribute access; `from utils.logger import get_logger` stays cheap
+# for the recorder entry point.
+_EXPORTS = {
+    "instantiate_callbacks": "utils.instantiators",
+    "instantiate_loggers": "utils.instantiators",
+    "log_hyperparameters": "utils.logging_utils",
+    "RankedLogger": "utils.pylogger",
+    "enforce_tags": "utils.rich_utils",
+    "print_config_tree": "utils.rich_utils",
+    "extras": "utils.utils",
+    "get_metric_value": "utils.utils",
+    "task_wrapper": "utils.utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value